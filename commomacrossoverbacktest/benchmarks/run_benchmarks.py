@@ -0,0 +1,196 @@
+"""
+Benchmark suite of the backtest pipeline on synthetic commodity prices.
+
+Each stage is timed at several scales (tickers x years x bar frequency) and the
+results (throughput in bars per second and peak memory) are written to a JSON file,
+so that two versions of the library can be compared:
+
+    python -m benchmarks.run_benchmarks --scales small medium --output benchmarks/results.json
+
+Data is generated locally by default; `--cache DIR` reads it from an offline
+MarketDataCache instead, so the suite never needs network access.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+
+from pybacktestchain.data_module import DataModule
+from src.commomacrossoverbacktest.commo_backtest import Backtest
+from src.commomacrossoverbacktest.commo_broker import CommoBroker
+from src.commomacrossoverbacktest.commo_informations import CommodityInformation
+from src.commomacrossoverbacktest.data_cache import MarketDataCache
+from src.commomacrossoverbacktest.exponentialmovingaverage import ExponentialMovingAverage
+from src.commomacrossoverbacktest.synthetic import make_commodity_data
+
+TICKERS = ['GC=F', 'CL=F', 'ZS=F', 'ZC=F', 'SI=F', 'HG=F', 'NG=F', 'KC=F', 'CT=F', 'SB=F',
+           'OJ=F', 'ZW=F', 'LE=F', 'HE=F', 'PL=F', 'PA=F', 'CC=F', 'RB=F', 'HO=F', 'BZ=F']
+
+# Scale name -> number of tickers, number of years and bar frequency
+SCALES = {
+    'small': {'tickers': 4, 'years': 2, 'freq': 'B'},
+    'medium': {'tickers': 10, 'years': 10, 'freq': 'B'},
+    'large': {'tickers': 20, 'years': 20, 'freq': 'B'},
+    'intraday': {'tickers': 4, 'years': 1, 'freq': 'h'},
+}
+
+STAGES = ['compute_ema', 'generate_signals', 'get_prices', 'commo_ptf', 'run_backtest']
+
+
+def synthetic_loader(freq: str = 'B', seed: int = 0):
+    """
+    Loader with the signature of get_stocks_data, generating the data locally.
+    """
+    def load(tickers, start_date, end_date):
+        end = pd.Timestamp(end_date) - pd.Timedelta(1, 'ns')
+        return make_commodity_data(list(tickers), start_date, end, freq=freq, seed=seed)
+    return load
+
+
+def measure(func, bars: int, repeat: int = 3) -> dict:
+    """
+    Best wall time of `func` over `repeat` runs, then its peak traced memory on one more run.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    # tracemalloc slows allocations down, so memory is measured on a separate run
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    best = min(times)
+    return {
+        'seconds': best,
+        'bars': bars,
+        'bars_per_second': bars / best if best > 0 else float('inf'),
+        'peak_memory_mb': peak / 2 ** 20
+    }
+
+
+def bench_scale(scale: dict, loader, repeat: int = 3, stages=STAGES) -> dict:
+    """
+    Time every stage of the pipeline on the data of one scale.
+    """
+    tickers = TICKERS[:scale['tickers']]
+    start = datetime(2000, 1, 1)
+    end = start + timedelta(days=365 * scale['years'])
+    data = loader(tickers, start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'))
+    bars = len(data)
+
+    ema_calculator = ExponentialMovingAverage(5, 20, 250)
+    emas = ema_calculator.compute_ema(data, price_column='Close', date_column='Date')
+    signals = ema_calculator.generate_signals(emas)
+    steps = pd.DatetimeIndex(data['Date'].unique()).sort_values()
+
+    def get_prices():
+        # A new information object each time, so that building the price index is timed too
+        info = CommodityInformation(DataModule(data), 'Date', 'Close', commodity_column='ticker')
+        for t in steps:
+            info.get_prices(t)
+
+    info = CommodityInformation(DataModule(data), 'Date', 'Close', commodity_column='ticker')
+    prices = [info.get_prices(t) for t in steps]
+
+    def commo_ptf():
+        broker = CommoBroker(1000000)
+        broker.verbose = False
+        for t, step_prices in zip(steps, prices):
+            broker.commo_ptf(t, signals, step_prices, num_commodities=len(tickers))
+
+    def run_backtest():
+        backtest = Backtest(
+            initial_date=start, final_date=end, universe=tickers, verbose=False, data_loader=lambda *args: data.copy()
+        )
+        backtest.run_backtest()
+
+    funcs = {
+        'compute_ema': lambda: ema_calculator.compute_ema(data, price_column='Close', date_column='Date'),
+        'generate_signals': lambda: ema_calculator.generate_signals(emas),
+        'get_prices': get_prices,
+        'commo_ptf': commo_ptf,
+        'run_backtest': run_backtest,
+    }
+    return {stage: measure(funcs[stage], bars, repeat) for stage in stages}
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(scales: list, loader_factory=synthetic_loader, repeat: int = 3, stages=STAGES) -> dict:
+    """
+    Run the suite for the given scale names.
+
+    :param loader_factory: Function (freq) -> loader with the signature of get_stocks_data.
+    :return: JSON-serializable results, with the environment they were measured in.
+    """
+    results = {
+        'revision': _git_revision(),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'scales': {}
+    }
+
+    # Backtest.run_backtest writes its CSV files in the working directory
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            for name in scales:
+                scale = SCALES[name]
+                results['scales'][name] = dict(scale, stages=bench_scale(scale, loader_factory(scale['freq']), repeat, stages))
+        finally:
+            os.chdir(cwd)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', nargs='+', default=['small', 'medium'], choices=list(SCALES))
+    parser.add_argument('--stages', nargs='+', default=STAGES, choices=STAGES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--cache', help='Read the data from an offline MarketDataCache folder instead of generating it.')
+    parser.add_argument('--output', default='benchmarks/results.json')
+    args = parser.parse_args()
+
+    # The backtests log every run at INFO level
+    logging.getLogger().setLevel(logging.WARNING)
+
+    if args.cache:
+        cache = MarketDataCache(os.path.abspath(args.cache), offline=True)
+        loader_factory = lambda freq: cache.get_stocks_data
+    else:
+        loader_factory = synthetic_loader
+
+    results = run_benchmarks(args.scales, loader_factory, args.repeat, args.stages)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    for name, scale in results['scales'].items():
+        for stage, result in scale['stages'].items():
+            print(f"{name:>9} {stage:>17}: {result['seconds']:9.4f} s {result['bars_per_second']:14,.0f} bars/s "
+                  f"{result['peak_memory_mb']:9.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+import numpy as np
+import pandas as pd
+
+
+def _as_runs(values) -> np.ndarray:
+    """
+    Portfolio values as a float (runs x dates) array; a single series becomes one run.
+    """
+    if isinstance(values, pd.DataFrame) and 'Portfolio Value' in values.columns:
+        values = values['Portfolio Value']
+    values = np.asarray(values, dtype=np.float64)
+    return values[None, :] if values.ndim == 1 else values
+
+
+def simple_returns(values) -> np.ndarray:
+    """
+    Period returns of each run, shape (runs, dates - 1).
+    """
+    values = _as_runs(values)
+    return values[:, 1:] / values[:, :-1] - 1
+
+
+def drawdowns(values) -> np.ndarray:
+    """
+    Drawdown of each run at each date, relative to its running maximum (0 at a peak).
+    """
+    values = _as_runs(values)
+    return values / np.maximum.accumulate(values, axis=1) - 1
+
+
+def drawdown_durations(values) -> np.ndarray:
+    """
+    Number of periods since the last peak, for each run and date.
+    """
+    values = _as_runs(values)
+    index = np.arange(values.shape[1])
+    at_peak = values >= np.maximum.accumulate(values, axis=1)
+    last_peak = np.maximum.accumulate(np.where(at_peak, index, 0), axis=1)
+    return index - last_peak
+
+
+def infer_periods_per_year(dates) -> float:
+    """
+    Periods per year of a series from its dates: 365 for daily dates including weekends
+    (e.g. the calendar-filled P&L of Backtest), 252 for daily dates without weekends,
+    otherwise the average number of dates per year (about 52 for weekly dates).
+    """
+    dates = pd.DatetimeIndex(dates)
+    if len(dates) < 2 or dates[-1] <= dates[0]:
+        return 252
+    if np.median(np.diff(dates.asi8)) == pd.Timedelta(days=1).value:
+        return 365 if (dates.dayofweek >= 5).any() else 252
+    return (len(dates) - 1) / ((dates[-1] - dates[0]) / pd.Timedelta(days=365.25))
+
+
+def _dates_of(values):
+    """
+    Dates of a P&L DataFrame ('Date' column) or of a date-indexed series, None for arrays.
+    """
+    if isinstance(values, pd.DataFrame) and 'Date' in values.columns:
+        return values['Date']
+    if isinstance(values, pd.Series) and isinstance(values.index, pd.DatetimeIndex):
+        return values.index
+    return None
+
+
+def performance_metrics(values, periods_per_year: float = None, risk_free_rate: float = 0.0) -> pd.DataFrame:
+    """
+    Return and risk metrics of many runs at once.
+
+    :param values: Portfolio values, shape (runs, dates), or one P&L series / DataFrame.
+    :param periods_per_year: Periods per year of the series (252 for trading days, 365 for calendar
+                             days); inferred from the dates of a P&L DataFrame or date-indexed
+                             series by default, 252 for arrays.
+    :param risk_free_rate: Annual risk-free rate subtracted in the Sharpe and Sortino ratios.
+    :return: DataFrame with one row per run: 'total_return', 'annualized_return',
+             'annualized_volatility', 'sharpe', 'sortino', 'max_drawdown' and
+             'max_drawdown_duration' (in periods).
+    """
+    if periods_per_year is None:
+        dates = _dates_of(values)
+        periods_per_year = 252 if dates is None else infer_periods_per_year(dates)
+
+    values = _as_runs(values)
+    returns = simple_returns(values)
+    n_periods = returns.shape[1]
+
+    excess = returns - risk_free_rate / periods_per_year
+    mean_excess = excess.mean(axis=1)
+    volatility = returns.std(axis=1, ddof=1) if n_periods > 1 else np.full(len(values), np.nan)
+    downside = np.sqrt(np.mean(np.minimum(excess, 0.0) ** 2, axis=1))
+
+    total_return = values[:, -1] / values[:, 0] - 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return pd.DataFrame({
+            'total_return': total_return,
+            'annualized_return': (1 + total_return) ** (periods_per_year / max(n_periods, 1)) - 1,
+            'annualized_volatility': volatility * np.sqrt(periods_per_year),
+            'sharpe': np.where(volatility > 0, mean_excess / volatility * np.sqrt(periods_per_year), np.nan),
+            'sortino': np.where(downside > 0, mean_excess / downside * np.sqrt(periods_per_year), np.nan),
+            'max_drawdown': drawdowns(values).min(axis=1),
+            'max_drawdown_duration': drawdown_durations(values).max(axis=1)
+        })
+
+
+def realized_trades(transactions: pd.DataFrame, run_column: str = None) -> pd.DataFrame:
+    """
+    Realized P&L of every sell of a transaction log.
+
+    Positions are followed per run and ticker; each sell is valued against the average
+    entry price of the buys since the position was last closed.
+
+    :param transactions: Log with the columns of CommoBroker's log ('Date', 'Action',
+                         'Ticker', 'Quantity', 'Price'), possibly holding several runs.
+    :param run_column: Column identifying the run (e.g. 'Portfolio' for BatchCommoBroker).
+    :return: The sell rows with 'Entry Price' and 'Realized PnL' columns.
+    """
+    log = transactions.reset_index(drop=True)
+    keys = [log[run_column], log['Ticker']] if run_column else [log['Ticker']]
+    selling = (log['Action'] == 'SELL').to_numpy()
+    buy_quantity = np.where(selling, 0, log['Quantity'].to_numpy(dtype=np.float64))
+    buy_cost = buy_quantity * log['Price'].to_numpy(dtype=np.float64)
+
+    # A position cycle ends with each sell: buys are pooled within their cycle
+    cycle = pd.Series(selling.astype(np.int64)).groupby(keys).cumsum() - selling
+    cycle_keys = keys + [cycle]
+    cycle_quantity = pd.Series(buy_quantity).groupby(cycle_keys).cumsum()
+    cycle_cost = pd.Series(buy_cost).groupby(cycle_keys).cumsum()
+
+    sells = log[selling].copy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sells['Entry Price'] = (cycle_cost / cycle_quantity)[selling].to_numpy()
+    sells['Realized PnL'] = (sells['Price'] - sells['Entry Price']) * sells['Quantity']
+    return sells
+
+
+def trade_metrics(transactions: pd.DataFrame, values=None, run_column: str = None, runs=None) -> pd.DataFrame:
+    """
+    Trading activity of each run: number of trades, traded notional, turnover and hit rate.
+
+    :param transactions: Transaction log, see realized_trades.
+    :param values: Portfolio values (runs x dates), used for the turnover (optional).
+    :param run_column: Column identifying the run; runs are then numbered 0..n-1.
+    :param runs: Number of runs (defaults to the number of rows of `values`, or 1).
+    :return: DataFrame with one row per run: 'n_trades', 'traded_notional', 'turnover'
+             (notional traded over the average portfolio value) and 'hit_rate'
+             (share of closed positions with a positive realized P&L).
+    """
+    if runs is None:
+        runs = len(_as_runs(values)) if values is not None else 1
+    run_ids = transactions[run_column].to_numpy(dtype=np.int64) if run_column else np.zeros(len(transactions), dtype=np.int64)
+    notional = transactions['Quantity'].to_numpy(dtype=np.float64) * transactions['Price'].to_numpy(dtype=np.float64)
+
+    sells = realized_trades(transactions, run_column)
+    sell_runs = sells[run_column].to_numpy(dtype=np.int64) if run_column else np.zeros(len(sells), dtype=np.int64)
+    closed = np.bincount(sell_runs, minlength=runs)
+    wins = np.bincount(sell_runs, weights=(sells['Realized PnL'] > 0).to_numpy(), minlength=runs)
+
+    metrics = pd.DataFrame({
+        'n_trades': np.bincount(run_ids, minlength=runs),
+        'traded_notional': np.bincount(run_ids, weights=notional, minlength=runs)
+    })
+    metrics['turnover'] = metrics['traded_notional'] / _as_runs(values).mean(axis=1) if values is not None else np.nan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        metrics['hit_rate'] = np.where(closed > 0, wins / closed, np.nan)
+    return metrics
+
+
+def pnl_attribution(transactions: pd.DataFrame, final_prices: dict = None, run_column: str = None) -> pd.DataFrame:
+    """
+    P&L of each commodity: realized on closed trades, unrealized on open positions.
+
+    :param transactions: Transaction log, see realized_trades.
+    :param final_prices: Ticker -> last price, to value the open positions (optional).
+    :param run_column: Column identifying the run.
+    :return: DataFrame indexed by (run, ticker) or ticker with 'Realized PnL',
+             'Open Quantity', 'Unrealized PnL' and 'Total PnL'.
+    """
+    keys = [run_column, 'Ticker'] if run_column else ['Ticker']
+    realized = realized_trades(transactions, run_column).groupby(keys)['Realized PnL'].sum()
+
+    # Open position and cash flow of each commodity
+    signed = np.where(transactions['Action'] == 'SELL', -1, 1) * transactions['Quantity'].to_numpy(dtype=np.float64)
+    flows = pd.DataFrame({
+        'Open Quantity': signed,
+        'Cost': signed * transactions['Price'].to_numpy(dtype=np.float64)
+    }, index=pd.MultiIndex.from_frame(transactions[keys])).groupby(level=keys).sum()
+
+    attribution = flows.join(realized.rename('Realized PnL'), how='left').fillna({'Realized PnL': 0.0})
+    tickers = attribution.index.get_level_values('Ticker')
+    prices = tickers.map(lambda ticker: (final_prices or {}).get(ticker, np.nan)).to_numpy(dtype=np.float64)
+
+    # Mark to market minus all cash flows, less what is already realized
+    total = attribution['Open Quantity'] * prices - attribution['Cost']
+    attribution['Unrealized PnL'] = np.where(attribution['Open Quantity'] == 0, 0.0, total - attribution['Realized PnL'])
+    attribution['Total PnL'] = attribution['Realized PnL'] + attribution['Unrealized PnL']
+    return attribution.drop(columns='Cost')[['Realized PnL', 'Open Quantity', 'Unrealized PnL', 'Total PnL']]
@@ -0,0 +1,12 @@
+import os
+import numpy as np
+
+
+def save_array(path: str, array: np.ndarray):
+    """
+    Save an array through a temporary file, so that readers memory-mapping the
+    previous version are never exposed to a partially written file.
+    """
+    with open(path + '.tmp', 'wb') as f:
+        np.save(f, array)
+    os.replace(path + '.tmp', path)
@@ -0,0 +1,186 @@
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+from src.commomacrossoverbacktest.exponentialmovingaverage import ExponentialMovingAverage
+from src.commomacrossoverbacktest.indicator_cache import IndicatorCache, default_indicator_cache
+
+
+class BatchCommoBroker:
+    """
+    N independent CommoBroker portfolios advanced in lockstep.
+
+    Cash is a (portfolios,) array and quantities and entry prices are
+    (portfolios x tickers) arrays. A step's signals are applied to every portfolio at
+    once with array operations, with the sizing rules of CommoBroker.commo_ptf, buy and
+    sell: 80% of the portfolio value split across the commodities, a cap at cash plus
+    20% of the portfolio value, a second cap at 120% of the cash in buy, and sell
+    signals closing existing longs. Signals only ever open long positions, so the short
+    covering branch of commo_ptf never applies.
+
+    Prices are either shared by every portfolio, shape (tickers,), or given per
+    portfolio, shape (portfolios x tickers), e.g. for simulated price paths.
+
+    :param cash: Initial cash, a scalar or one value per portfolio.
+    :param tickers: Tickers, in the column order of the price and signal arrays.
+    :param n_portfolios: Number of portfolios when `cash` is a scalar.
+    """
+
+    def __init__(self, cash, tickers: list, n_portfolios: int = None):
+        cash = np.asarray(cash, dtype=np.float64)
+        if cash.ndim == 0:
+            cash = np.full(n_portfolios or 1, float(cash))
+        self.cash = cash.copy()
+        self.tickers = list(tickers)
+        n, k = len(self.cash), len(self.tickers)
+        self.quantities = np.zeros((n, k), dtype=np.int64)
+        self.entry_prices = np.zeros((n, k))
+        self.trade_counts = np.zeros(n, dtype=np.int64)
+        self._trades = []  # One tuple of arrays per executed event
+
+    @property
+    def n_portfolios(self) -> int:
+        return len(self.cash)
+
+    def get_portfolio_value(self, prices: np.ndarray) -> np.ndarray:
+        """
+        Cash plus the value of the positions that have a price, for every portfolio.
+
+        :param prices: Price of each ticker (or of each portfolio and ticker), NaN when unavailable.
+        """
+        held = (self.quantities != 0) & ~np.isnan(prices)
+        return self.cash + np.where(held, self.quantities * np.where(held, prices, 0.0), 0.0).sum(axis=1)
+
+    def execute_signals(self, t: datetime, ticker_ids: np.ndarray, signals: np.ndarray, prices: np.ndarray,
+                        num_commodities: int):
+        """
+        Execute a step's signals for every portfolio.
+
+        :param t: Current datetime.
+        :param ticker_ids: Column of each signal event, in execution order.
+        :param signals: Array of shape (events, portfolios): 1 for Buy, -1 for Sell, 0 for no signal.
+        :param prices: Execution price of each ticker (or of each portfolio and ticker), NaN when unavailable.
+        :param num_commodities: Number of commodities sharing the allocation.
+        """
+        if len(ticker_ids) == 0:
+            return
+
+        # 80% of each portfolio is split across the commodities
+        allocation_per_commodity = 0.8 * self.get_portfolio_value(prices) / num_commodities
+
+        for j, event_signals in zip(ticker_ids, signals):
+            price = prices[..., j]
+            # Skip the portfolios where the price is not available
+            available = ~np.isnan(price)
+            if not available.any():
+                continue
+            if not available.all():
+                event_signals = np.where(available, event_signals, 0)
+                price = np.where(available, price, 1.0)
+            held = self.quantities[:, j]
+
+            # Sell: close the existing long positions
+            selling = (event_signals == -1) & (held > 0)
+            sold = np.where(selling, held, 0)
+            self.cash += price * sold
+
+            # Buy: open or add to long positions, within cash plus the 20% reserve
+            buying = (event_signals == 1) & (held >= 0)
+            quantity = np.trunc(allocation_per_commodity / price)
+            available_cash = self.cash + 0.2 * self.get_portfolio_value(prices)
+            quantity = np.where(quantity * price > available_cash, np.trunc(available_cash / price), quantity)
+            # CommoBroker.buy caps the order again with a reserve computed on cash only
+            quantity = np.where(quantity * price > self.cash + 0.2 * self.cash, np.trunc((self.cash + 0.2 * self.cash) / price), quantity)
+            bought = np.where(buying & (quantity > 0), quantity, 0).astype(np.int64)
+
+            new_quantity = held - sold + bought
+            self.entry_prices[:, j] = np.where(
+                bought > 0, (self.entry_prices[:, j] * (held - sold) + price * bought) / np.maximum(new_quantity, 1),
+                np.where(new_quantity == 0, 0.0, self.entry_prices[:, j])
+            )
+            self.cash -= bought * price
+            self.quantities[:, j] = new_quantity
+
+            traded = np.flatnonzero((sold > 0) | (bought > 0))
+            if len(traded):
+                self.trade_counts[traded] += 1
+                self._trades.append((t, traded, j, (bought - sold)[traded], np.broadcast_to(price, self.cash.shape)[traded],
+                                     self.cash[traded]))
+
+    def get_transaction_log(self) -> pd.DataFrame:
+        """
+        Executed trades of every portfolio, with the columns of CommoBroker's log plus 'Portfolio'.
+        """
+        columns = ['Date', 'Portfolio', 'Action', 'Ticker', 'Quantity', 'Price', 'Cash']
+        if not self._trades:
+            return pd.DataFrame(columns=columns)
+        sizes = [len(traded) for _, traded, _, _, _, _ in self._trades]
+        quantities = np.concatenate([quantity for _, _, _, quantity, _, _ in self._trades])
+        return pd.DataFrame({
+            'Date': np.repeat([t for t, _, _, _, _, _ in self._trades], sizes),
+            'Portfolio': np.concatenate([traded for _, traded, _, _, _, _ in self._trades]),
+            'Action': np.where(quantities > 0, 'BUY', 'SELL'),
+            'Ticker': np.repeat([self.tickers[j] for _, _, j, _, _, _ in self._trades], sizes),
+            'Quantity': np.abs(quantities),
+            'Price': np.concatenate([price for _, _, _, _, price, _ in self._trades]),
+            'Cash': np.concatenate([cash for _, _, _, _, _, cash in self._trades])
+        }, columns=columns)
+
+
+def run_panel_batch(panel: dict, windows: list, initial_cash: float, cache: IndicatorCache = None):
+    """
+    Run the EMA crossover strategy for many window triples in lockstep on one panel.
+
+    :param panel: Panel built by prepare_backtest_panel.
+    :param windows: List of (short_window, medium_window, long_window) triples, one portfolio each.
+    :return: The (portfolios x steps) portfolio values and the BatchCommoBroker.
+    """
+    if cache is None:
+        cache = default_indicator_cache()
+
+    # Signal panels of every portfolio, shape (portfolios, dates, tickers)
+    signals = np.empty((len(windows),) + panel['prices'].shape, dtype=np.int8)
+    for p, (short_window, medium_window, long_window) in enumerate(windows):
+        ema_calculator = ExponentialMovingAverage(short_window, medium_window, long_window)
+        emas = ema_calculator.compute_ema_panel(
+            panel['prices'], panel['present'], cache=cache, tickers=panel['tickers'],
+            versions=panel['versions'], price_column=panel['price_column']
+        )
+        signals[p] = ema_calculator.generate_signal_panel(emas, panel['present'])
+
+    # Events where at least one portfolio has a signal, ordered by date then ticker
+    execution_prices = panel['execution_prices']
+    n_steps = execution_prices.shape[0]
+    rows, ticker_ids = np.nonzero((signals != 0).any(axis=0))
+    event_steps = panel['date_steps'][rows]
+    executed = event_steps < n_steps
+    rows, ticker_ids, event_steps = rows[executed], ticker_ids[executed], event_steps[executed]
+    event_signals = signals[:, rows, ticker_ids].T
+
+    broker = BatchCommoBroker(initial_cash, panel['tickers'], len(windows))
+    values = run_batch_events(broker, panel['steps'], execution_prices, event_steps, ticker_ids, event_signals)
+    return values, broker
+
+
+def run_batch_events(broker: BatchCommoBroker, steps, execution_prices: np.ndarray, event_steps: np.ndarray,
+                     ticker_ids: np.ndarray, event_signals: np.ndarray) -> np.ndarray:
+    """
+    Step a BatchCommoBroker through signal events.
+
+    :param steps: Date of each step, used in the transaction log.
+    :param execution_prices: Prices per step, shape (steps, tickers) or (steps, portfolios, tickers).
+    :param event_steps: Step of each event, sorted.
+    :param ticker_ids: Ticker column of each event.
+    :param event_signals: Signals of each event for every portfolio, shape (events, portfolios).
+    :return: The (portfolios x steps) portfolio values.
+    """
+    n_steps = len(steps)
+    bounds = np.searchsorted(event_steps, np.arange(n_steps + 1), side='left')
+    values = np.empty((broker.n_portfolios, n_steps))
+    for i, t in enumerate(steps):
+        start, end = bounds[i], bounds[i + 1]
+        broker.execute_signals(
+            t, ticker_ids[start:end], event_signals[start:end], execution_prices[i], len(broker.tickers)
+        )
+        values[:, i] = broker.get_portfolio_value(execution_prices[i])
+    return values
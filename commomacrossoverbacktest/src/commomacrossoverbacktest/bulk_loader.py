@@ -0,0 +1,159 @@
+from concurrent.futures import ThreadPoolExecutor
+import io
+import logging
+import os
+import time
+from urllib.error import HTTPError
+from urllib.parse import quote, urlencode
+from urllib.request import urlopen
+import pandas as pd
+
+from src.commomacrossoverbacktest.data_cache import _download
+from src.commomacrossoverbacktest.price_index import _naive_datetimes
+
+
+def _between(df: pd.DataFrame, start_date: str, end_date: str, time_column: str = 'Date') -> pd.DataFrame:
+    """
+    Rows dated between start_date (included) and end_date (excluded), in local time.
+    """
+    dates = _naive_datetimes(df[time_column])
+    return df[(dates >= pd.Timestamp(start_date)) & (dates < pd.Timestamp(end_date))].reset_index(drop=True)
+
+
+class DirectorySource:
+    """
+    Source reading one CSV file per ticker from a local folder (e.g. exported data or
+    test fixtures).
+
+    :param directory: Folder holding `<ticker>.csv` files (tickers URL-quoted, e.g. GC%3DF.csv).
+    """
+
+    def __init__(self, directory: str, time_column: str = 'Date'):
+        self.directory = directory
+        self.time_column = time_column
+
+    def __call__(self, ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
+        path = os.path.join(self.directory, quote(ticker, safe='') + '.csv')
+        if not os.path.exists(path):
+            return pd.DataFrame()
+        df = pd.read_csv(path, parse_dates=[self.time_column])
+        df['ticker'] = ticker
+        return _between(df, start_date, end_date, self.time_column)
+
+
+class HTTPSource:
+    """
+    Source downloading one CSV document per ticker over HTTP.
+
+    Requests `<base_url>/<ticker>.csv?start=<start_date>&end=<end_date>`; a 404 means
+    the ticker has no data, any other error is raised so that the loader retries it.
+
+    :param base_url: Root URL of the data server.
+    :param timeout: Timeout of each request, in seconds.
+    """
+
+    def __init__(self, base_url: str, timeout: float = 30.0, time_column: str = 'Date'):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.time_column = time_column
+
+    def __call__(self, ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
+        url = f"{self.base_url}/{quote(ticker, safe='')}.csv?{urlencode({'start': start_date, 'end': end_date})}"
+        try:
+            with urlopen(url, timeout=self.timeout) as response:
+                content = response.read()
+        except HTTPError as error:
+            if error.code == 404:
+                return pd.DataFrame()
+            raise
+        if not content.strip():
+            return pd.DataFrame()
+        df = pd.read_csv(io.BytesIO(content), parse_dates=[self.time_column])
+        df['ticker'] = ticker
+        return df
+
+
+def merge_frames(frames: list, time_column: str = 'Date', ticker_column: str = 'ticker') -> pd.DataFrame:
+    """
+    Concatenate per-ticker frames once and sort the result by date, then ticker.
+    """
+    frames = [df for df in frames if df is not None and not df.empty]
+    if not frames:
+        return pd.DataFrame()
+    merged = pd.concat(frames, ignore_index=True)
+    order = pd.DataFrame({
+        'time': _naive_datetimes(merged[time_column]).to_numpy(),
+        'ticker': merged[ticker_column].to_numpy()
+    }).sort_values(['time', 'ticker'], kind='stable').index
+    return merged.take(order).reset_index(drop=True)
+
+
+class BulkLoader:
+    """
+    Loads the data of many tickers concurrently, with a bounded number of requests in
+    flight.
+
+    Each ticker is fetched by a thread pool of `max_workers` threads; a failed fetch,
+    including one returning no rows (yfinance reports most failures as an empty frame),
+    is retried after an exponential backoff (`backoff`, 2 x `backoff`, ... capped at
+    `max_backoff` seconds). Since fetching is dominated by round-trip latency, loading
+    a universe takes about as long as its slowest ticker when `max_workers` covers it.
+    The per-ticker frames are merged with a single concatenation into one frame sorted
+    by date and ticker.
+
+    :param source: Function (ticker, start_date, end_date) -> DataFrame: the remote
+                   pybacktestchain download by default, or a DirectorySource, an
+                   HTTPSource, or MarketDataCache(...).get_stock_data.
+    :param max_workers: Maximum number of concurrent fetches.
+    :param retries: Number of retries of a failed fetch.
+    :param backoff: Delay before the first retry, in seconds.
+    :param max_backoff: Maximum delay between two retries, in seconds.
+    """
+
+    def __init__(self, source=None, max_workers: int = 8, retries: int = 3, backoff: float = 0.5,
+                 max_backoff: float = 8.0):
+        self.source = source if source is not None else _download
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def fetch(self, ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        Fetch one ticker, retrying failures and empty results with an exponential backoff.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                df = self.source(ticker, start_date, end_date)
+                if df is None or df.empty:
+                    raise ValueError(f"no data between {start_date} and {end_date}")
+                return df
+            except Exception as error:
+                if attempt == self.retries:
+                    raise
+                delay = min(self.backoff * 2 ** attempt, self.max_backoff)
+                logging.info(f"Fetching {ticker} failed ({error}), retrying in {delay:.1f}s.")
+                time.sleep(delay)
+
+    def _fetch_or_none(self, ticker: str, start_date: str, end_date: str):
+        try:
+            return self.fetch(ticker, start_date, end_date)
+        except Exception:
+            logging.warning(f"Stock {ticker} not found")
+            return None
+
+    def get_stocks_data(self, tickers: list, start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        Drop-in replacement for pybacktestchain's get_stocks_data, fetching the tickers concurrently.
+
+        Tickers that still fail after the retries are skipped with a warning; if every
+        ticker fails, a ValueError naming them is raised instead of returning an empty frame.
+        """
+        tickers = list(tickers)
+        if not tickers:
+            return pd.DataFrame()
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(tickers))) as pool:
+            frames = list(pool.map(lambda ticker: self._fetch_or_none(ticker, start_date, end_date), tickers))
+        if all(df is None for df in frames):
+            raise ValueError(f"No data could be loaded between {start_date} and {end_date} for: {', '.join(tickers)}.")
+        return merge_frames(frames)
@@ -2,16 +2,29 @@ import pandas as pd
 import logging
 from datetime import datetime
 import os
+import uuid
 from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable
 from src.commomacrossoverbacktest.commo_broker import CommoBroker
-from src.commomacrossoverbacktest.commo_informations import ExponentialMovingAverageInformation
-from pybacktestchain.data_module import DataModule, get_stocks_data
+from src.commomacrossoverbacktest.commo_informations import PointInTimeEMAInformation
+from src.commomacrossoverbacktest.price_index import _naive_datetimes
+from src.commomacrossoverbacktest.vectorized import vectorized_backtest
+from pybacktestchain.data_module import DataModule
 from pybacktestchain.utils import generate_random_name
-import matplotlib.pyplot as plt
 
+# Optional features are imported where they are used, so that importing the backtest
+# does not load the sweep, walk-forward, profiling, results store and download modules
+if TYPE_CHECKING:
+    from src.commomacrossoverbacktest.profiling import Profiler
+    from src.commomacrossoverbacktest.results_store import ResultsStore
 
-# Configuration des logs
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+def get_stocks_data(tickers: list, start_date: str, end_date: str) -> pd.DataFrame:
+    """
+    Default data loader: download the tickers concurrently with a BulkLoader.
+    """
+    from src.commomacrossoverbacktest.bulk_loader import BulkLoader
+    return BulkLoader().get_stocks_data(tickers, start_date, end_date)
 
 
 @dataclass
@@ -19,27 +32,91 @@ class Backtest:
     initial_date: datetime
     final_date: datetime
     universe: list  # Liste des tickers (e.g., ['GC=F', 'CL=F', ...])
-    information_class: type = ExponentialMovingAverageInformation
+    information_class: type = PointInTimeEMAInformation
     time_column: str = 'Date'
     adj_close_column: str = 'Close'
     initial_cash: float = 1000000
     verbose: bool = True
     broker: CommoBroker = None  # Le broker sera initialisé dans __post_init__
+    data_loader: Callable = None  # Fonction (tickers, start, end) -> DataFrame, téléchargement concurrent par défaut
+    calendar: Callable = None  # Fonction (start, end) -> dates de cotation, dates des données par défaut
+    freq: str = None  # Fréquence des pas (ex. 'h' pour des barres minute), chaque date des données par défaut
+    profiler: 'Profiler' = None  # Profiler(enabled=True) pour mesurer chaque étape, désactivé par défaut
+    results_store: 'ResultsStore' = None  # Base de résultats partagée par les runs (optionnelle)
+    save_csv: bool = None  # Export CSV par run ; par défaut uniquement sans results_store
 
     def __post_init__(self):
         if self.broker is None:
             self.broker = CommoBroker(cash=self.initial_cash)
+        if self.profiler is None:
+            from src.commomacrossoverbacktest.profiling import Profiler
+            self.profiler = Profiler()
         self.backtest_name = generate_random_name()
+        self.run_id = uuid.uuid4().hex
+
+    def _start_run(self):
+        # Chaque run a sa propre clé dans la base de résultats
+        self.run_id = uuid.uuid4().hex
+        self.profiler.start()
+
+    def load_data(self) -> pd.DataFrame:
+        """
+        Load the market data of the universe with the configured data loader.
+
+        By default the tickers are downloaded concurrently by a BulkLoader. Use e.g.
+        `data_loader=MarketDataCache('data_cache').get_stocks_data` to serve the data from
+        a local cache instead of downloading it on every run.
+        """
+        loader = self.data_loader if self.data_loader is not None else get_stocks_data
+        with self.profiler.stage('load_data'):
+            return loader(
+                self.universe,
+                self.initial_date.strftime('%Y-%m-%d'),
+                self.final_date.strftime('%Y-%m-%d')
+            )
+
+    def trading_dates(self, df: pd.DataFrame) -> pd.DatetimeIndex:
+        """
+        Dates on which the backtest is stepped.
+
+        By default these are the timestamps present in the loaded data (daily closes or
+        intraday bars); a `calendar` function (e.g. built on an exchange's holidays) can
+        be given instead. With `freq`, bars are grouped into steps of that frequency: each
+        step is dated at the end of its period, so it sees every bar of the period.
+        """
+        if self.calendar is not None:
+            return pd.DatetimeIndex(self.calendar(self.initial_date, self.final_date))
+
+        dates = pd.DatetimeIndex(_naive_datetimes(df[self.time_column]).unique())
+        if self.freq is not None:
+            dates = dates.ceil(self.freq).unique()
+        dates = dates.sort_values()
+        return dates[(dates >= self.initial_date) & (dates <= self.final_date)]
+
+    def fill_calendar(self, pnl_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Extend a P&L series computed on trading dates to every calendar day.
+
+        Positions do not change between two trading dates, so non-trading days carry the
+        last simulated value forward (the initial cash before the first trading date).
+        """
+        calendar_days = pd.date_range(self.initial_date, self.final_date, freq='D')
+        values = pnl_df.set_index('Date')['Portfolio Value']
+        values = values.reindex(calendar_days.union(values.index)).ffill().fillna(self.initial_cash)
+        return pd.DataFrame({'Date': values.index, 'Portfolio Value': values.to_numpy()})
+
+    def profile_report(self) -> pd.DataFrame:
+        """
+        Wall time, call count and peak allocations of each stage of the last profiled runs.
+        """
+        return self.profiler.report()
 
     def run_backtest(self):
         logging.info(f"Running backtest from {self.initial_date} to {self.final_date}.")
+        self._start_run()
 
         # Charger les données du marché
-        df = get_stocks_data(
-            self.universe,
-            self.initial_date.strftime('%Y-%m-%d'),
-            self.final_date.strftime('%Y-%m-%d')
-        )
+        df = self.load_data()
 
         # Initialiser le module de données et la classe d'information
         data_module = DataModule(df)
@@ -49,34 +126,220 @@ class Backtest:
             adj_close_column=self.adj_close_column,
         )
 
+        # Nombre de commodités effectivement chargées, pour répartir l'allocation
+        num_commodities = df[info.company_column].nunique()
+
         # Suivre l'évolution du P&L
         pnl_history = []
 
-        # Boucle sur chaque jour de la période du backtest
-        for t in pd.date_range(self.initial_date, self.final_date, freq='D'):
-            # Obtenir les prix et les signaux pour le jour courant
-            prices = info.get_prices(t)
-            information_set = info.compute_information(t)
-            signals = information_set['signals']
+        # Boucle sur chaque jour de cotation de la période du backtest
+        profiler = self.profiler
+        for t in self.trading_dates(df):
+            with profiler.step(t):
+                # Obtenir les prix et les signaux pour le jour courant
+                with profiler.stage('get_prices'):
+                    prices = info.get_prices(t)
+                with profiler.stage('compute_information'):
+                    information_set = info.compute_information(t)
+                # Ajuster le portefeuille avec les signaux via le broker ; lorsque l'information
+                # fournit les nouveaux signaux, ils sont exécutés directement sous forme de tableaux
+                with profiler.stage('commo_ptf'):
+                    new_signals = information_set.get('new_signals')
+                    if new_signals is None:
+                        self.broker.commo_ptf(t, information_set['signals'], prices, num_commodities=num_commodities)
+                    elif len(new_signals):
+                        values = new_signals['Signal'].to_numpy()
+                        active = values != 0
+                        self.broker.execute_signals(
+                            t, new_signals['ticker'].to_numpy()[active], values[active], prices, num_commodities
+                        )
 
-            # Ajuster le portefeuille avec les signaux via le broker
-            self.broker.commo_ptf(t, signals, prices)
+                # Calculer la valeur actuelle du portefeuille
+                with profiler.stage('get_portfolio_value'):
+                    portfolio_value = self.broker.get_portfolio_value(prices)
+                pnl_history.append((t, portfolio_value))
 
-            # Calculer la valeur actuelle du portefeuille
-            portfolio_value = self.broker.get_portfolio_value(prices)
-            pnl_history.append((t, portfolio_value))
-
-        # Créer un DataFrame pour l'évolution du P&L
-        pnl_df = pd.DataFrame(pnl_history, columns=['Date', 'Portfolio Value'])
+        # Créer un DataFrame pour l'évolution du P&L, complété pour les jours sans cotation
+        pnl_df = self.fill_calendar(pd.DataFrame(pnl_history, columns=['Date', 'Portfolio Value']))
 
         # Sauvegarder les résultats
         self.save_results(pnl_df)
+        self.profiler.stop()
+
+        logging.info(f"Backtest completed. Final portfolio value: {pnl_df['Portfolio Value'].iloc[-1]}")
+
+        return pnl_df
+
+    def run_vectorized(self):
+        """
+        Run the backtest over the whole dates x tickers panel, without a per-day loop.
+
+        EMAs, signals, positions, cash and portfolio value are computed with compiled
+        array kernels that reproduce the CommoBroker sizing rules (80% of the portfolio
+        split across commodities, 20% cash reserve, long-only entries). The broker is
+        not used: this mode is meant for runs that do not need bespoke broker logic.
+        """
+        logging.info(f"Running vectorized backtest from {self.initial_date} to {self.final_date}.")
+        self._start_run()
+
+        # Charger les données du marché
+        df = self.load_data()
+
+        # Les fenêtres EMA et la fenêtre de prix sont celles de la classe d'information
+        info = self.information_class(
+            data_module=DataModule(df),
+            time_column=self.time_column,
+            adj_close_column=self.adj_close_column,
+        )
+
+        ema_calculator = info.ema_calculator()
+        with self.profiler.stage('vectorized_backtest'):
+            pnl_df, transaction_log = vectorized_backtest(
+                df,
+                self.trading_dates(df),
+                short_window=ema_calculator.short_window,
+                medium_window=ema_calculator.medium_window,
+                long_window=ema_calculator.long_window,
+                initial_cash=self.initial_cash,
+                time_column=self.time_column,
+                ticker_column=info.company_column,
+                price_column=self.adj_close_column,
+                max_age=info.s
+            )
+
+        # Sauvegarder les résultats
+        pnl_df = self.fill_calendar(pnl_df)
+        self.save_results(pnl_df, transaction_log.to_frame())
+        self.profiler.stop()
 
         logging.info(f"Backtest completed. Final portfolio value: {pnl_df['Portfolio Value'].iloc[-1]}")
 
         return pnl_df
 
-    def save_results(self, pnl_df):
+    def run_sweep(self, windows, max_workers: int = None):
+        """
+        Grid-search the EMA windows with the vectorized backtest, in parallel.
+
+        The market data is downloaded once and shared with the worker processes.
+
+        :param windows: Iterable of (short_window, medium_window, long_window) triples, in
+                        bars or as durations when the information class has a `bar_freq`.
+        :param max_workers: Number of processes (defaults to every core).
+        :return: DataFrame with one row of metrics per window triple.
+        """
+        from src.commomacrossoverbacktest.sweep import run_sweep
+
+        windows = list(windows)
+        logging.info(f"Running parameter sweep over {len(windows)} window sets.")
+
+        # Charger les données du marché une seule fois pour toutes les configurations
+        df = self.load_data()
+        info = self.information_class(
+            data_module=DataModule(df),
+            time_column=self.time_column,
+            adj_close_column=self.adj_close_column,
+        )
+
+        return run_sweep(
+            df,
+            self.trading_dates(df),
+            windows,
+            initial_cash=self.initial_cash,
+            max_workers=max_workers,
+            time_column=self.time_column,
+            ticker_column=info.company_column,
+            price_column=self.adj_close_column,
+            max_age=info.s,
+            bar_freq=info.bar_freq
+        )
+
+    def run_walk_forward(self, windows, train_size: int, test_size: int, objective='sharpe',
+                         max_workers: int = None):
+        """
+        Walk-forward optimization of the EMA windows, see walk_forward.walk_forward.
+
+        :param windows: Iterable of (short_window, medium_window, long_window) candidates, in
+                        bars or as durations when the information class has a `bar_freq`.
+        :param train_size: Number of trading dates of each train window.
+        :param test_size: Number of trading dates of each test window.
+        :param objective: Metric of performance_metrics to maximize, or module-level function
+                          (values) -> score (lambdas cannot be sent to worker processes).
+        :param max_workers: Number of processes (defaults to every core).
+        :return: The stitched out-of-sample P&L DataFrame and the DataFrame of folds.
+        """
+        from src.commomacrossoverbacktest.walk_forward import walk_forward
+
+        windows = list(windows)
+        logging.info(f"Running walk-forward optimization over {len(windows)} window sets.")
+        self._start_run()
+
+        # Charger les données du marché une seule fois pour tous les folds
+        df = self.load_data()
+        info = self.information_class(
+            data_module=DataModule(df),
+            time_column=self.time_column,
+            adj_close_column=self.adj_close_column,
+        )
+
+        with self.profiler.stage('walk_forward'):
+            result = walk_forward(
+                df,
+                self.trading_dates(df),
+                windows,
+                train_size,
+                test_size,
+                initial_cash=self.initial_cash,
+                objective=objective,
+                max_workers=max_workers,
+                time_column=self.time_column,
+                ticker_column=info.company_column,
+                price_column=self.adj_close_column,
+                max_age=info.s,
+                bar_freq=info.bar_freq
+            )
+
+        # Sauvegarder les résultats
+        pnl_df = self.fill_calendar(result['pnl'])
+        self.save_results(pnl_df, result['transactions'].to_frame())
+        self.profiler.stop()
+
+        logging.info(f"Walk-forward completed. Final portfolio value: {pnl_df['Portfolio Value'].iloc[-1]}")
+
+        return pnl_df, result['folds']
+
+    def run_parameters(self) -> dict:
+        """
+        Parameters of the run, as recorded in the results store.
+        """
+        parameters = {
+            'initial_date': str(self.initial_date),
+            'final_date': str(self.final_date),
+            'universe': list(self.universe),
+            'information_class': self.information_class.__name__,
+            'initial_cash': self.initial_cash,
+            'freq': self.freq
+        }
+        for window in ('short_window', 'medium_window', 'long_window', 'bar_freq'):
+            if hasattr(self.information_class, window):
+                parameters[window] = getattr(self.information_class, window)
+        return parameters
+
+    def save_results(self, pnl_df, transaction_log=None):
+        with self.profiler.stage('save_results'):
+            if transaction_log is None:
+                transaction_log = self.broker.get_transaction_log()
+
+            # Ajout (asynchrone) du run à la base de résultats
+            if self.results_store is not None:
+                self.results_store.save(
+                    self.run_id, pnl_df, transaction_log, parameters=self.run_parameters(), name=self.backtest_name
+                )
+
+            save_csv = self.results_store is None if self.save_csv is None else self.save_csv
+            if save_csv:
+                self._save_csv(pnl_df, transaction_log)
+
+    def _save_csv(self, pnl_df, transaction_log):
         # Sauvegarde des résultats
         if not os.path.exists('backtests'):
             os.makedirs('backtests')
@@ -85,7 +348,7 @@ class Backtest:
         portfolio_evolution_path = f"backtests/{self.backtest_name}_portfolio.csv"
 
         # Enregistrer les transactions avec des colonnes bien formatées
-        self.broker.get_transaction_log().to_csv(
+        transaction_log.to_csv(
             transaction_log_path, index=False, sep=',', float_format='%.2f'
         )
         
@@ -100,6 +363,10 @@ class Backtest:
 
 # Lancer le backtest
 if __name__ == "__main__":
+    # Tracé et configuration des logs uniquement lorsque le module est lancé directement
+    import matplotlib.pyplot as plt
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
     backtest = Backtest(
         initial_date=datetime(2022, 1, 1),
         final_date=datetime(2023, 1, 1),
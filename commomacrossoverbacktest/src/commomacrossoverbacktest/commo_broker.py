@@ -1,15 +1,12 @@
 import pandas as pd
 import logging
 from dataclasses import dataclass
-from datetime import datetime, timedelta
-import os
-import pickle
+from datetime import datetime
 
-from src.commomacrossoverbacktest.commo_informations import CommodityInformation, ExponentialMovingAverageInformation
+from src.commomacrossoverbacktest.price_index import _naive_datetimes, _naive_timestamp
+from src.commomacrossoverbacktest.transaction_log import TransactionLog
+from src.commomacrossoverbacktest.position_book import PositionBook
 from pybacktestchain.broker import Broker, Position
-from pybacktestchain.utils import generate_random_name
-from pybacktestchain.data_module import DataModule
-from numba import jit
 
 
 @dataclass
@@ -19,20 +16,47 @@ class CommoBroker(Broker):
         Initializes the CommoBroker with a starting cash balance and necessary attributes.
         """
         super().__init__(cash)  # Initialize with parent Broker class
-        self.positions = {}  # Dictionary of current positions
+        self.positions = PositionBook()  # Current positions, stored in arrays with a cached valuation
         self.realized_pnl = []  # List of realized P&L
         self.portfolio_value = []  # Track portfolio value over time
+        self.last_signal_date = None  # Date of the last processed signals (cursor)
+        self.valuation_step = 0  # Key of the prices of the current batch of signals, for the cached valuation
 
-     def get_portfolio_value(self, market_prices: dict):
+     @property
+     def transaction_log(self) -> pd.DataFrame:
+        """
+        Transaction log as a DataFrame, built on demand from the columnar log.
+        """
+        return self.transactions.to_frame()
+
+     @transaction_log.setter
+     def transaction_log(self, value: pd.DataFrame):
+        # Called by the parent Broker at initialization with None or an empty DataFrame
+        self.transactions = TransactionLog.from_frame(value)
+
+     def log_transaction(self, date, action, ticker, quantity, price):
+        """
+        Logs the transaction in the columnar transaction log.
+        """
+        self.transactions.append(date, action, ticker, quantity, price, self.cash)
+
+     def get_transaction_log(self):
+        """
+        Returns the transaction log as a DataFrame.
+        """
+        return self.transaction_log
+
+     def get_portfolio_value(self, market_prices: dict, version=None):
         """
         Calculates the total portfolio value including cash and positions.
+
+        Positions without a market price are left out and a NaN price gives a NaN value.
+
+        :param market_prices: Dictionary of prices by ticker.
+        :param version: Optional key of the prices; repeated calls with the same key reuse
+            the valuation cached by the position book instead of marking the positions again.
         """
-        portfolio_value = self.cash
-        for ticker, position in self.positions.items():
-            current_price = market_prices.get(ticker)
-            if current_price is not None:
-                portfolio_value += position.quantity * current_price
-        return portfolio_value
+        return self.cash + self.positions.market_value(market_prices, version)
 
      def sell(self, ticker: str, quantity: int, price: float, date: datetime):
         """
@@ -68,7 +92,8 @@ class CommoBroker(Broker):
         total_cost = quantity * price
 
         # Calculate reserved cash (20% of the portfolio value)
-        reserve_cash = 0.2 * self.get_portfolio_value({})  # Reserved cash (20% of total portfolio value)
+        # Without market prices the portfolio value reduces to the cash balance
+        reserve_cash = 0.2 * self.cash  # Reserved cash (20% of total portfolio value)
         available_cash = self.cash + reserve_cash  # Include reserved cash in available funds
 
         if total_cost > available_cash:
@@ -98,26 +123,65 @@ class CommoBroker(Broker):
             logging.warning(f"Unable to buy any shares of {ticker} due to insufficient funds.")
 
 
-     def commo_ptf(self, t: datetime, signals: pd.DataFrame, prices: dict):
+     def commo_ptf(self, t: datetime, signals: pd.DataFrame, prices: dict, num_commodities: int = None):
         """
         Adjust the portfolio based on Buy/Sell signals.
 
+        Only the signals dated after the previous call and up to `t` are executed: the
+        broker keeps a cursor on the last processed date, so signals already traded
+        (or not yet known at `t`) are never replayed. This filtering is meant for callers
+        passing a full signal history; signals that are already new can be given to
+        execute_signals directly.
+
         :param t: Current datetime for the backtest.
-        :param signals: DataFrame containing 'ticker' and 'Signal' (-1 for Sell, 1 for Buy).
+        :param signals: DataFrame containing 'Date', 'ticker' and 'Signal' (-1 for Sell, 1 for Buy).
         :param prices: Dictionary of current prices for each ticker.
+        :param num_commodities: Number of commodities sharing the allocation (defaults to the tickers in `signals`).
         """
-        # S'assurer que seuls les signaux actifs sont traités
-        active_signals = signals[signals['Signal'] != 0]
-        active_signals = active_signals.sort_values(by='Date')
+        # Rien à filtrer lorsqu'aucun signal n'est transmis
+        t = _naive_timestamp(t)
+        if len(signals) == 0:
+            self.last_signal_date = t
+            return
+
+        if num_commodities is None:
+            num_commodities = len(signals['ticker'].unique())
+
+        # Ne garder que les signaux actifs apparus depuis le dernier pas
+        dates = _naive_datetimes(signals['Date'])
+        mask = (signals['Signal'] != 0).to_numpy() & (dates <= t).to_numpy()
+        if self.last_signal_date is not None:
+            mask &= (dates > self.last_signal_date).to_numpy()
+        self.last_signal_date = t
+
+        new_signals = signals[mask].sort_values(by='Date', kind='stable')
+        self.execute_signals(
+            t, new_signals['ticker'].to_numpy(), new_signals['Signal'].to_numpy(), prices, num_commodities
+        )
+
+     def execute_signals(self, t: datetime, tickers, signals, prices: dict, num_commodities: int):
+        """
+        Execute a batch of signals given as arrays.
+
+        :param t: Current datetime for the backtest.
+        :param tickers: Array of tickers, one per signal.
+        :param signals: Array of signals aligned with `tickers` (-1 for Sell, 1 for Buy).
+        :param prices: Dictionary of current prices for each ticker.
+        :param num_commodities: Number of commodities sharing the allocation.
+        """
+        # Rien à faire tant qu'aucun signal n'est disponible (ex. début du backtest)
+        if len(signals) == 0:
+            return
+
+        # Les prix ne changent pas pendant le lot : une seule valorisation complète
+        self.valuation_step += 1
+        version = self.valuation_step
 
         # Calcul de l'allocation par commodité
-        num_commodities = len(signals['ticker'].unique())
-        allocation_per_commodity = 0.8 * self.get_portfolio_value(prices) / num_commodities
+        allocation_per_commodity = 0.8 * self.get_portfolio_value(prices, version) / num_commodities
 
         # Traitement des signaux
-        for _, row in active_signals.iterrows():
-            ticker = row['ticker']
-            signal = row['Signal']
+        for ticker, signal in zip(tickers, signals):
             price = prices.get(ticker)
 
             # Sauter si le prix n'est pas disponible
@@ -145,7 +209,7 @@ class CommoBroker(Broker):
 
                     # Vérifier si on a assez de cash
                     if cost_to_cover > self.cash:
-                        reserve_cash = 0.2 * self.get_portfolio_value(prices)
+                        reserve_cash = 0.2 * self.get_portfolio_value(prices, version)
                         additional_cash_needed = cost_to_cover - self.cash
 
                         if additional_cash_needed <= reserve_cash:
@@ -166,7 +230,7 @@ class CommoBroker(Broker):
                     quantity_to_buy = int(allocation)
 
                     # Vérification pour ne pas dépasser le cash disponible, incluant la réserve
-                    reserve_cash = 0.2 * self.get_portfolio_value(prices)
+                    reserve_cash = 0.2 * self.get_portfolio_value(prices, version)
                     available_cash = self.cash + reserve_cash
 
                     if quantity_to_buy * price > available_cash:
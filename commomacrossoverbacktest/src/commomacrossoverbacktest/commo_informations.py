@@ -1,11 +1,35 @@
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timedelta
 from pybacktestchain.data_module import Information, DataModule
 from src.commomacrossoverbacktest.exponentialmovingaverage import ExponentialMovingAverage
+from src.commomacrossoverbacktest.indicator_cache import IndicatorCache, default_indicator_cache
+from src.commomacrossoverbacktest.panel_data import PanelData
+from src.commomacrossoverbacktest.price_index import PriceIndex, _naive_datetimes, _naive_timestamp
 import pandas as pd
+import numpy as np
 import logging
 
 
+def _cached_panel(info: Information, ticker_column: str) -> PanelData:
+    """
+    Panel store of an Information object, rebuilt only when its data changes.
+    """
+    key = (id(info.data_module.data), ticker_column)
+    if getattr(info, '_panel_key', None) != key:
+        info._panel = PanelData.from_frame(info.data_module.data, info.time_column, ticker_column, [info.adj_close_column])
+        info._price_index = PriceIndex.from_panel(info._panel, info.adj_close_column)
+        info._panel_key = key
+    return info._panel
+
+
+def _cached_price_index(info: Information, ticker_column: str) -> PriceIndex:
+    """
+    Price index of an Information object, sharing the axes of its panel store.
+    """
+    _cached_panel(info, ticker_column)
+    return info._price_index
+
+
 @dataclass
 class CommodityInformation(Information):
     def __init__(self, data_module, time_column, adj_close_column, commodity_column='commodity'):
@@ -17,9 +41,13 @@ class CommodityInformation(Information):
         """
         Retrieve the latest price for each commodity up to the given time.
         """
-        data = self.data_module.data[self.data_module.data[self.time_column] <= t]
-        prices = data.groupby(self.commodity_column)[self.adj_close_column].last()
-        return prices.to_dict()
+        return _cached_price_index(self, self.commodity_column).as_of(t)
+
+    def get_price_panel(self, start: datetime, end: datetime, freq: str = 'D') -> pd.DataFrame:
+        """
+        Retrieve the latest price for each commodity at every date between start and end.
+        """
+        return _cached_price_index(self, self.commodity_column).panel(start, end, freq=freq)
     
 
 @dataclass
@@ -27,39 +55,147 @@ class ExponentialMovingAverageInformation(Information):
     short_window: int = 5
     medium_window: int = 50
     long_window: int = 250
+    bar_freq: str = None  # Fréquence des barres (ex. 'min', 'h') pour des fenêtres exprimées en durées ('4h')
+    indicator_cache: IndicatorCache = None  # Cache des séries EMA, partagé par tout le processus par défaut
 
-    def compute_information(self, t: datetime):
+    def ema_calculator(self) -> ExponentialMovingAverage:
         """
-        Compute EMAs and generate signals for the entire dataset.
+        EMA calculator configured with the windows of this information class, in bars.
         """
-        # Use all available data directly, no slicing
-        data = self.data_module.data  
-
-        # Ensure that the data is sorted by the time column
-        data = data.sort_values(by=self.time_column)
-
-        # Initialize the Exponential Moving Average (EMA) calculator
-        ema_calculator = ExponentialMovingAverage(
+        return ExponentialMovingAverage(
             short_window=self.short_window,
             medium_window=self.medium_window,
-            long_window=self.long_window
+            long_window=self.long_window,
+            bar_freq=self.bar_freq
         )
 
-        # Calculate EMAs for the entire dataset
-        data = ema_calculator.compute_ema(data, price_column=self.adj_close_column)
+    def signal_panel(self) -> PanelData:
+        """
+        Panel store of the data with the EMA and crossover signal fields of these windows.
 
-        # Generate buy/sell signals based on the computed EMAs
-        signals = ema_calculator.generate_signals(data)
+        The store is built once per dataset; the EMA fields are recomputed only when the
+        windows change, reusing the series already computed for the same spans.
+        """
+        panel = _cached_panel(self, self.company_column)
+        ema_key = (self.short_window, self.medium_window, self.long_window, self.bar_freq)
+        if getattr(self, '_ema_key', None) != (panel, ema_key):
+            ema_calculator = self.ema_calculator()
+            cache = self.indicator_cache if self.indicator_cache is not None else default_indicator_cache()
+            emas = ema_calculator.compute_ema_panel(
+                panel.field(self.adj_close_column), panel.present, cache=cache, tickers=panel.tickers,
+                versions=panel.versions(self.adj_close_column), price_column=self.adj_close_column
+            )
+            panel.add_field('EMA_Short', emas[0])
+            panel.add_field('EMA_Medium', emas[1])
+            panel.add_field('EMA_Long', emas[2])
+            panel.add_field('Signal', ema_calculator.generate_signal_panel(emas, panel.present))
+            self._ema_key = (panel, ema_key)
+        return panel
 
-        # Add the 'ticker' column to the signals DataFrame if it is missing
-        if 'ticker' not in signals.columns:
-            signals['ticker'] = data['ticker']
+    def _signal_frame(self, panel: PanelData) -> pd.DataFrame:
+        """
+        Non-zero signals of a signal panel as rows, ordered by date then ticker.
+        """
+        signal = panel.field('Signal')
+        rows, columns = np.nonzero(signal)
+        values = signal[rows, columns].astype(np.int64)
+        return pd.DataFrame({
+            'Date': panel.dates[rows],
+            'Signal': values,
+            'Position': np.where(values == 1, 'Buy', 'Sell').astype(object),
+            'ticker': np.asarray(panel.tickers, dtype=object)[columns]
+        })
+
+    def compute_information(self, t: datetime):
+        """
+        Compute EMAs and generate signals for the entire dataset.
+        """
+        # EMAs and signals come from the panel store, computed once per dataset and windows
+        panel = self.signal_panel()
+        data = self.data_module.data
+
+        # Full dataset sorted by time, with the EMAs of each row
+        order = np.argsort(_naive_datetimes(data[self.time_column]).to_numpy(), kind='stable')
+        full_data = data.iloc[order].assign(
+            EMA_Short=panel.gather('EMA_Short')[order],
+            EMA_Medium=panel.gather('EMA_Medium')[order],
+            EMA_Long=panel.gather('EMA_Long')[order]
+        )
 
         # Return the required information set
         information_set = {
-            'signals': signals[['Date', 'Signal', 'Position', 'ticker']],  # Includes key columns: Date, Signal, etc.
-            'full_data': data  # Full dataset, including EMAs and signals
+            'signals': self._signal_frame(panel),  # Includes key columns: Date, Signal, etc.
+            'full_data': full_data  # Full dataset, including EMAs
         }
 
         return information_set
 
+
+@dataclass
+class PointInTimeEMAInformation(ExponentialMovingAverageInformation):
+    """
+    Stateful version of ExponentialMovingAverageInformation.
+
+    EMAs and crossover signals are computed once over the loaded history, as fields of
+    the panel store; each call to compute_information(t) then only returns the signals
+    and panel rows dated on or before `t`, so the backtest never sees future signals
+    and a step costs a binary search and a few array views instead of a full recompute.
+    """
+
+    def __post_init__(self):
+        self._state_key = None
+        self._signals = None
+        self._signal_dates = None
+        self._signal_panel = None
+        self._last_t = None
+
+    def _build(self):
+        """
+        Compute EMAs and signals for the whole dataset and index them by date.
+        """
+        panel = self.signal_panel()
+        self._signals = self._signal_frame(panel)
+        self._signal_dates = self._signals['Date'].to_numpy()
+        self._signal_panel = panel
+
+    def get_prices(self, t: datetime):
+        """
+        Retrieve the latest price of each ticker observed within [t - s, t].
+
+        Prices dated at `t` are visible, so a signal dated `t` (computed on the close of
+        `t`) is executed at that close and never at an earlier price.
+        """
+        return _cached_price_index(self, self.company_column).as_of(t, max_age=self.s)
+
+    def compute_information(self, t: datetime):
+        """
+        Return the signals and panel data available as of `t`.
+
+        'new_signals' only holds the signals dated after the previous call, so that
+        consecutive calls with increasing dates hand out each signal exactly once.
+        'panel' is a PanelData view of the dates up to `t`, with the close, EMA and
+        signal fields.
+        """
+        # Rebuild only if the data or the EMA windows changed since the last call
+        state_key = (id(self.data_module.data), self.short_window, self.medium_window, self.long_window, self.bar_freq)
+        if state_key != self._state_key:
+            self._build()
+            self._state_key = state_key
+            self._last_t = None
+
+        t = _naive_timestamp(t).to_datetime64()
+        n_signals = np.searchsorted(self._signal_dates, t, side='right')
+
+        # Signals already handed out by the previous call (restart if time goes backwards)
+        n_seen = 0
+        if self._last_t is not None and self._last_t <= t:
+            n_seen = np.searchsorted(self._signal_dates, self._last_t, side='right')
+        self._last_t = t
+
+        information_set = {
+            'signals': self._signals.iloc[:n_signals],
+            'new_signals': self._signals.iloc[n_seen:n_signals],
+            'panel': self._signal_panel.until(self._signal_panel.rows_until(t))
+        }
+
+        return information_set
@@ -0,0 +1,310 @@
+import hashlib
+import json
+import logging
+import os
+from urllib.parse import quote
+import numpy as np
+import pandas as pd
+
+from src.commomacrossoverbacktest.array_io import save_array
+from src.commomacrossoverbacktest.price_index import _naive_datetimes
+
+PRICE_COLUMNS = ('Open', 'High', 'Low', 'Close')
+ROLL_RULES = ('volume', 'open_interest', 'calendar')
+ADJUSTMENTS = ('ratio', 'difference', None)
+
+
+def read_contract_files(directory: str, time_column: str = 'Date') -> dict:
+    """
+    Read the contract files of one generic ticker: one CSV file per contract, named
+    after the contract (e.g. GCZ23.csv), with a date column and OHLC, volume and
+    optionally open interest columns.
+
+    :return: Dictionary contract -> DataFrame indexed by timezone-naive date, sorted.
+    """
+    contracts = {}
+    for name in sorted(os.listdir(directory)):
+        stem, extension = os.path.splitext(name)
+        if extension.lower() != '.csv':
+            continue
+        df = pd.read_csv(os.path.join(directory, name))
+        df.index = pd.DatetimeIndex(_naive_datetimes(df.pop(time_column)))
+        contracts[stem] = df[~df.index.duplicated(keep='last')].sort_index()
+    return contracts
+
+
+def _order_contracts(contracts: dict) -> list:
+    """
+    Contract names by expiry, approximated by their last and first dates.
+    """
+    return sorted(
+        (name for name, df in contracts.items() if len(df)),
+        key=lambda name: (contracts[name].index[-1], contracts[name].index[0], name)
+    )
+
+
+def _roll_date(current: pd.DataFrame, following: pd.DataFrame, after, rule: str, roll_days: int,
+               volume_column: str, open_interest_column: str):
+    """
+    First date traded on `following` when rolling from `current`, after the previous roll.
+    """
+    common = current.index.intersection(following.index)
+    common = common[common > after]
+
+    if rule == 'calendar':
+        # A fixed number of trading days before the last date of the current contract
+        dates = current.index[current.index > after]
+        target = dates[max(len(dates) - 1 - roll_days, 0)] if len(dates) else following.index[-1]
+        candidates = common[common >= target]
+    else:
+        column = volume_column if rule == 'volume' else open_interest_column
+        if column not in current.columns or column not in following.columns:
+            raise ValueError(f"Roll rule '{rule}' needs a '{column}' column in every contract file.")
+        # Roll once the following contract is more liquid than the current one
+        liquid = following.loc[common, column].to_numpy() > current.loc[common, column].to_numpy()
+        candidates = common[liquid]
+
+    if len(candidates):
+        return candidates[0]
+    if len(common):
+        # The current contract stops trading first: roll on the last date both trade
+        return common[-1]
+    # No overlap: switch on the first date of the following contract
+    return following.index[following.index > after][0]
+
+
+def build_continuous(contracts: dict, ticker: str, rule: str = 'volume', adjustment: str = 'ratio',
+                     roll_days: int = 5, price_columns=PRICE_COLUMNS, volume_column: str = 'Volume',
+                     open_interest_column: str = 'Open Interest'):
+    """
+    Stitch individual contracts into one back-adjusted continuous series.
+
+    Each roll is measured on its roll date, with the closes of the old and new
+    contracts; every price before the roll is then scaled by new / old ('ratio',
+    which keeps returns) or shifted by new - old ('difference', which keeps price
+    changes), so that the series has no roll gaps and its last segment is unadjusted.
+
+    :param contracts: Dictionary contract -> DataFrame indexed by date, e.g. from read_contract_files.
+    :param ticker: Generic ticker of the continuous series (e.g. 'GC=F').
+    :param rule: 'volume' or 'open_interest' (roll when the next contract is more
+                 liquid), or 'calendar' (roll `roll_days` trading days before the
+                 current contract's last date).
+    :param adjustment: 'ratio', 'difference' or None (raw prices, with roll gaps).
+    :return: The long-format series ('Date', the contract columns, 'contract' and
+             'ticker') and the roll schedule ('Date', 'From', 'To', 'From Price',
+             'To Price', 'Adjustment': the ratio or difference applied before the
+             roll, NaN without adjustment).
+    """
+    if rule not in ROLL_RULES:
+        raise ValueError(f"Unknown roll rule '{rule}', expected one of {ROLL_RULES}.")
+    if adjustment not in ADJUSTMENTS:
+        raise ValueError(f"Unknown adjustment '{adjustment}', expected one of {ADJUSTMENTS}.")
+
+    names = _order_contracts(contracts)
+    if not names:
+        schedule = pd.DataFrame(columns=['Date', 'From', 'To', 'From Price', 'To Price', 'Adjustment'])
+        return pd.DataFrame(columns=['Date', 'contract', 'ticker']), schedule
+
+    # Walk the contracts by expiry, skipping those that end before the last roll
+    segments = [names[0]]
+    rolls = []
+    after = pd.Timestamp.min
+    for name in names[1:]:
+        current, following = contracts[segments[-1]], contracts[name]
+        if not (following.index > after).any():
+            continue
+        roll = _roll_date(current, following, after, rule, roll_days, volume_column, open_interest_column)
+        from_price = current['Close'].asof(roll)
+        rolls.append((roll, segments[-1], name, from_price, following.loc[roll, 'Close']))
+        segments.append(name)
+        after = roll
+
+    # Rows of each contract between its roll dates
+    bounds = [pd.Timestamp.min] + [roll for roll, _, _, _, _ in rolls] + [pd.Timestamp.max]
+    parts = []
+    for k, name in enumerate(segments):
+        df = contracts[name]
+        part = df[(df.index >= bounds[k]) & (df.index < bounds[k + 1])].copy()
+        part['contract'] = name
+        part['segment'] = k
+        parts.append(part)
+    series = pd.concat(parts)
+
+    # Adjustment of each roll, accumulated from the last contract backwards
+    from_prices = np.array([roll[3] for roll in rolls], dtype=np.float64)
+    to_prices = np.array([roll[4] for roll in rolls], dtype=np.float64)
+    segment = series.pop('segment').to_numpy()
+    if adjustment == 'ratio':
+        gaps = to_prices / from_prices
+        factors = np.append(np.cumprod(gaps[::-1])[::-1], 1.0)
+        for column in price_columns:
+            if column in series.columns:
+                series[column] = series[column].to_numpy(dtype=np.float64) * factors[segment]
+    elif adjustment == 'difference':
+        gaps = to_prices - from_prices
+        offsets = np.append(np.cumsum(gaps[::-1])[::-1], 0.0)
+        for column in price_columns:
+            if column in series.columns:
+                series[column] = series[column].to_numpy(dtype=np.float64) + offsets[segment]
+    else:
+        gaps = np.full(len(rolls), np.nan)
+
+    series.index.name = 'Date'
+    series = series.reset_index()
+    series['ticker'] = ticker
+
+    schedule = pd.DataFrame({
+        'Date': pd.DatetimeIndex([roll for roll, _, _, _, _ in rolls]),
+        'From': [roll[1] for roll in rolls],
+        'To': [roll[2] for roll in rolls],
+        'From Price': from_prices,
+        'To Price': to_prices,
+        'Adjustment': gaps
+    })
+    return series, schedule
+
+
+class ContinuousContractStore:
+    """
+    Disk cache of continuous series built from local contract files.
+
+    The contract files of a generic ticker are read from `source_directory/<ticker>/`
+    (see read_contract_files). The continuous series is stored in
+    `cache_directory/<ticker>/` with one memory-mappable .npy file per column, its
+    roll schedule in roll_schedule.csv and a meta.json file recording the key of the
+    build: the contract files (names, sizes and modification times) and the roll and
+    adjustment settings. A series is rebuilt only when that key changes, so backtests
+    and sweeps load it without touching the contract files and without any network
+    access.
+
+    :param source_directory: Folder with one sub-folder of contract files per generic ticker.
+    :param cache_directory: Folder of the cache.
+    :param rule: Roll rule, see build_continuous.
+    :param adjustment: Back-adjustment, see build_continuous.
+    :param roll_days: Trading days before the last date of a contract for the 'calendar' rule.
+    """
+
+    def __init__(self, source_directory: str, cache_directory: str = 'continuous_cache', rule: str = 'volume',
+                 adjustment: str = 'ratio', roll_days: int = 5, volume_column: str = 'Volume',
+                 open_interest_column: str = 'Open Interest'):
+        self.source_directory = source_directory
+        self.cache_directory = cache_directory
+        self.rule = rule
+        self.adjustment = adjustment
+        self.roll_days = roll_days
+        self.volume_column = volume_column
+        self.open_interest_column = open_interest_column
+
+    def _source(self, ticker: str) -> str:
+        return os.path.join(self.source_directory, quote(ticker, safe=''))
+
+    def _folder(self, ticker: str) -> str:
+        return os.path.join(self.cache_directory, quote(ticker, safe=''))
+
+    def _read_meta(self, ticker: str) -> dict:
+        path = os.path.join(self._folder(ticker), 'meta.json')
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def build_key(self, ticker: str) -> str:
+        """
+        Fingerprint of the contract files of a ticker and of the build settings.
+        """
+        files = []
+        source = self._source(ticker)
+        for name in sorted(os.listdir(source)):
+            stat = os.stat(os.path.join(source, name))
+            files.append([name, stat.st_size, stat.st_mtime_ns])
+        settings = [self.rule, self.adjustment, self.roll_days, self.volume_column, self.open_interest_column]
+        return hashlib.blake2b(json.dumps([files, settings]).encode(), digest_size=16).hexdigest()
+
+    def build(self, ticker: str, force: bool = False) -> bool:
+        """
+        Build and cache the continuous series of a ticker if its contract files or the
+        settings changed since the cached build.
+
+        :return: Whether the series was rebuilt.
+        """
+        key = self.build_key(ticker)
+        if not force and self._read_meta(ticker).get('key') == key:
+            return False
+
+        series, schedule = build_continuous(
+            read_contract_files(self._source(ticker)), ticker, self.rule, self.adjustment, self.roll_days,
+            volume_column=self.volume_column, open_interest_column=self.open_interest_column
+        )
+        folder = self._folder(ticker)
+        os.makedirs(folder, exist_ok=True)
+
+        columns = [c for c in series.columns if c not in ('Date', 'contract', 'ticker')
+                   and pd.api.types.is_numeric_dtype(series[c])]
+        contract_codes, contract_names = pd.factorize(series['contract'])
+        save_array(os.path.join(folder, 'Date.npy'), pd.DatetimeIndex(series['Date']).asi8)
+        save_array(os.path.join(folder, 'contract.npy'), contract_codes.astype(np.int32))
+        for column in columns:
+            save_array(os.path.join(folder, quote(column, safe='') + '.npy'), series[column].to_numpy(dtype=np.float64))
+
+        path = os.path.join(folder, 'roll_schedule.csv')
+        schedule.to_csv(path + '.tmp', index=False)
+        os.replace(path + '.tmp', path)
+
+        # Write the metadata last, through a temporary file, so that it never describes missing files
+        meta = {'key': key, 'columns': columns, 'contracts': [str(name) for name in contract_names]}
+        path = os.path.join(folder, 'meta.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(path + '.tmp', path)
+
+        logging.info(f"Built continuous series of {ticker}: {len(series)} rows, {len(schedule)} rolls.")
+        return True
+
+    def load(self, ticker: str) -> pd.DataFrame:
+        """
+        Cached continuous series of a ticker, built first if needed.
+        """
+        if os.path.isdir(self._source(ticker)):
+            self.build(ticker)
+        meta = self._read_meta(ticker)
+        if not meta:
+            return pd.DataFrame()
+
+        folder = self._folder(ticker)
+        df = pd.DataFrame({'Date': pd.to_datetime(np.load(os.path.join(folder, 'Date.npy'), mmap_mode='r'))})
+        for column in meta['columns']:
+            df[column] = np.load(os.path.join(folder, quote(column, safe='') + '.npy'), mmap_mode='r')
+        codes = np.load(os.path.join(folder, 'contract.npy'))
+        df['contract'] = np.asarray(meta['contracts'], dtype=object)[codes]
+        df['ticker'] = ticker
+        return df
+
+    def roll_schedule(self, ticker: str) -> pd.DataFrame:
+        """
+        Roll schedule of the cached series of a ticker, built first if needed.
+        """
+        if os.path.isdir(self._source(ticker)):
+            self.build(ticker)
+        return pd.read_csv(os.path.join(self._folder(ticker), 'roll_schedule.csv'), parse_dates=['Date'])
+
+    def get_stock_data(self, ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        Continuous series of one ticker between start_date (included) and end_date (excluded).
+        """
+        df = self.load(ticker)
+        if df.empty:
+            return df
+        return df[(df['Date'] >= pd.Timestamp(start_date)) & (df['Date'] < pd.Timestamp(end_date))].reset_index(drop=True)
+
+    def get_stocks_data(self, tickers: list, start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        Drop-in replacement for pybacktestchain's get_stocks_data, e.g. as Backtest.data_loader.
+        """
+        dfs = []
+        for ticker in tickers:
+            df = self.get_stock_data(ticker, start_date, end_date)
+            if df.empty:
+                logging.warning(f"No continuous series for {ticker}")
+            else:
+                dfs.append(df)
+        return pd.concat(dfs) if dfs else pd.DataFrame()
@@ -0,0 +1,170 @@
+import json
+import logging
+import os
+from urllib.parse import quote
+import numpy as np
+import pandas as pd
+
+from src.commomacrossoverbacktest.array_io import save_array
+
+
+def _download(ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
+    """
+    Default fetcher: download one ticker with pybacktestchain (imported lazily, so
+    that an offline cache never loads the network stack).
+    """
+    from pybacktestchain.data_module import get_stock_data
+    return get_stock_data(ticker, start_date, end_date)
+
+
+def _missing_ranges(coverage: list, start: pd.Timestamp, end: pd.Timestamp) -> list:
+    """
+    Parts of [start, end) not covered by the given sorted, disjoint [start, end) ranges.
+    """
+    missing = []
+    cursor = start
+    for covered_start, covered_end in coverage:
+        if covered_end <= cursor:
+            continue
+        if covered_start >= end:
+            break
+        if covered_start > cursor:
+            missing.append((cursor, covered_start))
+        cursor = max(cursor, covered_end)
+        if cursor >= end:
+            break
+    if cursor < end:
+        missing.append((cursor, end))
+    return missing
+
+
+def _merge_ranges(ranges: list) -> list:
+    """
+    Sort [start, end) ranges and merge the ones that overlap or touch.
+    """
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class MarketDataCache:
+    """
+    Persistent local cache of daily market data, in front of get_stocks_data.
+
+    Each ticker is stored in its own folder with one memory-mappable .npy file per
+    column and a meta.json file recording the date ranges already fetched. A request
+    only fetches the parts of its date range that are not covered yet. In offline
+    mode the fetcher is never called and only cached data is returned, which allows
+    running backtests from a local fixture store without network access.
+
+    :param directory: Folder of the cache.
+    :param fetch: Function (ticker, start_date, end_date) -> DataFrame used to fill the cache.
+    :param offline: Never call `fetch` if True.
+    """
+
+    def __init__(self, directory: str = 'data_cache', fetch=None, offline: bool = False):
+        self.directory = directory
+        self.fetch = fetch if fetch is not None else _download
+        self.offline = offline
+
+    def _ticker_directory(self, ticker: str) -> str:
+        return os.path.join(self.directory, quote(ticker, safe=''))
+
+    def _read_meta(self, ticker: str) -> dict:
+        path = os.path.join(self._ticker_directory(ticker), 'meta.json')
+        if not os.path.exists(path):
+            return {'columns': [], 'tz': None, 'coverage': []}
+        with open(path) as f:
+            return json.load(f)
+
+    def _coverage(self, meta: dict) -> list:
+        return [(pd.Timestamp(start), pd.Timestamp(end)) for start, end in meta['coverage']]
+
+    def load(self, ticker: str) -> pd.DataFrame:
+        """
+        Every cached row of a ticker, sorted by date.
+        """
+        meta = self._read_meta(ticker)
+        folder = self._ticker_directory(ticker)
+        if not meta['columns']:
+            return pd.DataFrame()
+
+        dates = pd.to_datetime(np.load(os.path.join(folder, 'Date.npy'), mmap_mode='r'), utc=True)
+        dates = dates.tz_convert(meta['tz']) if meta['tz'] else dates.tz_localize(None)
+        df = pd.DataFrame({'Date': dates})
+        for column in meta['columns']:
+            df[column] = np.load(os.path.join(folder, quote(column, safe='') + '.npy'), mmap_mode='r')
+        df['ticker'] = ticker
+        return df
+
+    def store(self, ticker: str, df: pd.DataFrame, start_date: str, end_date: str):
+        """
+        Merge rows fetched for [start_date, end_date) into the cache of a ticker.
+
+        The range is recorded as covered even if it returned no rows (weekends, holidays,
+        dates before the first quote), except for the days from today on, whose data may
+        not be published yet and are fetched again next time.
+        """
+        meta = self._read_meta(ticker)
+        folder = self._ticker_directory(ticker)
+        os.makedirs(folder, exist_ok=True)
+
+        if not df.empty:
+            merged = pd.concat([self.load(ticker), df], ignore_index=True)
+            merged = merged.drop_duplicates(subset='Date', keep='last').sort_values(by='Date')
+            columns = [c for c in merged.columns if c not in ('Date', 'ticker') and pd.api.types.is_numeric_dtype(merged[c])]
+
+            dates = pd.DatetimeIndex(merged['Date'])
+            meta['tz'] = str(dates.tz) if dates.tz is not None else None
+            save_array(os.path.join(folder, 'Date.npy'), dates.asi8)
+            for column in columns:
+                save_array(os.path.join(folder, quote(column, safe='') + '.npy'), merged[column].to_numpy())
+            meta['columns'] = columns
+
+        start, end = pd.Timestamp(start_date), min(pd.Timestamp(end_date), pd.Timestamp.today().normalize())
+        coverage = self._coverage(meta) + ([(start, end)] if end > start else [])
+        meta['coverage'] = [[str(start.date()), str(end.date())] for start, end in _merge_ranges(coverage)]
+
+        # Write the metadata last, through a temporary file, so that it never describes missing files
+        path = os.path.join(folder, 'meta.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(path + '.tmp', path)
+
+    def get_stock_data(self, ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        Data of one ticker between start_date (included) and end_date (excluded).
+        """
+        start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        missing = _missing_ranges(self._coverage(self._read_meta(ticker)), start, end)
+
+        if missing and self.offline:
+            logging.warning(f"Offline cache has no data for {ticker} on {len(missing)} date range(s).")
+        elif missing:
+            for missing_start, missing_end in missing:
+                fetched_start, fetched_end = str(missing_start.date()), str(missing_end.date())
+                self.store(ticker, self.fetch(ticker, fetched_start, fetched_end), fetched_start, fetched_end)
+
+        df = self.load(ticker)
+        if df.empty:
+            return df
+        local_dates = df['Date'].dt.tz_localize(None) if df['Date'].dt.tz is not None else df['Date']
+        return df[(local_dates >= start) & (local_dates < end)].reset_index(drop=True)
+
+    def get_stocks_data(self, tickers: list, start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        Drop-in replacement for pybacktestchain's get_stocks_data, served from the cache.
+        """
+        dfs = []
+        for ticker in tickers:
+            try:
+                df = self.get_stock_data(ticker, start_date, end_date)
+                if not df.empty:
+                    dfs.append(df)
+            except Exception:
+                logging.warning(f"Stock {ticker} not found")
+        return pd.concat(dfs) if dfs else pd.DataFrame()
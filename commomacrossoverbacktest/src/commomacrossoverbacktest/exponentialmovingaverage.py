@@ -1,10 +1,305 @@
 import pandas as pd
 import numpy as np
-import math
-import yfinance as yf
-import datetime
-import matplotlib.pyplot as plt
 from dataclasses import dataclass
+from numba import njit
+
+from src.commomacrossoverbacktest.indicator_cache import IndicatorCache, data_version
+
+
+@njit(cache=True)
+def _crossover_kernel(ema_short, ema_medium, ema_long, group_starts):
+    """
+    Crossover state machine over EMA arrays holding several tickers back to back.
+
+    :param ema_short: Short EMA values, sorted by ticker then date, without NaNs.
+    :param ema_medium: Medium EMA values aligned with ema_short.
+    :param ema_long: Long EMA values aligned with ema_short.
+    :param group_starts: Index of the first row of each ticker block.
+    :return: Array of signals (1 for Buy, -1 for Sell, 0 otherwise).
+    """
+    n = ema_short.shape[0]
+    signals = np.zeros(n, dtype=np.int64)
+    n_groups = group_starts.shape[0]
+
+    for g in range(n_groups):
+        start = group_starts[g]
+        end = group_starts[g + 1] if g + 1 < n_groups else n
+
+        # Current position of the ticker: 1 for Long, -1 for Short, 0 for None
+        position = 0
+
+        for i in range(start + 1, end):
+            # Buy signal: EMA_Short crosses above EMA_Medium and EMA_Long
+            if (
+                ema_short[i] > ema_medium[i] > ema_long[i] and
+                ema_short[i - 1] <= ema_medium[i - 1] and
+                position != 1
+            ):
+                signals[i] = 1
+                position = 1
+
+            # Sell signal: EMA_Short crosses below EMA_Medium and EMA_Long
+            elif (
+                ema_short[i] < ema_medium[i] < ema_long[i] and
+                ema_short[i - 1] >= ema_medium[i - 1] and
+                position != -1
+            ):
+                signals[i] = -1
+                position = -1
+
+    return signals
+
+
+@njit(cache=True)
+def _ema_step(weighted, old_wt, alpha, cur):
+    """
+    One update of pandas' ewm(adjust=False).mean(): leading NaNs stay NaN and a
+    missing price carries the previous value forward while the old weight decays.
+
+    :return: The new (weighted, old_wt) state.
+    """
+    if weighted == weighted:
+        old_wt *= 1.0 - alpha
+        if cur == cur:
+            if weighted != cur:
+                weighted = old_wt * weighted + alpha * cur
+                weighted /= old_wt + alpha
+            old_wt = 1.0
+    elif cur == cur:
+        weighted = cur
+    return weighted, old_wt
+
+
+@njit(cache=True)
+def _ema_kernel(prices, group_starts, alphas):
+    """
+    Exponential moving averages for several spans in a single pass.
+
+    :param prices: Price array holding several tickers back to back.
+    :param group_starts: Index of the first row of each ticker block.
+    :param alphas: Smoothing factor of each span.
+    :return: Array of shape (len(prices), len(alphas)) with one EMA per column.
+    """
+    n = prices.shape[0]
+    k = alphas.shape[0]
+    out = np.empty((n, k))
+    weighted = np.empty(k)
+    old_wt = np.empty(k)
+    n_groups = group_starts.shape[0]
+
+    for g in range(n_groups):
+        start = group_starts[g]
+        end = group_starts[g + 1] if g + 1 < n_groups else n
+
+        # The EMA state is reset at the start of every ticker
+        for j in range(k):
+            weighted[j] = np.nan
+            old_wt[j] = 1.0
+
+        for i in range(start, end):
+            for j in range(k):
+                weighted[j], old_wt[j] = _ema_step(weighted[j], old_wt[j], alphas[j], prices[i])
+                out[i, j] = weighted[j]
+
+    return out
+
+
+@njit(cache=True)
+def _ema_state_kernel(prices, codes, alphas, weighted, old_wt):
+    """
+    Exponential moving averages of rows in date order, several tickers interleaved.
+
+    :param prices: Prices sorted by date.
+    :param codes: Ticker code of each row.
+    :param alphas: Smoothing factor of each span.
+    :param weighted: EMA state per ticker code and span, updated in place.
+    :param old_wt: Weight state per ticker code and span, updated in place.
+    :return: Array of shape (len(prices), len(alphas)) with one EMA per column.
+    """
+    n = prices.shape[0]
+    k = alphas.shape[0]
+    out = np.empty((n, k))
+
+    for i in range(n):
+        c = codes[i]
+        for j in range(k):
+            weighted[c, j], old_wt[c, j] = _ema_step(weighted[c, j], old_wt[c, j], alphas[j], prices[i])
+            out[i, j] = weighted[c, j]
+
+    return out
+
+
+@njit(cache=True)
+def _crossover_state_kernel(ema_short, ema_medium, ema_long, codes, previous_short, previous_medium, position):
+    """
+    Crossover state machine over rows in date order, several tickers interleaved.
+
+    Rows without complete EMAs are skipped. The last complete EMAs and the position of
+    each ticker code are kept in the state arrays, updated in place.
+
+    :return: Array of signals (1 for Buy, -1 for Sell, 0 otherwise).
+    """
+    n = ema_short.shape[0]
+    signals = np.zeros(n, dtype=np.int64)
+
+    for i in range(n):
+        c = codes[i]
+        short = ema_short[i]
+        medium = ema_medium[i]
+        long = ema_long[i]
+        if short != short or medium != medium or long != long:
+            continue
+
+        # previous_short is NaN until the ticker has a first complete row
+        if previous_short[c] == previous_short[c]:
+            # Buy signal: EMA_Short crosses above EMA_Medium and EMA_Long
+            if short > medium > long and previous_short[c] <= previous_medium[c] and position[c] != 1:
+                signals[i] = 1
+                position[c] = 1
+            # Sell signal: EMA_Short crosses below EMA_Medium and EMA_Long
+            elif short < medium < long and previous_short[c] >= previous_medium[c] and position[c] != -1:
+                signals[i] = -1
+                position[c] = -1
+        previous_short[c] = short
+        previous_medium[c] = medium
+
+    return signals
+
+
+@njit(cache=True)
+def _ema_panel_kernel(prices, present, alphas):
+    """
+    Exponential moving averages of a dates x tickers price panel.
+
+    Cells where `present` is False are skipped, as if the row did not exist in the
+    long-format data; they hold the last EMA value of the ticker.
+
+    :return: Array of shape (len(alphas), n_dates, n_tickers).
+    """
+    n_dates, n_columns = prices.shape
+    k = alphas.shape[0]
+    out = np.empty((k, n_dates, n_columns))
+    weighted = np.empty(n_columns)
+    old_wt = np.empty(n_columns)
+
+    for j in range(k):
+        weighted[:] = np.nan
+        old_wt[:] = 1.0
+        for i in range(n_dates):
+            for c in range(n_columns):
+                if present[i, c]:
+                    weighted[c], old_wt[c] = _ema_step(weighted[c], old_wt[c], alphas[j], prices[i, c])
+                out[j, i, c] = weighted[c]
+
+    return out
+
+
+@njit(cache=True)
+def _crossover_panel_kernel(ema_short, ema_medium, ema_long, present):
+    """
+    Crossover state machine over dates x tickers EMA panels.
+
+    Each column only looks at its present rows with complete EMAs, which matches
+    generate_signals on the equivalent long-format data.
+
+    :return: Array of signals (1 for Buy, -1 for Sell, 0 otherwise) with the panel's shape.
+    """
+    n_dates, n_columns = ema_short.shape
+    signals = np.zeros((n_dates, n_columns), dtype=np.int8)
+    position = np.zeros(n_columns, dtype=np.int8)
+    previous = np.full(n_columns, -1, dtype=np.int64)
+
+    for i in range(n_dates):
+        for c in range(n_columns):
+            short = ema_short[i, c]
+            medium = ema_medium[i, c]
+            long = ema_long[i, c]
+            if not present[i, c] or short != short or medium != medium or long != long:
+                continue
+
+            p = previous[c]
+            if p >= 0:
+                # Buy signal: EMA_Short crosses above EMA_Medium and EMA_Long
+                if short > medium > long and ema_short[p, c] <= ema_medium[p, c] and position[c] != 1:
+                    signals[i, c] = 1
+                    position[c] = 1
+                # Sell signal: EMA_Short crosses below EMA_Medium and EMA_Long
+                elif short < medium < long and ema_short[p, c] >= ema_medium[p, c] and position[c] != -1:
+                    signals[i, c] = -1
+                    position[c] = -1
+            previous[c] = i
+
+    return signals
+
+
+def _group_starts(codes: np.ndarray) -> np.ndarray:
+    """
+    Index of the first row of each run of equal codes.
+    """
+    if len(codes) == 0:
+        return np.empty(0, dtype=np.int64)
+    return np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]).astype(np.int64)
+
+
+def _span_to_alpha(span: float) -> float:
+    """
+    Smoothing factor used by pandas for a given span.
+    """
+    com = (span - 1) / 2.0
+    return 1.0 / (1.0 + com)
+
+
+def _span_in_bars(span, bar_freq: str = None) -> float:
+    """
+    Convert an EMA span given in bars (a number) or in time units (e.g. '4h') to bars.
+
+    :param span: Number of bars, or a duration understood by pd.Timedelta.
+    :param bar_freq: Fixed bar frequency (e.g. 'min', '5min', 'h'), required for durations.
+    """
+    if isinstance(span, (int, float, np.integer, np.floating)):
+        return span
+    if bar_freq is None:
+        raise ValueError(f"A bar frequency is required to express the span {span!r} in bars.")
+    try:
+        bar = pd.Timedelta(pd.tseries.frequencies.to_offset(bar_freq))
+    except ValueError:
+        raise ValueError(f"The bar frequency {bar_freq!r} is not a fixed duration.")
+    bars = pd.Timedelta(span) / bar
+    if bars < 1:
+        raise ValueError(f"The span {span!r} is shorter than one bar of {bar_freq!r}.")
+    return bars
+
+
+def window_spans(windows, bar_freq: str = None) -> list:
+    """
+    Materialize an iterable of (short_window, medium_window, long_window) triples as
+    spans in bars, checking each of them.
+
+    :param windows: Iterable of triples of numbers of bars, or of durations such as '4h'.
+    :param bar_freq: Fixed bar frequency of the data, required for durations.
+    :return: List of (short, medium, long) spans in (possibly fractional) bars.
+    """
+    spans = []
+    for window in windows:
+        window = tuple(window)
+        if len(window) != 3:
+            raise ValueError(f"Expected a (short_window, medium_window, long_window) triple, got {window!r}.")
+        triple = tuple(_span_in_bars(span, bar_freq) for span in window)
+        if not all(np.isfinite(span) and span >= 1 for span in triple):
+            raise ValueError(f"The windows {window!r} must be spans of at least one bar.")
+        spans.append(triple)
+    return spans
+
+
+def _grow(array: np.ndarray, size: int, fill) -> np.ndarray:
+    """
+    Extend the first axis of a state array to `size` rows filled with `fill`.
+    """
+    if size <= array.shape[0]:
+        return array
+    extra = np.full((max(size, 2 * array.shape[0]) - array.shape[0],) + array.shape[1:], fill, dtype=array.dtype)
+    return np.concatenate([array, extra])
+
 
 @dataclass
 class ExponentialMovingAverage:
@@ -12,34 +307,97 @@ class ExponentialMovingAverage:
     A class to compute Exponential Moving Averages (EMA) for financial instruments.
     """
 
-    def __init__(self, short_window: int = 5, medium_window: int = 20, long_window: int = 250):
+    def __init__(self, short_window: int = 5, medium_window: int = 20, long_window: int = 250, bar_freq: str = None):
         """
         Initialize the ExponentialMovingAverage class.
 
+        Windows are numbers of bars, or durations such as '4h' or '5D' when the bar
+        frequency is given; durations are converted to (possibly fractional) bars.
+
         :param short_window: The short-term EMA window (e.g., 5-period EMA).
         :param medium_window: The medium-term EMA window (e.g., 20-period EMA).
         :param long_window: The long-term EMA window (e.g., 50-period EMA).
+        :param bar_freq: Fixed bar frequency of the data (e.g., 'min' or 'h'), for windows given as durations.
         """
-        self.short_window = short_window
-        self.medium_window = medium_window
-        self.long_window = long_window
+        self.short_window = _span_in_bars(short_window, bar_freq)
+        self.medium_window = _span_in_bars(medium_window, bar_freq)
+        self.long_window = _span_in_bars(long_window, bar_freq)
+        self.bar_freq = bar_freq
 
-    def compute_ema(self, df: pd.DataFrame, price_column: str, date_column: str = None) -> pd.DataFrame:
+    def _spans(self) -> tuple:
+        return (self.short_window, self.medium_window, self.long_window)
+
+    def _cached_ema(self, prices: np.ndarray, group_starts: np.ndarray, labels: list, price_column: str,
+                    cache: IndicatorCache) -> np.ndarray:
+        """
+        EMAs of tickers stored back to back, taking each (ticker, span) series from the
+        cache when possible and computing only the missing spans.
+        """
+        spans = self._spans()
+        emas = np.empty((len(prices), len(spans)))
+        bounds = np.r_[group_starts, len(prices)]
+
+        for g, label in enumerate(labels):
+            start, end = bounds[g], bounds[g + 1]
+            version = data_version(prices[start:end])
+            keys = [(label, price_column, span, version) for span in spans]
+
+            missing = []
+            for j, key in enumerate(keys):
+                cached = cache.get(key)
+                if cached is None:
+                    missing.append(j)
+                else:
+                    emas[start:end, j] = cached
+
+            if missing:
+                alphas = np.array([_span_to_alpha(spans[j]) for j in missing])
+                computed = _ema_kernel(prices[start:end], np.zeros(1, dtype=np.int64), alphas)
+                for column, j in enumerate(missing):
+                    emas[start:end, j] = computed[:, column]
+                    cache.put(keys[j], computed[:, column])
+
+        return emas
+
+    def compute_ema(self, df: pd.DataFrame, price_column: str, date_column: str = None,
+                    cache: IndicatorCache = None) -> pd.DataFrame:
         """
         Compute exponential moving averages (EMAs) for the given DataFrame.
 
+        When a 'ticker' column is present, each ticker gets its own EMAs so that one
+        commodity's prices never leak into the next one.
+
         :param df: The input DataFrame with price data.
         :param price_column: The name of the column containing prices.
         :param date_column: The name of the date column (optional, ensures sorting by date).
-        :return: The original DataFrame with added EMA columns.
+        :param cache: IndicatorCache reused across calls, e.g. by runs sharing a span (optional).
+        :return: A copy of the DataFrame with added EMA columns.
         """
         if date_column:
             df = df.sort_values(by=date_column)
 
-        # Calculate EMAs
-        df['EMA_Short'] = df[price_column].ewm(span=self.short_window, adjust=False).mean()
-        df['EMA_Medium'] = df[price_column].ewm(span=self.medium_window, adjust=False).mean()
-        df['EMA_Long'] = df[price_column].ewm(span=self.long_window, adjust=False).mean()
+        # Group rows by ticker, keeping their order within each ticker
+        if 'ticker' in df.columns:
+            codes, uniques = pd.factorize(df['ticker'])
+            order = np.argsort(codes, kind='stable')
+            group_starts = _group_starts(codes[order])
+            labels = [uniques[code] if code >= 0 else None for code in codes[order][group_starts]]
+        else:
+            order = np.arange(len(df))
+            group_starts = _group_starts(np.zeros(len(df), dtype=np.int64))
+            labels = [None] * len(group_starts)
+
+        # Calculate the three EMAs in one pass over each ticker's prices
+        prices = df[price_column].to_numpy(dtype=np.float64)[order]
+        emas = np.empty((len(df), 3))
+        if cache is not None:
+            emas[order] = self._cached_ema(prices, group_starts, labels, price_column, cache)
+        else:
+            alphas = np.array([_span_to_alpha(span) for span in self._spans()])
+            emas[order] = _ema_kernel(prices, group_starts, alphas)
+
+        # Return a new DataFrame so that the caller's data is left untouched
+        df = df.assign(EMA_Short=emas[:, 0], EMA_Medium=emas[:, 1], EMA_Long=emas[:, 2])
 
         return df
     
@@ -54,47 +412,134 @@ class ExponentialMovingAverage:
         if not {'EMA_Short', 'EMA_Medium', 'EMA_Long'}.issubset(df.columns):
             raise ValueError("EMA columns are missing from the DataFrame. Ensure compute_ema is called first.")
 
-        # Sort data by ticker and date
-        grouped = df.sort_values(by=['ticker', 'Date']).groupby('ticker')
-
-        # Initialize an empty DataFrame for the results
-        signals_df = pd.DataFrame()
-
-        for ticker, group in grouped:
-            group = group.dropna(subset=['EMA_Short', 'EMA_Medium', 'EMA_Long']).copy()
-
-            # Initialize Signal column
-            group['Signal'] = 0
-
-            # Track the current position (Buy, Sell, or None)
-            position = None
-
-            for i in range(1, len(group)):
-                # Buy signal: EMA_Short crosses above EMA_Medium and EMA_Long
-                if (
-                    group['EMA_Short'].iloc[i] > group['EMA_Medium'].iloc[i] > group['EMA_Long'].iloc[i] and
-                    group['EMA_Short'].iloc[i - 1] <= group['EMA_Medium'].iloc[i - 1] and
-                    position != 'Long'
-                ):
-                    group.at[group.index[i], 'Signal'] = 1
-                    position = 'Long'
+        # Sort data by ticker and date, dropping rows without a ticker or complete EMAs
+        signals_df = df.sort_values(by=['ticker', 'Date'])
+        signals_df = signals_df[signals_df['ticker'].notna()]
+        signals_df = signals_df.dropna(subset=['EMA_Short', 'EMA_Medium', 'EMA_Long']).copy()
 
-                # Sell signal: EMA_Short crosses below EMA_Medium and EMA_Long
-                elif (
-                    group['EMA_Short'].iloc[i] < group['EMA_Medium'].iloc[i] < group['EMA_Long'].iloc[i] and
-                    group['EMA_Short'].iloc[i - 1] >= group['EMA_Medium'].iloc[i - 1] and
-                    position != 'Short'
-                ):
-                    group.at[group.index[i], 'Signal'] = -1
-                    position = 'Short'
+        # Each ticker is a contiguous block after sorting: locate where each block starts
+        group_starts = _group_starts(pd.factorize(signals_df['ticker'])[0])
 
-            # Append results for this ticker
-            signals_df = pd.concat([signals_df, group])
+        # Run the crossover state machine for all tickers at once
+        signals_df['Signal'] = _crossover_kernel(
+            signals_df['EMA_Short'].to_numpy(dtype=np.float64),
+            signals_df['EMA_Medium'].to_numpy(dtype=np.float64),
+            signals_df['EMA_Long'].to_numpy(dtype=np.float64),
+            group_starts
+        )
 
         # Add column 'Position' (Buy or Sell)
-        signals_df['Position'] = signals_df['Signal'].apply(lambda x: 'Buy' if x == 1 else ('Sell' if x == -1 else None))
+        signal_values = signals_df['Signal'].to_numpy()
+        signals_df['Position'] = np.select([signal_values == 1, signal_values == -1], ['Buy', 'Sell'], default=None)
 
         # Return filtered or full dataset
         if filter_signals:
             return signals_df[signals_df['Signal'] != 0]
         return signals_df
+
+    def iter_signals(self, chunks, price_column: str, date_column: str = 'Date', ticker_column: str = 'ticker',
+                     filter_signals: bool = True):
+        """
+        Chunked equivalent of compute_ema followed by generate_signals.
+
+        The EMA and crossover state of every ticker is carried from one chunk to the
+        next, so data too large to hold in memory (e.g. years of minute bars) can be
+        processed chunk by chunk, as read by `pd.read_csv(..., chunksize=...)`.
+
+        :param chunks: Iterable of long-format DataFrames, each one dated after the previous one.
+        :return: Generator of DataFrames with the EMA columns, 'Signal' and 'Position'
+                 (only the rows with a signal if filter_signals is True).
+        """
+        alphas = np.array([_span_to_alpha(span) for span in (self.short_window, self.medium_window, self.long_window)])
+        ticker_codes = {}
+        weighted = np.full((0, 3), np.nan)
+        old_wt = np.ones((0, 3))
+        previous_short = np.empty(0)
+        previous_medium = np.empty(0)
+        position = np.zeros(0, dtype=np.int64)
+
+        for chunk in chunks:
+            chunk = chunk[chunk[ticker_column].notna()]
+            chunk = chunk.iloc[np.argsort(chunk[date_column].to_numpy(), kind='stable')]
+
+            # Codes of the chunk mapped to codes stable across chunks
+            local_codes, uniques = pd.factorize(chunk[ticker_column])
+            mapping = np.array([ticker_codes.setdefault(ticker, len(ticker_codes)) for ticker in uniques], dtype=np.int64)
+            codes = mapping[local_codes] if len(chunk) else np.empty(0, dtype=np.int64)
+
+            n_tickers = len(ticker_codes)
+            weighted = _grow(weighted, n_tickers, np.nan)
+            old_wt = _grow(old_wt, n_tickers, 1.0)
+            previous_short = _grow(previous_short, n_tickers, np.nan)
+            previous_medium = _grow(previous_medium, n_tickers, np.nan)
+            position = _grow(position, n_tickers, 0)
+
+            emas = _ema_state_kernel(chunk[price_column].to_numpy(dtype=np.float64), codes, alphas, weighted, old_wt)
+            signals = _crossover_state_kernel(
+                emas[:, 0].copy(), emas[:, 1].copy(), emas[:, 2].copy(), codes, previous_short, previous_medium, position
+            )
+
+            chunk = chunk.assign(EMA_Short=emas[:, 0], EMA_Medium=emas[:, 1], EMA_Long=emas[:, 2], Signal=signals)
+            chunk['Position'] = np.select([signals == 1, signals == -1], ['Buy', 'Sell'], default=None)
+            if filter_signals:
+                yield chunk[signals != 0]
+            else:
+                yield chunk.dropna(subset=['EMA_Short', 'EMA_Medium', 'EMA_Long'])
+
+    def compute_ema_panel(self, prices: np.ndarray, present: np.ndarray = None, cache: IndicatorCache = None,
+                          tickers: list = None, versions: list = None, price_column: str = 'Close') -> np.ndarray:
+        """
+        Compute the three EMAs of a dates x tickers price panel in one pass.
+
+        :param prices: 2-D array of prices, one column per ticker, sorted by date.
+        :param present: Boolean mask of the cells that exist in the data (defaults to all).
+        :param cache: IndicatorCache holding one series per (ticker, span) column (optional).
+        :param tickers: Ticker of each column, used in the cache keys.
+        :param versions: data_version of each (prices, present) column, computed here if not given.
+        :return: Array of shape (3, n_dates, n_tickers) holding the short, medium and long EMAs.
+        """
+        prices = np.ascontiguousarray(prices, dtype=np.float64)
+        if present is None:
+            present = np.ones(prices.shape, dtype=np.bool_)
+        present = np.ascontiguousarray(present, dtype=np.bool_)
+        alphas = np.array([_span_to_alpha(span) for span in self._spans()])
+        if cache is None:
+            return _ema_panel_kernel(prices, present, alphas)
+
+        n_columns = prices.shape[1]
+        if tickers is None:
+            tickers = list(range(n_columns))
+        if versions is None:
+            versions = [data_version(prices[:, c], present[:, c]) for c in range(n_columns)]
+
+        emas = np.empty((len(alphas),) + prices.shape)
+        for j, span in enumerate(self._spans()):
+            keys = [(tickers[c], price_column, span, versions[c]) for c in range(n_columns)]
+            missing = []
+            for c, key in enumerate(keys):
+                cached = cache.get(key)
+                if cached is None:
+                    missing.append(c)
+                else:
+                    emas[j, :, c] = cached
+
+            # Only the columns missing from the cache go through the kernel
+            if missing:
+                computed = _ema_panel_kernel(
+                    np.ascontiguousarray(prices[:, missing]), np.ascontiguousarray(present[:, missing]), alphas[j:j + 1]
+                )[0]
+                for column, c in enumerate(missing):
+                    emas[j, :, c] = computed[:, column]
+                    cache.put(keys[c], computed[:, column])
+
+        return emas
+
+    def generate_signal_panel(self, emas: np.ndarray, present: np.ndarray = None) -> np.ndarray:
+        """
+        Generate crossover signals from the EMA panels returned by compute_ema_panel.
+
+        :return: 2-D array of signals (1 for Buy, -1 for Sell, 0 otherwise).
+        """
+        if present is None:
+            present = np.ones(emas.shape[1:], dtype=np.bool_)
+        return _crossover_panel_kernel(emas[0], emas[1], emas[2], np.ascontiguousarray(present, dtype=np.bool_))
@@ -0,0 +1,112 @@
+from collections import OrderedDict
+import hashlib
+import os
+import numpy as np
+
+from src.commomacrossoverbacktest.array_io import save_array
+
+
+def data_version(*arrays) -> str:
+    """
+    Fingerprint of the input series of an indicator (content, dtype and shape).
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for values in arrays:
+        values = np.ascontiguousarray(values)
+        digest.update(f"{values.dtype.str}{values.shape}".encode())
+        digest.update(values.view(np.uint8).data)
+    return digest.hexdigest()
+
+
+class IndicatorCache:
+    """
+    Size-bounded LRU cache of indicator series, optionally persisted to disk.
+
+    Entries are keyed by (ticker, price column, span, data version), where the data
+    version is the data_version fingerprint of the input series: a series is thus
+    computed once per process (or once per directory) for every parameter set sharing
+    that span, and a change in the data never returns a stale series.
+
+    Cached arrays are read-only; callers copy them into their own outputs.
+
+    :param max_bytes: Memory budget of the in-process entries.
+    :param directory: Folder where entries are also saved as .npy files (optional).
+    """
+
+    def __init__(self, max_bytes: int = 256 * 2 ** 20, directory: str = None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def _path(self, key: tuple) -> str:
+        name = hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+        return os.path.join(self.directory, name + '.npy')
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: tuple):
+        return key in self._entries
+
+    def get(self, key: tuple) -> np.ndarray:
+        """
+        Cached series of a key, or None.
+        """
+        values = self._entries.get(key)
+        if values is not None:
+            self._entries.move_to_end(key)
+        elif self.directory is not None and os.path.exists(self._path(key)):
+            values = np.load(self._path(key))
+            self._insert(key, values)
+
+        if values is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return values
+
+    def put(self, key: tuple, values: np.ndarray):
+        """
+        Store the series of a key, evicting the least recently used entries if needed.
+        """
+        values = np.array(values)
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+            save_array(self._path(key), values)
+        self._insert(key, values)
+
+    def _insert(self, key: tuple, values: np.ndarray):
+        values.flags.writeable = False
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.nbytes -= previous.nbytes
+        self._entries[key] = values
+        self.nbytes += values.nbytes
+
+        # Evict the least recently used entries beyond the budget (the newest one is always kept)
+        while self.nbytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+
+    def clear(self):
+        """
+        Drop the in-process entries (files on disk are kept).
+        """
+        self._entries.clear()
+        self.nbytes = 0
+
+
+_default_cache = None
+
+
+def default_indicator_cache() -> IndicatorCache:
+    """
+    Cache shared by every indicator computation of the process.
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = IndicatorCache()
+    return _default_cache
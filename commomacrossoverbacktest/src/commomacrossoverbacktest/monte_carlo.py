@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+
+from src.commomacrossoverbacktest.analytics import performance_metrics
+from src.commomacrossoverbacktest.batch_broker import BatchCommoBroker, run_batch_events
+from src.commomacrossoverbacktest.exponentialmovingaverage import ExponentialMovingAverage
+from src.commomacrossoverbacktest.vectorized import build_price_panel
+
+
+def historical_returns(data: pd.DataFrame, time_column: str = 'Date', ticker_column: str = 'ticker',
+                       price_column: str = 'Close'):
+    """
+    Daily log returns of every ticker, on the dates x tickers panel of the data.
+
+    Missing prices are carried forward, so a ticker has a zero return on the dates it
+    does not trade (and before its first price).
+
+    :return: Sorted tickers, the first price of each ticker and the (dates - 1, tickers) returns.
+    """
+    _, tickers, prices, _ = build_price_panel(data, time_column, ticker_column, price_column)
+    prices = pd.DataFrame(prices)
+    returns = np.nan_to_num(np.diff(np.log(prices.ffill().to_numpy()), axis=0))
+    return tickers, prices.bfill().to_numpy()[0], returns
+
+
+def block_bootstrap_indices(rng: np.random.Generator, n_returns: int, length: int, block_size: int) -> np.ndarray:
+    """
+    Return rows of one block-bootstrapped path: blocks of `block_size` consecutive
+    dates drawn with replacement, so that autocorrelation and cross-commodity
+    correlation are kept within each block.
+    """
+    block_size = min(block_size, n_returns)
+    starts = rng.integers(0, n_returns - block_size + 1, -(-length // block_size))
+    return (starts[:, None] + np.arange(block_size)).ravel()[:length]
+
+
+def regime_shuffle_indices(rng: np.random.Generator, n_returns: int, regime_length: int) -> np.ndarray:
+    """
+    Return rows of one regime-shuffled path: the history is cut into consecutive
+    regimes of `regime_length` dates, which are replayed in a random order.
+    """
+    regimes = np.array_split(np.arange(n_returns), max(1, -(-n_returns // regime_length)))
+    return np.concatenate([regimes[r] for r in rng.permutation(len(regimes))])
+
+
+def simulate_paths(returns: np.ndarray, start_prices: np.ndarray, seeds: list, method: str = 'block',
+                   length: int = None, block_size: int = 20, regime_length: int = 60) -> np.ndarray:
+    """
+    Synthetic price paths resampled from historical returns.
+
+    :param returns: Historical (dates, tickers) log returns.
+    :param start_prices: Price of each ticker on the first date of the paths.
+    :param seeds: One SeedSequence per path, so a path does not depend on how paths are chunked.
+    :param method: 'block' (block bootstrap) or 'regime' (regime shuffle).
+    :param length: Number of returns per path (defaults to the history; the history for 'regime').
+    :return: Array of shape (paths, length + 1, tickers).
+    """
+    n_returns = returns.shape[0]
+    if method == 'block':
+        length = length or n_returns
+        rows = [block_bootstrap_indices(np.random.default_rng(seed), n_returns, length, block_size) for seed in seeds]
+    elif method == 'regime':
+        rows = [regime_shuffle_indices(np.random.default_rng(seed), n_returns, regime_length) for seed in seeds]
+    else:
+        raise ValueError(f"Unknown resampling method '{method}', expected 'block' or 'regime'.")
+
+    log_paths = np.cumsum(returns[np.stack(rows)], axis=1)
+    paths = np.empty((len(seeds), log_paths.shape[1] + 1, returns.shape[1]))
+    paths[:, 0] = start_prices
+    paths[:, 1:] = start_prices * np.exp(log_paths)
+    return paths
+
+
+def run_paths(paths: np.ndarray, short_window: int, medium_window: int, long_window: int, initial_cash: float,
+              tickers: list = None):
+    """
+    Run the EMA crossover strategy on many price paths at once.
+
+    The EMAs and signals of every (path, ticker) column are computed in one pass of the
+    panel kernels, and all paths are traded in lockstep by a BatchCommoBroker, one
+    portfolio per path. Each path date is a step and, as in the backtest, a signal is
+    executed at the step of its date, at the price of that date (the close the signal
+    was computed on), never at the previous date's price.
+
+    :param paths: Prices of shape (paths, dates, tickers).
+    :return: The (paths x dates) portfolio values and the BatchCommoBroker.
+    """
+    n_paths, n_dates, n_tickers = paths.shape
+    ema_calculator = ExponentialMovingAverage(short_window, medium_window, long_window)
+    columns = np.ascontiguousarray(paths.transpose(1, 0, 2)).reshape(n_dates, n_paths * n_tickers)
+    signals = ema_calculator.generate_signal_panel(ema_calculator.compute_ema_panel(columns))
+    signals = signals.reshape(n_dates, n_paths, n_tickers)
+
+    # Prices of each step, shape (steps, paths, tickers)
+    execution_prices = np.ascontiguousarray(paths.transpose(1, 0, 2))
+
+    # Events where at least one path has a signal, ordered by date then ticker
+    rows, ticker_ids = np.nonzero((signals != 0).any(axis=1))
+    event_signals = signals[rows, :, ticker_ids]
+
+    broker = BatchCommoBroker(initial_cash, tickers if tickers is not None else list(range(n_tickers)), n_paths)
+    values = run_batch_events(broker, np.arange(n_dates), execution_prices, rows, ticker_ids, event_signals)
+    return values, broker
+
+
+def monte_carlo(data: pd.DataFrame, short_window: int, medium_window: int, long_window: int, n_paths: int = 1000,
+                method: str = 'block', length: int = None, block_size: int = 20, regime_length: int = 60,
+                initial_cash: float = 1000000, chunk_size: int = 250, seed: int = 0, periods_per_year: int = 252,
+                time_column: str = 'Date', ticker_column: str = 'ticker', price_column: str = 'Close') -> pd.DataFrame:
+    """
+    Distribution of the strategy's results over resampled histories.
+
+    Paths are generated and simulated `chunk_size` at a time, so memory stays bounded
+    by one chunk of (paths, dates, tickers) arrays. Each path has its own seed derived
+    from `seed`, so results are reproducible and independent of `chunk_size`.
+
+    :param data: Long-format market data the returns are resampled from.
+    :param n_paths: Number of synthetic paths.
+    :param method: 'block' (block bootstrap of returns) or 'regime' (shuffled regimes).
+    :param length: Number of returns per path for 'block' (defaults to the history).
+    :param block_size: Number of consecutive dates per bootstrap block.
+    :param regime_length: Number of consecutive dates per regime.
+    :return: DataFrame with one row per path: 'path', 'final_value', 'total_return',
+             'annualized_volatility', 'sharpe', 'max_drawdown', 'max_drawdown_duration'
+             and 'n_trades'.
+    """
+    # Paths start from the first price of each ticker
+    tickers, start_prices, returns = historical_returns(data, time_column, ticker_column, price_column)
+
+    seeds = np.random.SeedSequence(seed).spawn(n_paths)
+    frames = []
+    for start in range(0, n_paths, chunk_size):
+        paths = simulate_paths(returns, start_prices, seeds[start:start + chunk_size], method, length, block_size,
+                               regime_length)
+        values, broker = run_paths(paths, short_window, medium_window, long_window, initial_cash, tickers)
+
+        metrics = performance_metrics(values, periods_per_year)
+        metrics.insert(0, 'path', np.arange(start, start + len(paths)))
+        metrics.insert(1, 'final_value', values[:, -1])
+        metrics['n_trades'] = broker.trade_counts
+        frames.append(metrics[['path', 'final_value', 'total_return', 'annualized_volatility', 'sharpe',
+                               'max_drawdown', 'max_drawdown_duration', 'n_trades']])
+
+    return pd.concat(frames, ignore_index=True)
+
+
+def summarize_distribution(results: pd.DataFrame, quantiles=(0.05, 0.25, 0.5, 0.75, 0.95)) -> pd.DataFrame:
+    """
+    Mean and quantiles of each metric returned by monte_carlo.
+    """
+    metrics = results.drop(columns='path')
+    summary = metrics.quantile(list(quantiles))
+    summary.index = [f'q{q:g}' for q in quantiles]
+    return pd.concat([metrics.mean().to_frame('mean').T, summary])
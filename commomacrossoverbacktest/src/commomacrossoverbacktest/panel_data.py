@@ -0,0 +1,172 @@
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+from src.commomacrossoverbacktest.indicator_cache import data_version
+
+
+def _naive_datetimes(values) -> pd.Series:
+    """
+    Convert a column of timestamps to timezone-naive datetime64 values.
+    """
+    values = pd.to_datetime(values)
+    if getattr(values.dt, 'tz', None) is not None:
+        values = values.dt.tz_localize(None)
+    return values
+
+
+def _naive_timestamp(t: datetime) -> pd.Timestamp:
+    """
+    Convert `t` to a timezone-naive Timestamp comparable with `_naive_datetimes`.
+    """
+    t = pd.Timestamp(t)
+    if t.tzinfo is not None:
+        t = t.tz_localize(None)
+    return t
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+class PanelData:
+    """
+    Columnar dates x tickers store of market data, built once at load time.
+
+    Dates are sorted, tickers are numbered by their sorted order, and each field
+    (close, EMAs, signals...) is one contiguous (dates x tickers) array, NaN where the
+    data has no row. Fields are read-only and every accessor returns views, so the
+    information classes, the broker and the vectorized kernels share one copy of the
+    data instead of filtering, sorting and copying a long-format frame.
+
+    :param dates: Sorted timezone-naive datetime64 dates.
+    :param tickers: Sorted tickers, one per column.
+    :param present: Boolean mask of the cells that exist in the data.
+    :param fields: Field name -> (dates x tickers) array.
+    :param date_rows: Row of each source row of the long-format data (-1 if dropped).
+    :param ticker_columns: Column of each source row of the long-format data (-1 if dropped).
+    """
+
+    def __init__(self, dates: np.ndarray, tickers: list, present: np.ndarray, fields: dict = None,
+                 date_rows: np.ndarray = None, ticker_columns: np.ndarray = None):
+        self.dates = _read_only(np.asarray(dates))
+        self.tickers = list(tickers)
+        self.present = _read_only(np.ascontiguousarray(present, dtype=np.bool_))
+        self.date_rows = date_rows
+        self.ticker_columns = ticker_columns
+        self._fields = {}
+        self._versions = {}
+        self._ticker_ids = {ticker: j for j, ticker in enumerate(self.tickers)}
+        for name, values in (fields or {}).items():
+            self.add_field(name, values)
+
+    @classmethod
+    def from_frame(cls, data: pd.DataFrame, time_column: str = 'Date', ticker_column: str = 'ticker',
+                   fields=('Close',), dtype=np.float64) -> 'PanelData':
+        """
+        Pivot long-format market data into the columnar store in one pass.
+
+        Rows without a ticker are dropped; when a date and ticker appear several times,
+        the last row wins.
+
+        :param fields: Columns of `data` to store.
+        :param dtype: Float type of the stored fields.
+        """
+        kept = data[ticker_column].notna().to_numpy()
+        dates, rows = np.unique(_naive_datetimes(data[time_column]).to_numpy()[kept], return_inverse=True)
+        tickers, columns = np.unique(data[ticker_column].to_numpy()[kept], return_inverse=True)
+
+        present = np.zeros((len(dates), len(tickers)), dtype=np.bool_)
+        present[rows, columns] = True
+        values = {}
+        for name in fields:
+            values[name] = np.full((len(dates), len(tickers)), np.nan, dtype=dtype)
+            values[name][rows, columns] = data[name].to_numpy(dtype=dtype)[kept]
+
+        date_rows = np.full(len(data), -1, dtype=np.int64)
+        ticker_columns = np.full(len(data), -1, dtype=np.int64)
+        date_rows[kept], ticker_columns[kept] = rows, columns
+        return cls(dates, list(tickers), present, values, date_rows, ticker_columns)
+
+    @property
+    def fields(self) -> list:
+        return list(self._fields)
+
+    @property
+    def shape(self) -> tuple:
+        return self.present.shape
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory held by the dates, the mask and the fields.
+        """
+        return self.dates.nbytes + self.present.nbytes + sum(values.nbytes for values in self._fields.values())
+
+    def add_field(self, name: str, values: np.ndarray):
+        """
+        Store a (dates x tickers) field, replacing any field of the same name.
+        """
+        values = np.ascontiguousarray(values)
+        if values.shape != self.shape:
+            raise ValueError(f"Field '{name}' has shape {values.shape}, expected {self.shape}.")
+        self._fields[name] = _read_only(values)
+        self._versions.pop(name, None)
+
+    def field(self, name: str) -> np.ndarray:
+        """
+        Read-only (dates x tickers) array of a field.
+        """
+        return self._fields[name]
+
+    def ticker_id(self, ticker: str) -> int:
+        return self._ticker_ids[ticker]
+
+    def column(self, name: str, ticker: str) -> np.ndarray:
+        """
+        Dates of one ticker for one field, as a strided view.
+        """
+        return self._fields[name][:, self._ticker_ids[ticker]]
+
+    def versions(self, name: str) -> list:
+        """
+        data_version of each ticker column of a field, computed once.
+        """
+        if name not in self._versions:
+            values = self._fields[name]
+            self._versions[name] = [
+                data_version(self.dates, values[:, j], self.present[:, j]) for j in range(len(self.tickers))
+            ]
+        return self._versions[name]
+
+    def rows_until(self, t: datetime, inclusive: bool = True) -> int:
+        """
+        Number of dates on or before `t` (strictly before if not inclusive).
+        """
+        t = _naive_timestamp(t).to_datetime64()
+        return int(np.searchsorted(self.dates, t, side='right' if inclusive else 'left'))
+
+    def until(self, n_rows: int) -> 'PanelData':
+        """
+        Panel restricted to its first `n_rows` dates, sharing the arrays of this one.
+        """
+        panel = PanelData.__new__(PanelData)
+        panel.dates = self.dates[:n_rows]
+        panel.tickers = self.tickers
+        panel.present = self.present[:n_rows]
+        panel.date_rows = None
+        panel.ticker_columns = None
+        panel._fields = {name: values[:n_rows] for name, values in self._fields.items()}
+        panel._versions = {}
+        panel._ticker_ids = self._ticker_ids
+        return panel
+
+    def gather(self, name: str) -> np.ndarray:
+        """
+        Value of a field for each source row of the long-format data (NaN for dropped rows).
+        """
+        kept = self.date_rows >= 0
+        values = np.full(len(self.date_rows), np.nan)
+        values[kept] = self._fields[name][self.date_rows[kept], self.ticker_columns[kept]]
+        return values
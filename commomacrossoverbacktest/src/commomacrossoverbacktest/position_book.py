@@ -0,0 +1,224 @@
+from collections.abc import Mapping
+import numpy as np
+from pybacktestchain.broker import Position
+
+
+class BookPosition:
+    """
+    View on one row of a PositionBook, with the attributes of pybacktestchain's Position.
+    """
+
+    __slots__ = ('book', 'slot', 'ticker')
+
+    def __init__(self, book: 'PositionBook', slot: int, ticker: str):
+        self.book = book
+        self.slot = slot
+        self.ticker = ticker
+
+    @property
+    def quantity(self) -> int:
+        return int(self.book.quantities[self.slot])
+
+    @quantity.setter
+    def quantity(self, value: int):
+        self.book._set_quantity(self.slot, value)
+
+    @property
+    def entry_price(self) -> float:
+        return float(self.book.entry_prices[self.slot])
+
+    @entry_price.setter
+    def entry_price(self, value: float):
+        self.book.entry_prices[self.slot] = value
+
+    def __repr__(self):
+        return f"BookPosition(ticker={self.ticker!r}, quantity={self.quantity}, entry_price={self.entry_price})"
+
+
+class PositionBook(dict):
+    """
+    Positions stored in parallel NumPy arrays indexed by ticker slot.
+
+    The book behaves like the dictionary of positions used by pybacktestchain's
+    Broker (ticker -> object with `quantity` and `entry_price`), but the dictionary
+    itself only maps each open ticker to its slot: positions are returned as
+    BookPosition views on the arrays, so no object is kept per position.
+
+    The dictionary methods (iteration, copy, update, setdefault, comparison...) all go
+    through the views, so the slots are never exposed; `dict(book)` gives a dictionary
+    of views and `book.copy()` a new book.
+
+    The mark-to-market value of the positions is updated incrementally on each fill.
+    A caller valuing the book several times at unchanged prices passes a `version` key
+    to market_value: while the key stays the same, the cached value is returned without
+    looking at the prices. Without a key, the open positions are marked again, which
+    costs one lookup per open position. As in Broker.get_portfolio_value, tickers
+    without a price are left out of the value and a NaN price makes the value NaN.
+    """
+
+    def __init__(self, capacity: int = 8):
+        super().__init__()
+        self.ticker_ids = {}  # Ticker -> slot in the arrays, kept when a position is closed
+        self.quantities = np.zeros(capacity, dtype=np.int64)
+        self.entry_prices = np.zeros(capacity, dtype=np.float64)
+        self.marks = np.zeros(capacity)  # Price used for the cached valuation, 0 without a price
+        self._market_value = 0.0  # Value of the positions with a non-NaN mark
+        self._nan_marks = 0  # Number of open positions marked at NaN
+        self._marked_prices = None  # Prices of the cached valuation, used to mark new positions
+        self._version = None  # Valuation key given by the caller with these prices
+
+    def _slot(self, ticker: str) -> int:
+        """
+        Slot of a ticker, growing the arrays if needed.
+        """
+        slot = self.ticker_ids.get(ticker)
+        if slot is None:
+            slot = len(self.ticker_ids)
+            if slot == len(self.quantities):
+                self.quantities = np.concatenate([self.quantities, np.zeros(slot, dtype=np.int64)])
+                self.entry_prices = np.concatenate([self.entry_prices, np.zeros(slot)])
+                self.marks = np.concatenate([self.marks, np.zeros(slot)])
+            self.ticker_ids[ticker] = slot
+        return slot
+
+    def _set_quantity(self, slot: int, quantity: int):
+        """
+        Update a quantity and the cached market value accordingly.
+        """
+        mark = self.marks[slot]
+        if not np.isnan(mark):
+            self._market_value += (quantity - self.quantities[slot]) * mark
+        self.quantities[slot] = quantity
+
+    def _set_mark(self, slot: int, price):
+        """
+        Mark an open position (None, i.e. no price, marks it at 0).
+        """
+        self._nan_marks -= int(np.isnan(self.marks[slot]))
+        self.marks[slot] = 0.0 if price is None else price
+        self._nan_marks += int(np.isnan(self.marks[slot]))
+
+    def __getitem__(self, ticker: str) -> BookPosition:
+        return BookPosition(self, super().__getitem__(ticker), ticker)
+
+    def get(self, ticker: str, default=None):
+        return self[ticker] if ticker in self else default
+
+    def __iter__(self):
+        # Overridden so that dict(book) goes through __getitem__ instead of copying the slots
+        return super().__iter__()
+
+    def items(self):
+        return [(ticker, BookPosition(self, slot, ticker)) for ticker, slot in super().items()]
+
+    def values(self):
+        return [BookPosition(self, slot, ticker) for ticker, slot in super().items()]
+
+    def __setitem__(self, ticker: str, position):
+        # Read the position first: it may be a view on the slot being replaced
+        quantity, entry_price = position.quantity, position.entry_price
+        if ticker in self:
+            del self[ticker]
+        slot = self._slot(ticker)
+        self.entry_prices[slot] = entry_price
+        self.quantities[slot] = 0
+        self.marks[slot] = 0.0
+        if self._marked_prices is not None:
+            self._set_mark(slot, self._marked_prices.get(ticker))
+        self._set_quantity(slot, quantity)
+        super().__setitem__(ticker, slot)
+
+    def __delitem__(self, ticker: str):
+        slot = super().__getitem__(ticker)
+        self._set_quantity(slot, 0)
+        self._set_mark(slot, None)
+        super().__delitem__(ticker)
+
+    def pop(self, ticker: str, *default):
+        if ticker in self:
+            position = self[ticker]
+            position = Position(ticker, position.quantity, position.entry_price)
+            del self[ticker]
+            return position
+        return super().pop(ticker, *default)
+
+    def popitem(self):
+        if not self:
+            raise KeyError('popitem(): position book is empty')
+        ticker = next(reversed(self.keys()))
+        return ticker, self.pop(ticker)
+
+    def setdefault(self, ticker: str, default=None):
+        if ticker not in self:
+            self[ticker] = default
+        return self[ticker]
+
+    def update(self, other=(), **kwargs):
+        other = other.items() if isinstance(other, Mapping) else other
+        for ticker, position in list(other) + list(kwargs.items()):
+            self[ticker] = position
+
+    def clear(self):
+        for ticker in list(self):
+            del self[ticker]
+
+    def copy(self) -> 'PositionBook':
+        book = PositionBook(capacity=max(len(self), 1))
+        book.update(self)
+        return book
+
+    def __eq__(self, other):
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        return self.keys() == other.keys() and all(
+            (position.quantity, position.entry_price) == (other[ticker].quantity, other[ticker].entry_price)
+            for ticker, position in self.items()
+        )
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __or__(self, other):
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        book = self.copy()
+        book.update(other)
+        return book
+
+    def __repr__(self):
+        return f"PositionBook({dict(self.items())!r})"
+
+    def mark(self, prices: dict, version=None):
+        """
+        Mark every open position to the given prices.
+
+        :param prices: Dictionary of prices by ticker.
+        :param version: Key of these prices for the cached valuation (see market_value).
+        """
+        slots = np.fromiter(super().values(), dtype=np.int64, count=len(self))
+        marks = np.fromiter(
+            (0.0 if price is None else price for price in map(prices.get, self)), dtype=np.float64, count=len(self)
+        )
+        self.marks[slots] = marks
+        nan = np.isnan(marks)
+        self._nan_marks = int(nan.sum())
+        self._market_value = float(np.sum(self.quantities[slots][~nan] * marks[~nan]))
+        self._marked_prices = prices
+        self._version = version
+
+    def market_value(self, prices: dict, version=None) -> float:
+        """
+        Value of the positions at the given prices.
+
+        :param prices: Dictionary of prices by ticker.
+        :param version: Optional key of the prices. If it is the key of the cached
+            valuation, the prices are assumed unchanged and the cached value is returned.
+        """
+        if version is None or version != self._version:
+            self.mark(prices, version)
+        return np.nan if self._nan_marks else self._market_value
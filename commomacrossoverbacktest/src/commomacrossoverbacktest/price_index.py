@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+
+from src.commomacrossoverbacktest.panel_data import PanelData, _naive_datetimes, _naive_timestamp
+
+
+class PriceIndex:
+    """
+    Dates x tickers matrix of forward-filled prices answering as-of lookups.
+
+    The matrix is built once from the long-format data (or from a PanelData already
+    built); a lookup is then a binary search on the date axis followed by a read of
+    one row.
+    """
+
+    def __init__(self, data: pd.DataFrame, time_column: str, ticker_column: str, price_column: str):
+        self._build(PanelData.from_frame(data, time_column, ticker_column, [price_column]), price_column)
+
+    @classmethod
+    def from_panel(cls, panel: PanelData, price_field: str = 'Close') -> 'PriceIndex':
+        """
+        Price index over a field of a PanelData, sharing its date axis.
+        """
+        index = cls.__new__(cls)
+        index._build(panel, price_field)
+        return index
+
+    def _build(self, panel: PanelData, price_field: str):
+        raw = panel.field(price_field)
+
+        # Row of the latest observation of each ticker on or before each date
+        rows = np.where(~np.isnan(raw), np.arange(len(raw))[:, None], -1)
+        rows = np.maximum.accumulate(rows, axis=0) if len(rows) else rows
+
+        self.dates = panel.dates
+        self.tickers = panel.tickers
+        self.observed_rows = rows
+        self.prices = np.where(rows >= 0, raw[rows, np.arange(raw.shape[1])], np.nan)
+
+    def _row(self, t, inclusive: bool = True) -> int:
+        """
+        Index of the last date on or before `t` (strictly before if not inclusive).
+        """
+        t = _naive_timestamp(t).to_datetime64()
+        return np.searchsorted(self.dates, t, side='right' if inclusive else 'left') - 1
+
+    def as_of(self, t: datetime, inclusive: bool = True, max_age: timedelta = None) -> dict:
+        """
+        Latest price of each ticker as of `t`.
+
+        :param t: Lookup date.
+        :param inclusive: Whether prices dated exactly at `t` are visible.
+        :param max_age: Ignore prices observed before t - max_age (optional).
+        :return: Dictionary with tickers as keys and prices as values.
+        """
+        i = self._row(t, inclusive)
+        if i < 0:
+            return {}
+
+        prices = self.prices[i]
+        valid = ~np.isnan(prices)
+        if max_age is not None:
+            oldest = _naive_timestamp(t).to_datetime64() - np.timedelta64(pd.Timedelta(max_age))
+            valid &= self.dates[self.observed_rows[i]] >= oldest
+
+        return {self.tickers[j]: float(prices[j]) for j in np.flatnonzero(valid)}
+
+    def values_at(self, dates, inclusive: bool = True, max_age: timedelta = None) -> np.ndarray:
+        """
+        As-of prices of every ticker for each of the given dates.
+
+        :return: Array of shape (len(dates), len(self.tickers)), NaN when no price is available.
+        """
+        dates = _naive_datetimes(pd.Series(dates)).to_numpy()
+        rows = np.searchsorted(self.dates, dates, side='right' if inclusive else 'left') - 1
+        valid = (rows >= 0)[:, None] & ~np.isnan(self.prices[np.maximum(rows, 0)])
+        if max_age is not None:
+            oldest = dates - np.timedelta64(pd.Timedelta(max_age))
+            valid &= self.dates[self.observed_rows[np.maximum(rows, 0)]] >= oldest[:, None]
+        return np.where(valid, self.prices[np.maximum(rows, 0)], np.nan)
+
+    def panel(self, start: datetime, end: datetime, freq: str = 'D', inclusive: bool = True,
+              max_age: timedelta = None) -> pd.DataFrame:
+        """
+        As-of prices of every ticker for each date of a range, in a single call.
+
+        :return: DataFrame indexed by date with one column per ticker.
+        """
+        dates = pd.date_range(_naive_timestamp(start), _naive_timestamp(end), freq=freq)
+        return pd.DataFrame(self.values_at(dates, inclusive, max_age), index=dates, columns=self.tickers)
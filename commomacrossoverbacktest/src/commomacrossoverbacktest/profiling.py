@@ -0,0 +1,164 @@
+from array import array
+import json
+import os
+import time
+import tracemalloc
+import pandas as pd
+
+
+class _NoOpStage:
+    """
+    Context manager returned by a disabled profiler: does nothing.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_OP = _NoOpStage()
+
+
+class _Stage:
+    """
+    Context manager timing one call of a stage (or one simulated step).
+    """
+
+    __slots__ = ('profiler', 'name', 'step', 'start', 'memory_start')
+
+    def __init__(self, profiler: 'Profiler', name: str, step=None):
+        self.profiler = profiler
+        self.name = name
+        self.step = step
+
+    def __enter__(self):
+        if self.step is None and self.profiler.tracing:
+            self.memory_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter_ns()
+        if self.step is None:
+            allocated = tracemalloc.get_traced_memory()[1] - self.memory_start if self.profiler.tracing else 0
+            self.profiler._record_stage(self.name, self.start, end - self.start, allocated)
+        else:
+            self.profiler._record_step(self.step, self.start, end - self.start)
+        return False
+
+
+class Profiler:
+    """
+    Opt-in instrumentation of the backtest pipeline.
+
+    Stages (data loading, get_prices, compute_information, commo_ptf, ...) are wrapped
+    in `with profiler.stage(name):` blocks, and each simulated date in a
+    `with profiler.step(t):` block. The profiler accumulates the wall time and call
+    count of each stage, the peak memory allocated inside it (with `memory=True`,
+    through tracemalloc) and the duration of every step. The timeline can be exported
+    in the Chrome trace format, readable by chrome://tracing or Perfetto.
+
+    When disabled, `stage` and `step` return a shared no-op context manager.
+
+    :param enabled: Record anything at all.
+    :param memory: Also trace memory allocations (slows the run down noticeably).
+    """
+
+    def __init__(self, enabled: bool = False, memory: bool = False):
+        self.enabled = enabled
+        self.memory = memory
+        self.tracing = False  # True while this profiler owns tracemalloc
+        self.stages = {}  # Stage name -> [calls, total nanoseconds, peak allocated bytes]
+        self.events = []  # (name, category, start, duration) in nanoseconds, for the trace
+        self.step_dates = []
+        self.step_durations = array('q')
+
+    def start(self):
+        """
+        Start a profiled run (starts tracing allocations if requested).
+        """
+        if self.enabled and self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.tracing = True
+
+    def stop(self):
+        """
+        End a profiled run.
+        """
+        if self.tracing:
+            tracemalloc.stop()
+            self.tracing = False
+
+    def stage(self, name: str):
+        """
+        Context manager measuring one call of a pipeline stage.
+        """
+        if not self.enabled:
+            return _NO_OP
+        return _Stage(self, name)
+
+    def step(self, t):
+        """
+        Context manager measuring one simulated step.
+        """
+        if not self.enabled:
+            return _NO_OP
+        return _Stage(self, 'step', step=t)
+
+    def _record_stage(self, name: str, start: int, duration: int, allocated: int):
+        totals = self.stages.get(name)
+        if totals is None:
+            totals = self.stages[name] = [0, 0, 0]
+        totals[0] += 1
+        totals[1] += duration
+        totals[2] = max(totals[2], allocated)
+        self.events.append((name, 'stage', start, duration))
+
+    def _record_step(self, t, start: int, duration: int):
+        self.step_dates.append(t)
+        self.step_durations.append(duration)
+        self.events.append((str(t), 'step', start, duration))
+
+    def report(self) -> pd.DataFrame:
+        """
+        Cumulative statistics per stage, slowest first.
+
+        :return: DataFrame indexed by stage with 'calls', 'total_seconds',
+                 'mean_seconds', 'share' (of the total stage time) and 'peak_allocated_mb'.
+        """
+        report = pd.DataFrame(
+            [(name, calls, total / 1e9, allocated / 2 ** 20) for name, (calls, total, allocated) in self.stages.items()],
+            columns=['stage', 'calls', 'total_seconds', 'peak_allocated_mb']
+        ).set_index('stage')
+        report.insert(2, 'mean_seconds', report['total_seconds'] / report['calls'])
+        report.insert(3, 'share', report['total_seconds'] / report['total_seconds'].sum())
+        return report.sort_values(by='total_seconds', ascending=False)
+
+    def step_report(self) -> pd.DataFrame:
+        """
+        Wall time of every simulated step.
+        """
+        return pd.DataFrame({
+            'Date': self.step_dates,
+            'seconds': pd.array(self.step_durations, dtype='int64') / 1e9
+        })
+
+    def write_trace(self, path: str):
+        """
+        Write the recorded timeline in the Chrome trace event format.
+        """
+        pid = os.getpid()
+        trace = {
+            'traceEvents': [
+                {'name': name, 'cat': category, 'ph': 'X', 'ts': start / 1e3, 'dur': duration / 1e3, 'pid': pid, 'tid': 0}
+                for name, category, start, duration in self.events
+            ],
+            'displayTimeUnit': 'ms'
+        }
+        with open(path, 'w') as f:
+            json.dump(trace, f)
@@ -0,0 +1,241 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    name TEXT,
+    created TEXT,
+    final_value REAL,
+    parameters TEXT
+);
+CREATE TABLE IF NOT EXISTS portfolio (
+    run_id TEXT,
+    date INTEGER,
+    value REAL
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    run_id TEXT,
+    date INTEGER,
+    action TEXT,
+    ticker TEXT,
+    quantity INTEGER,
+    price REAL,
+    cash REAL
+);
+CREATE INDEX IF NOT EXISTS portfolio_run ON portfolio (run_id, date);
+CREATE INDEX IF NOT EXISTS transactions_run ON transactions (run_id, date);
+"""
+
+_STOP = object()
+
+
+def _nanoseconds(dates) -> list:
+    """
+    Timestamps as int64 nanoseconds (timezone-aware dates are stored in UTC).
+    """
+    dates = pd.DatetimeIndex(pd.to_datetime(dates))
+    if dates.tz is not None:
+        dates = dates.tz_convert('UTC').tz_localize(None)
+    return dates.as_unit('ns').asi8.tolist()
+
+
+class ResultsStore:
+    """
+    Single SQLite file holding the results of many backtest runs.
+
+    Each run adds one row to `runs` (its parameters as JSON and its final value), its
+    portfolio series to `portfolio` and its trades to `transactions`, all keyed by run
+    id. Values are stored at full precision and dates as int64 nanoseconds.
+
+    Writes are queued and performed by a background thread, so the simulation never
+    waits on the disk. Each run is committed in its own transaction: a run that fails
+    to write (e.g. a duplicate run id) does not drop the others, and the failed runs
+    are reported by the next save(), flush() or close(). Call flush() before reading
+    results written by the same process; queued runs are also written at exit.
+
+    :param path: SQLite file.
+    :param asynchronous: Write from a background thread (otherwise save() writes immediately).
+    """
+
+    def __init__(self, path: str = 'backtests/results.sqlite', asynchronous: bool = True):
+        self.path = path
+        self.asynchronous = asynchronous
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        connection = self._connect()
+        connection.executescript(_SCHEMA)
+        connection.close()
+
+        self._queue = queue.Queue()
+        self._errors = []
+        self._writer = None
+        if asynchronous:
+            self._writer = threading.Thread(target=self._write_loop, name='results-store', daemon=True)
+            self._writer.start()
+            # Le thread d'écriture est un démon : les runs en attente sont écrits à la sortie
+            atexit.register(self._close_at_exit)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path)
+        connection.execute('PRAGMA journal_mode=WAL')
+        return connection
+
+    def save(self, run_id: str, pnl_df: pd.DataFrame, transactions: pd.DataFrame = None, parameters: dict = None,
+             name: str = None):
+        """
+        Queue the results of one run.
+
+        :param run_id: Unique key of the run.
+        :param pnl_df: DataFrame with 'Date' and 'Portfolio Value'.
+        :param transactions: Transaction log with the columns of CommoBroker's log (optional).
+        :param parameters: JSON-serializable parameters of the run (optional).
+        :param name: Human-readable name of the run (optional).
+        """
+        values = pnl_df['Portfolio Value'].to_numpy(dtype=np.float64)
+        run = (
+            run_id, name, pd.Timestamp.now().isoformat(timespec='seconds'),
+            float(values[-1]) if len(values) else None, json.dumps(parameters or {}, default=str)
+        )
+        portfolio = list(zip([run_id] * len(values), _nanoseconds(pnl_df['Date']), values.tolist()))
+
+        trades = []
+        if transactions is not None and len(transactions):
+            trades = list(zip(
+                [run_id] * len(transactions), _nanoseconds(transactions['Date']),
+                transactions['Action'].astype(str).tolist(), transactions['Ticker'].astype(str).tolist(),
+                transactions['Quantity'].to_numpy(dtype=np.int64).tolist(),
+                transactions['Price'].to_numpy(dtype=np.float64).tolist(),
+                transactions['Cash'].to_numpy(dtype=np.float64).tolist()
+            ))
+
+        if self.asynchronous:
+            self._raise_error()
+            self._queue.put((run, portfolio, trades))
+        else:
+            connection = self._connect()
+            try:
+                self._write(connection, (run, portfolio, trades))
+            finally:
+                connection.close()
+            self._raise_error()
+
+    def _write(self, connection: sqlite3.Connection, item: tuple):
+        # Une transaction par run : un run en échec n'annule pas les autres
+        run, portfolio, trades = item
+        try:
+            with connection:
+                connection.execute('INSERT INTO runs VALUES (?, ?, ?, ?, ?)', run)
+                connection.executemany('INSERT INTO portfolio VALUES (?, ?, ?)', portfolio)
+                connection.executemany('INSERT INTO transactions VALUES (?, ?, ?, ?, ?, ?, ?)', trades)
+        except Exception as error:
+            logging.error(f"Failed to write run {run[0]} to {self.path}: {error}")
+            self._errors.append((run[0], error))
+
+    def _write_loop(self):
+        connection = self._connect()
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    break
+                self._write(connection, item)
+            finally:
+                self._queue.task_done()
+        connection.close()
+
+    def _raise_error(self):
+        if self._errors:
+            errors, self._errors = self._errors, []
+            failed = ', '.join(f'{run_id} ({error})' for run_id, error in errors)
+            raise RuntimeError(f"Failed to write {len(errors)} run(s) to {self.path}: {failed}") from errors[0][1]
+
+    def flush(self):
+        """
+        Wait until every queued run is written.
+        """
+        if self.asynchronous:
+            self._queue.join()
+            self._raise_error()
+
+    def close(self):
+        """
+        Write the queued runs and stop the background writer.
+        """
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+            atexit.unregister(self._close_at_exit)
+        self._raise_error()
+
+    def _close_at_exit(self):
+        # Les échecs sont déjà journalisés run par run
+        try:
+            self.close()
+        except RuntimeError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def query(self, sql: str, params: tuple = ()) -> pd.DataFrame:
+        """
+        Run a SQL query on the store, e.g. to aggregate across runs.
+        """
+        self.flush()
+        connection = self._connect()
+        try:
+            return pd.read_sql_query(sql, connection, params=params)
+        finally:
+            connection.close()
+
+    def _select(self, table: str, run_ids: list = None) -> pd.DataFrame:
+        sql = f'SELECT * FROM {table}'
+        params = ()
+        if run_ids is not None:
+            sql += f" WHERE run_id IN ({', '.join('?' * len(run_ids))})"
+            params = tuple(run_ids)
+        return self.query(sql + (' ORDER BY run_id, date' if table != 'runs' else ''), params)
+
+    def runs(self) -> pd.DataFrame:
+        """
+        One row per run, with its parameters expanded into columns.
+        """
+        runs = self._select('runs')
+        parameters = pd.json_normalize([json.loads(value) for value in runs.pop('parameters')])
+        return pd.concat([runs, parameters], axis=1)
+
+    def portfolio(self, run_ids: list = None) -> pd.DataFrame:
+        """
+        Portfolio series of the given runs (all runs by default), in long format.
+        """
+        portfolio = self._select('portfolio', run_ids)
+        portfolio['date'] = pd.to_datetime(portfolio['date'], unit='ns')
+        return portfolio
+
+    def portfolio_values(self, run_ids: list = None) -> pd.DataFrame:
+        """
+        Portfolio values as a dates x runs DataFrame.
+        """
+        return self.portfolio(run_ids).pivot(index='date', columns='run_id', values='value')
+
+    def transactions(self, run_ids: list = None) -> pd.DataFrame:
+        """
+        Trades of the given runs (all runs by default).
+        """
+        transactions = self._select('transactions', run_ids)
+        transactions['date'] = pd.to_datetime(transactions['date'], unit='ns')
+        return transactions
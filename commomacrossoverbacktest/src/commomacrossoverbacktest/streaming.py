@@ -0,0 +1,194 @@
+from array import array
+import time
+import numpy as np
+import pandas as pd
+
+from src.commomacrossoverbacktest.commo_broker import CommoBroker
+from src.commomacrossoverbacktest.price_index import _naive_datetimes
+from src.commomacrossoverbacktest.exponentialmovingaverage import _ema_step, _span_to_alpha
+
+# Pure Python version of the EMA update, cheaper than a compiled call for a single value
+_ema_update = _ema_step.py_func
+
+
+class _TickerState:
+    """
+    Recursive EMA and crossover state of one ticker.
+    """
+
+    __slots__ = ('weighted', 'old_wt', 'previous_short', 'previous_medium', 'position')
+
+    def __init__(self):
+        self.weighted = [np.nan, np.nan, np.nan]
+        self.old_wt = [1.0, 1.0, 1.0]
+        self.previous_short = None  # EMAs of the last bar with complete EMAs
+        self.previous_medium = None
+        self.position = 0  # 1 for Long, -1 for Short, 0 for None
+
+
+class StreamingEMA:
+    """
+    Incremental version of ExponentialMovingAverage, fed one bar at a time.
+
+    Each bar updates the three EMAs of its ticker with the recursive EMA formula and
+    runs one step of the crossover state machine, in O(1). The EMAs and signals are
+    the same as compute_ema followed by generate_signals on the same bars.
+    """
+
+    def __init__(self, short_window: int = 5, medium_window: int = 20, long_window: int = 250):
+        self.short_window = short_window
+        self.medium_window = medium_window
+        self.long_window = long_window
+        self.alphas = [_span_to_alpha(span) for span in (short_window, medium_window, long_window)]
+        self.states = {}  # Ticker -> _TickerState
+
+    def update(self, ticker: str, price: float):
+        """
+        Add the next bar of a ticker.
+
+        :return: The (EMA_Short, EMA_Medium, EMA_Long, Signal) of the bar, with the
+                 signal equal to 1 for Buy, -1 for Sell and 0 otherwise.
+        """
+        state = self.states.get(ticker)
+        if state is None:
+            state = self.states[ticker] = _TickerState()
+
+        weighted, old_wt = state.weighted, state.old_wt
+        for j in range(3):
+            weighted[j], old_wt[j] = _ema_update(weighted[j], old_wt[j], self.alphas[j], price)
+        short, medium, long = weighted
+
+        # Bars without complete EMAs are ignored by the crossover state machine
+        if short != short or medium != medium or long != long:
+            return short, medium, long, 0
+
+        signal = 0
+        if state.previous_short is not None:
+            # Buy signal: EMA_Short crosses above EMA_Medium and EMA_Long
+            if short > medium > long and state.previous_short <= state.previous_medium and state.position != 1:
+                signal = state.position = 1
+            # Sell signal: EMA_Short crosses below EMA_Medium and EMA_Long
+            elif short < medium < long and state.previous_short >= state.previous_medium and state.position != -1:
+                signal = state.position = -1
+        state.previous_short, state.previous_medium = short, medium
+
+        return short, medium, long, signal
+
+
+class StreamingTrader:
+    """
+    Paper-trading loop: a StreamingEMA driving a CommoBroker, one bar at a time.
+
+    A signal is executed as soon as it is emitted, at the price of the bar that
+    produced it, with the sizing rules of CommoBroker.execute_signals.
+
+    :param broker: Broker receiving the orders.
+    :param ema: Incremental EMA crossover.
+    :param num_commodities: Number of commodities sharing the allocation (defaults to the tickers seen so far).
+    """
+
+    def __init__(self, broker: CommoBroker, ema: StreamingEMA, num_commodities: int = None):
+        self.broker = broker
+        self.ema = ema
+        self.num_commodities = num_commodities
+        self.last_prices = {}  # Ticker -> last observed price
+
+    def prices(self) -> dict:
+        """
+        Snapshot of the last observed prices.
+
+        A new dictionary is returned on each call, so that later ticks never change the
+        prices of an earlier snapshot.
+        """
+        return dict(self.last_prices)
+
+    def portfolio_value(self) -> float:
+        """
+        Value of the portfolio at the last observed prices.
+        """
+        return self.broker.get_portfolio_value(self.prices())
+
+    def on_bar(self, date, ticker: str, price: float):
+        """
+        Process one bar.
+
+        :return: The (EMA_Short, EMA_Medium, EMA_Long, Signal) of the bar.
+        """
+        if price == price:
+            self.last_prices[ticker] = price
+        result = self.ema.update(ticker, price)
+
+        signal = result[3]
+        if signal != 0:
+            num_commodities = self.num_commodities or len(self.ema.states)
+            self.broker.execute_signals(date, [ticker], [signal], self.prices(), num_commodities)
+
+        return result
+
+    def run(self, bars):
+        """
+        Process every (date, ticker, price) bar of an iterator.
+        """
+        for date, ticker, price in bars:
+            self.on_bar(date, ticker, price)
+
+    async def run_async(self, bars):
+        """
+        Process every (date, ticker, price) bar of an async iterator (e.g. a live feed).
+        """
+        async for date, ticker, price in bars:
+            self.on_bar(date, ticker, price)
+
+
+def iter_bars(source, time_column: str = 'Date', ticker_column: str = 'ticker', price_column: str = 'Close',
+              chunksize: int = 100000):
+    """
+    Stream the (date, ticker, price) bars of historical data in date order.
+
+    :param source: Long-format DataFrame (sorted here by date, ticker order kept on ties),
+                   or path of a CSV file already sorted by date, read by chunks.
+    :param chunksize: Number of CSV rows read at a time.
+    """
+    if isinstance(source, pd.DataFrame):
+        chunks = [source.iloc[np.argsort(_naive_datetimes(source[time_column]).to_numpy(), kind='stable')]]
+    else:
+        chunks = pd.read_csv(source, usecols=[time_column, ticker_column, price_column], chunksize=chunksize)
+
+    for chunk in chunks:
+        dates = _naive_datetimes(chunk[time_column])
+        yield from zip(dates, chunk[ticker_column].to_numpy(), chunk[price_column].to_numpy(dtype=np.float64))
+
+
+def replay(source, trader: StreamingTrader, time_column: str = 'Date', ticker_column: str = 'ticker',
+           price_column: str = 'Close', chunksize: int = 100000) -> pd.DataFrame:
+    """
+    Replay historical bars through the streaming code path, timing each bar.
+
+    :param source: DataFrame or CSV path, see iter_bars.
+    :param trader: Trader processing the bars.
+    :return: DataFrame with one row per bar: 'Date', 'ticker', the price, the three EMAs,
+             'Signal' and 'Latency' (processing time of the bar in nanoseconds).
+    """
+    dates, tickers = [], []
+    columns = {name: array('d') for name in (price_column, 'EMA_Short', 'EMA_Medium', 'EMA_Long')}
+    signals, latencies = array('q'), array('q')
+
+    for date, ticker, price in iter_bars(source, time_column, ticker_column, price_column, chunksize):
+        start = time.perf_counter_ns()
+        short, medium, long, signal = trader.on_bar(date, ticker, price)
+        latencies.append(time.perf_counter_ns() - start)
+
+        dates.append(date)
+        tickers.append(ticker)
+        columns[price_column].append(price)
+        columns['EMA_Short'].append(short)
+        columns['EMA_Medium'].append(medium)
+        columns['EMA_Long'].append(long)
+        signals.append(signal)
+
+    records = pd.DataFrame({time_column: pd.DatetimeIndex(dates), ticker_column: tickers})
+    for name, values in columns.items():
+        records[name] = np.array(values, dtype=np.float64)
+    records['Signal'] = np.array(signals, dtype=np.int64)
+    records['Latency'] = np.array(latencies, dtype=np.int64)
+    return records
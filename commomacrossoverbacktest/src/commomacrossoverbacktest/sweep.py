@@ -0,0 +1,155 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from multiprocessing import shared_memory
+import os
+import numpy as np
+import pandas as pd
+
+from src.commomacrossoverbacktest.batch_broker import run_panel_batch
+from src.commomacrossoverbacktest.exponentialmovingaverage import window_spans
+from src.commomacrossoverbacktest.vectorized import prepare_backtest_panel, run_panel
+
+# Arrays shared between processes; the other panel entries are small and pickled
+SHARED_ARRAYS = ('prices', 'present', 'execution_prices', 'date_steps')
+
+# Panel attached by each worker process (see _init_worker)
+_worker_panel = None
+_worker_memory = []
+
+
+def _share_array(array: np.ndarray):
+    """
+    Copy an array into a new shared memory block.
+
+    :return: The SharedMemory block and the (name, shape, dtype) needed to attach to it.
+    """
+    memory = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=memory.buf)[...] = array
+    return memory, (memory.name, array.shape, array.dtype.str)
+
+
+def _init_worker(specs: dict, panel: dict):
+    """
+    Attach a worker process to the shared panel arrays, without copying them.
+    """
+    global _worker_panel
+    _worker_panel = dict(panel)
+    for key, (name, shape, dtype) in specs.items():
+        memory = shared_memory.SharedMemory(name=name)
+        _worker_memory.append(memory)
+        _worker_panel[key] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=memory.buf)
+
+
+def _panel(panel: dict = None) -> dict:
+    """
+    The given panel, or the panel attached by the worker process.
+    """
+    return _worker_panel if panel is None else panel
+
+
+def _map_on_shared_panel(panel: dict, max_workers: int, func, *iterables) -> list:
+    """
+    pool.map(func, *iterables) over worker processes attached to the panel in shared memory.
+
+    `func` finds the panel with `_panel()`; its results are returned in input order.
+    """
+    memories = []
+    try:
+        specs = {}
+        for key in SHARED_ARRAYS:
+            memory, specs[key] = _share_array(np.ascontiguousarray(panel[key]))
+            memories.append(memory)
+        small_panel = {key: value for key, value in panel.items() if key not in SHARED_ARRAYS}
+
+        with ProcessPoolExecutor(max_workers, initializer=_init_worker, initargs=(specs, small_panel)) as pool:
+            return list(pool.map(func, *iterables))
+    finally:
+        for memory in memories:
+            memory.close()
+            memory.unlink()
+
+
+def sweep_metrics(value: np.ndarray, n_trades: int, initial_cash: float) -> dict:
+    """
+    Summary metrics of one simulated portfolio value path.
+    """
+    running_max = np.maximum.accumulate(value)
+    return {
+        'final_value': value[-1],
+        'total_return': value[-1] / initial_cash - 1,
+        'max_drawdown': (value / running_max - 1).min(),
+        'n_trades': n_trades
+    }
+
+
+def _run_windows(windows: list, initial_cash: float, panel: dict = None, batched: bool = False) -> list:
+    """
+    Simulate a batch of (short, medium, long) window triples on the worker's panel.
+    """
+    panel = _panel(panel)
+    rows = []
+    if batched:
+        values, broker = run_panel_batch(panel, windows, initial_cash)
+        for p, (short_window, medium_window, long_window) in enumerate(windows):
+            row = {'short_window': short_window, 'medium_window': medium_window, 'long_window': long_window}
+            row.update(sweep_metrics(values[p], broker.trade_counts[p], initial_cash))
+            rows.append(row)
+        return rows
+
+    for short_window, medium_window, long_window in windows:
+        result = run_panel(panel, short_window, medium_window, long_window, initial_cash)
+        row = {'short_window': short_window, 'medium_window': medium_window, 'long_window': long_window}
+        row.update(sweep_metrics(result['value'], len(result['trade_steps']), initial_cash))
+        rows.append(row)
+    return rows
+
+
+def run_sweep(data: pd.DataFrame, steps: pd.DatetimeIndex, windows, initial_cash: float = 1000000,
+              max_workers: int = None, chunk_size: int = None, time_column: str = 'Date',
+              ticker_column: str = 'ticker', price_column: str = 'Close',
+              max_age: timedelta = timedelta(days=360), batched: bool = False, bar_freq: str = None) -> pd.DataFrame:
+    """
+    Run the vectorized backtest for many EMA window triples in parallel.
+
+    The market data is turned into a panel once; its arrays are placed in shared
+    memory and every worker process attaches to them instead of receiving a pickled
+    copy. Window triples are sent to the workers in chunks.
+
+    With `batched=True`, each chunk of triples is instead simulated in lockstep by a
+    BatchCommoBroker, one array operation per step for the whole chunk.
+
+    :param data: Long-format market data, loaded once by the caller.
+    :param steps: Simulated dates.
+    :param windows: Iterable of (short_window, medium_window, long_window) triples, in
+                    bars or as durations such as '4h' (see `bar_freq`).
+    :param initial_cash: Starting cash of every simulated portfolio.
+    :param max_workers: Number of processes (defaults to every core; 1 runs in-process).
+    :param chunk_size: Number of triples per task (defaults to about 4 tasks per worker).
+    :param batched: Simulate the triples of a chunk together with a BatchCommoBroker.
+    :param bar_freq: Fixed bar frequency of the data, for windows given as durations.
+    :return: DataFrame with one row of metrics per window triple, in the input order.
+    """
+    windows = [tuple(window) for window in windows]
+    spans = window_spans(windows, bar_freq)
+    panel = prepare_backtest_panel(data, steps, time_column, ticker_column, price_column, max_age)
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if max_workers == 1:
+        rows = _run_windows(spans, initial_cash, panel, batched)
+    else:
+        if chunk_size is None:
+            chunk_size = max(1, len(spans) // (4 * max_workers))
+        chunks = [spans[i:i + chunk_size] for i in range(0, len(spans), chunk_size)]
+
+        results = _map_on_shared_panel(
+            panel, max_workers, _run_windows, chunks, [initial_cash] * len(chunks), [None] * len(chunks),
+            [batched] * len(chunks)
+        )
+        rows = [row for chunk_rows in results for row in chunk_rows]
+
+    # The rows are labelled with the windows as given (e.g. '4h' rather than its span in bars)
+    results = pd.DataFrame(rows)
+    for j, column in enumerate(('short_window', 'medium_window', 'long_window')):
+        results[column] = [window[j] for window in windows]
+    return results
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+
+def make_commodity_data(tickers: list = None, start: str = '2020-01-01', end: str = '2022-12-31',
+                        freq: str = 'B', seed: int = 0, missing: float = 0.0) -> pd.DataFrame:
+    """
+    Generate synthetic commodity prices with the layout returned by get_stocks_data.
+
+    Prices follow a geometric random walk per ticker, so the data can be used by tests
+    and benchmarks without any network access.
+
+    :param tickers: List of tickers (defaults to a few commodity futures).
+    :param start: First date of the data.
+    :param end: Last date of the data.
+    :param freq: Bar frequency (e.g. 'B' for business days, 'h' for hourly bars).
+    :param seed: Seed of the random generator.
+    :param missing: Fraction of bars randomly removed for each ticker.
+    :return: Long-format DataFrame with 'Date', OHLC, 'Volume' and 'ticker' columns.
+    """
+    if tickers is None:
+        tickers = ['GC=F', 'CL=F', 'ZS=F', 'ZC=F']
+
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, end, freq=freq)
+    frames = []
+
+    for i, ticker in enumerate(tickers):
+        keep = rng.random(len(dates)) >= missing
+        returns = rng.normal(0.0002, 0.02, keep.sum())
+        close = 20.0 * (i + 1) * np.exp(np.cumsum(returns))
+        frames.append(pd.DataFrame({
+            'Date': dates[keep],
+            'Open': close * (1 + rng.normal(0, 0.002, len(close))),
+            'High': close * 1.01,
+            'Low': close * 0.99,
+            'Close': close,
+            'Volume': rng.integers(1000, 10000, len(close)),
+            'ticker': ticker
+        }))
+
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,102 @@
+from array import array
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+
+class TransactionLog:
+    """
+    Append-only, columnar transaction log.
+
+    Each column is a typed array.array, so appending a transaction is amortized O(1).
+    Tickers and actions are stored as integer codes. The pandas DataFrame is only
+    built when requested and cached until the next append.
+    """
+
+    columns = ['Date', 'Action', 'Ticker', 'Quantity', 'Price', 'Cash']
+
+    def __init__(self):
+        self._dates = array('q')  # Timestamps in nanoseconds
+        self._actions = array('q')
+        self._tickers = array('q')
+        self._quantities = array('q')
+        self._prices = array('d')
+        self._cash = array('d')
+        self._codes = {}  # Label -> code, shared by actions and tickers
+        self._labels = []
+        self._frame = None
+
+    def _code(self, label) -> int:
+        """
+        Integer code of a ticker or action label.
+        """
+        code = self._codes.get(label)
+        if code is None:
+            code = len(self._labels)
+            self._codes[label] = code
+            self._labels.append(label)
+        return code
+
+    def append(self, date: datetime, action: str, ticker: str, quantity: int, price: float, cash: float):
+        """
+        Record a transaction.
+        """
+        self._dates.append(pd.Timestamp(date).value)
+        self._actions.append(self._code(action))
+        self._tickers.append(self._code(ticker))
+        self._quantities.append(int(quantity))
+        self._prices.append(float(price))
+        self._cash.append(float(cash))
+        self._frame = None
+
+    def __len__(self):
+        return len(self._dates)
+
+    def to_arrays(self) -> dict:
+        """
+        Columns as NumPy arrays, with tickers and actions given by their codes.
+
+        The arrays are copies: a view on an array.array would prevent further appends.
+        """
+        return {
+            'Date': np.array(self._dates, dtype=np.int64).view('datetime64[ns]'),
+            'Action': np.array(self._actions, dtype=np.int64),
+            'Ticker': np.array(self._tickers, dtype=np.int64),
+            'Quantity': np.array(self._quantities, dtype=np.int64),
+            'Price': np.array(self._prices, dtype=np.float64),
+            'Cash': np.array(self._cash, dtype=np.float64)
+        }
+
+    def labels(self) -> np.ndarray:
+        """
+        Labels of the ticker and action codes, indexed by code.
+        """
+        return np.array(self._labels, dtype=object)
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Transaction log as a DataFrame with the columns of pybacktestchain's Broker.
+        """
+        if self._frame is None:
+            arrays = self.to_arrays()
+            labels = self.labels()
+            self._frame = pd.DataFrame({
+                'Date': arrays['Date'],
+                'Action': labels[arrays['Action']],
+                'Ticker': labels[arrays['Ticker']],
+                'Quantity': arrays['Quantity'],
+                'Price': arrays['Price'],
+                'Cash': arrays['Cash']
+            }, columns=self.columns)
+        return self._frame
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame = None) -> 'TransactionLog':
+        """
+        Build a log from an existing transaction DataFrame (or an empty log if None).
+        """
+        log = cls()
+        if frame is not None:
+            for row in frame.itertuples(index=False):
+                log.append(row.Date, row.Action, row.Ticker, row.Quantity, row.Price, row.Cash)
+        return log
@@ -0,0 +1,250 @@
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+from numba import njit
+
+from src.commomacrossoverbacktest.panel_data import PanelData
+from src.commomacrossoverbacktest.price_index import PriceIndex
+from src.commomacrossoverbacktest.exponentialmovingaverage import ExponentialMovingAverage
+from src.commomacrossoverbacktest.indicator_cache import IndicatorCache, default_indicator_cache
+from src.commomacrossoverbacktest.transaction_log import TransactionLog
+
+
+@njit(cache=True)
+def _portfolio_value(cash, quantities, prices):
+    """
+    Cash plus the value of the positions that have a price.
+    """
+    value = cash
+    for j in range(quantities.shape[0]):
+        if quantities[j] != 0 and prices[j] == prices[j]:
+            value += quantities[j] * prices[j]
+    return value
+
+
+@njit(cache=True)
+def _simulate_kernel(prices, event_steps, event_tickers, event_signals, cash, num_commodities):
+    """
+    Replay CommoBroker.commo_ptf over a panel of prices and a list of signal events.
+
+    :param prices: Execution prices, shape (n_steps, n_tickers), NaN when unavailable.
+    :param event_steps: Step at which each signal is executed, sorted.
+    :param event_tickers: Ticker column of each signal.
+    :param event_signals: Signal values (1 for Buy, -1 for Sell).
+    :param cash: Initial cash.
+    :param num_commodities: Number of commodities sharing the allocation.
+    :return: Cash and portfolio value per step, final quantities and the executed trades.
+    """
+    n_steps, n_tickers = prices.shape
+    n_events = event_steps.shape[0]
+    quantities = np.zeros(n_tickers, dtype=np.int64)
+    cash_path = np.empty(n_steps)
+    value_path = np.empty(n_steps)
+    trade_steps = np.empty(n_events, dtype=np.int64)
+    trade_tickers = np.empty(n_events, dtype=np.int64)
+    trade_quantities = np.empty(n_events, dtype=np.int64)
+    trade_prices = np.empty(n_events)
+    trade_cash = np.empty(n_events)
+    n_trades = 0
+
+    e = 0
+    for i in range(n_steps):
+        if e < n_events and event_steps[e] == i:
+            # 80% of the portfolio is split across the commodities
+            allocation_per_commodity = 0.8 * _portfolio_value(cash, quantities, prices[i]) / num_commodities
+
+            while e < n_events and event_steps[e] == i:
+                j = event_tickers[e]
+                signal = event_signals[e]
+                price = prices[i, j]
+                e += 1
+
+                # Skip if the price is not available
+                if price != price:
+                    continue
+
+                quantity = 0
+                if signal == -1:
+                    # Close an existing long position
+                    if quantities[j] > 0:
+                        quantity = -quantities[j]
+                        cash += price * quantities[j]
+                        quantities[j] = 0
+
+                elif signal == 1 and quantities[j] >= 0:
+                    # Open a long position, keeping within cash plus the 20% reserve
+                    quantity = int(allocation_per_commodity / price)
+                    available_cash = cash + 0.2 * _portfolio_value(cash, quantities, prices[i])
+                    if quantity * price > available_cash:
+                        quantity = int(available_cash / price)
+
+                    # CommoBroker.buy caps the order again with a reserve computed on cash only
+                    if quantity * price > cash + 0.2 * cash:
+                        quantity = int((cash + 0.2 * cash) / price)
+
+                    if quantity > 0:
+                        cash -= quantity * price
+                        quantities[j] += quantity
+                    else:
+                        quantity = 0
+
+                if quantity != 0:
+                    trade_steps[n_trades] = i
+                    trade_tickers[n_trades] = j
+                    trade_quantities[n_trades] = quantity
+                    trade_prices[n_trades] = price
+                    trade_cash[n_trades] = cash
+                    n_trades += 1
+
+        cash_path[i] = cash
+        value_path[i] = _portfolio_value(cash, quantities, prices[i])
+
+    return (
+        cash_path, value_path, quantities,
+        trade_steps[:n_trades], trade_tickers[:n_trades], trade_quantities[:n_trades],
+        trade_prices[:n_trades], trade_cash[:n_trades]
+    )
+
+
+def build_price_panel(data: pd.DataFrame, time_column: str = 'Date', ticker_column: str = 'ticker',
+                      price_column: str = 'Close'):
+    """
+    Pivot long-format market data into a dates x tickers price panel.
+
+    :return: Sorted dates, sorted tickers, the price panel (NaN when missing) and the
+             mask of the cells present in the data.
+    """
+    panel = PanelData.from_frame(data, time_column, ticker_column, [price_column])
+    return panel.dates, panel.tickers, panel.field(price_column), panel.present
+
+
+def simulate_signals(prices: np.ndarray, signal_steps: np.ndarray, signal_tickers: np.ndarray,
+                     signal_values: np.ndarray, initial_cash: float, num_commodities: int) -> dict:
+    """
+    Simulate the CommoBroker sizing rules for a list of signal events.
+
+    :param prices: Execution prices per step and ticker, NaN when unavailable.
+    :param signal_steps: Step of each signal, sorted (ties are executed in the given order).
+    :param signal_tickers: Ticker column of each signal.
+    :param signal_values: Signal values (1 for Buy, -1 for Sell).
+    :param initial_cash: Starting cash balance.
+    :param num_commodities: Number of commodities sharing the allocation.
+    :return: Dictionary of NumPy arrays: 'cash', 'value', 'quantities' and the trade columns.
+    """
+    outputs = _simulate_kernel(
+        np.ascontiguousarray(prices, dtype=np.float64),
+        np.asarray(signal_steps, dtype=np.int64),
+        np.asarray(signal_tickers, dtype=np.int64),
+        np.asarray(signal_values, dtype=np.int64),
+        float(initial_cash),
+        num_commodities
+    )
+    keys = ['cash', 'value', 'quantities', 'trade_steps', 'trade_tickers', 'trade_quantities', 'trade_prices', 'trade_cash']
+    return dict(zip(keys, outputs))
+
+
+def prepare_backtest_panel(data: pd.DataFrame, steps: pd.DatetimeIndex, time_column: str = 'Date',
+                           ticker_column: str = 'ticker', price_column: str = 'Close',
+                           max_age: timedelta = timedelta(days=360)) -> dict:
+    """
+    Build, once, every array the panel simulation needs for a given dataset.
+
+    :return: Dictionary with 'steps', 'dates', 'tickers', 'prices', 'present',
+             'execution_prices' (as-of prices on or before each step, within
+             `max_age`) and 'date_steps' (step at which a signal dated on each date
+             is executed, len(steps) if after the last step), 'versions'
+             (data_version of each ticker column, used in the indicator cache keys)
+             and 'price_column'.
+    """
+    steps = pd.DatetimeIndex(steps)
+    data_panel = PanelData.from_frame(data, time_column, ticker_column, [price_column])
+
+    # The as-of prices share the panel's date and ticker axes
+    execution_prices = PriceIndex.from_panel(data_panel, price_column).values_at(steps, max_age=max_age)
+
+    return {
+        'steps': steps,
+        'dates': data_panel.dates,
+        'tickers': data_panel.tickers,
+        'prices': data_panel.field(price_column),
+        'present': data_panel.present,
+        'execution_prices': execution_prices,
+        'date_steps': np.searchsorted(steps.to_numpy(), data_panel.dates, side='left'),
+        'versions': data_panel.versions(price_column),
+        'price_column': price_column
+    }
+
+
+def panel_events(panel: dict, short_window: int, medium_window: int, long_window: int,
+                 cache: IndicatorCache = None):
+    """
+    Signal events of the EMA crossover strategy over a whole panel.
+
+    :param cache: IndicatorCache of the EMA series (defaults to the process-wide cache),
+                  so that runs sharing a span compute it once.
+    :return: The execution step, ticker column and value of every signal executed
+             within the panel's steps, ordered by date then ticker.
+    """
+    if cache is None:
+        cache = default_indicator_cache()
+
+    # EMAs and crossover signals for every ticker at once
+    ema_calculator = ExponentialMovingAverage(short_window, medium_window, long_window)
+    emas = ema_calculator.compute_ema_panel(
+        panel['prices'], panel['present'], cache=cache, tickers=panel['tickers'],
+        versions=panel['versions'], price_column=panel['price_column']
+    )
+    signals = ema_calculator.generate_signal_panel(emas, panel['present'])
+
+    # Signal events, ordered by date then ticker, mapped to the step where they are executed
+    signal_rows, signal_tickers = np.nonzero(signals)
+    signal_steps = panel['date_steps'][signal_rows]
+    executed = signal_steps < panel['execution_prices'].shape[0]
+    return signal_steps[executed], signal_tickers[executed], signals[signal_rows, signal_tickers][executed]
+
+
+def run_panel(panel: dict, short_window: int, medium_window: int, long_window: int, initial_cash: float,
+              cache: IndicatorCache = None) -> dict:
+    """
+    Run the EMA crossover strategy on a panel built by prepare_backtest_panel.
+
+    :param cache: IndicatorCache of the EMA series, see panel_events.
+    :return: Dictionary of NumPy arrays returned by simulate_signals.
+    """
+    signal_steps, signal_tickers, signal_values = panel_events(panel, short_window, medium_window, long_window, cache)
+    return simulate_signals(
+        panel['execution_prices'], signal_steps, signal_tickers, signal_values, initial_cash, len(panel['tickers'])
+    )
+
+
+def vectorized_backtest(data: pd.DataFrame, steps: pd.DatetimeIndex, short_window: int, medium_window: int,
+                        long_window: int, initial_cash: float, time_column: str = 'Date',
+                        ticker_column: str = 'ticker', price_column: str = 'Close',
+                        max_age: timedelta = timedelta(days=360)):
+    """
+    Run the EMA crossover strategy over the whole dates x tickers panel at once.
+
+    Reproduces Backtest.run_backtest with PointInTimeEMAInformation and CommoBroker:
+    a signal dated d is executed at the first step on or after d, at the last price
+    observed on or before that step (within `max_age`), i.e. at the close of d itself
+    when d is a step, never at a price observed before the signal.
+
+    :param data: Long-format market data, as returned by get_stocks_data.
+    :param steps: Simulated dates.
+    :return: The P&L DataFrame ('Date', 'Portfolio Value') and the TransactionLog.
+    """
+    panel = prepare_backtest_panel(data, steps, time_column, ticker_column, price_column, max_age)
+    result = run_panel(panel, short_window, medium_window, long_window, initial_cash)
+    steps, tickers = panel['steps'], panel['tickers']
+
+    pnl_df = pd.DataFrame({'Date': steps, 'Portfolio Value': result['value']})
+
+    transaction_log = TransactionLog()
+    for step, ticker, quantity, price, cash in zip(
+        result['trade_steps'], result['trade_tickers'], result['trade_quantities'],
+        result['trade_prices'], result['trade_cash']
+    ):
+        action = 'BUY' if quantity > 0 else 'SELL'
+        transaction_log.append(steps[step], action, tickers[ticker], abs(quantity), price, cash)
+
+    return pnl_df, transaction_log
@@ -0,0 +1,183 @@
+from datetime import timedelta
+import os
+import pickle
+import numpy as np
+import pandas as pd
+
+from src.commomacrossoverbacktest.analytics import infer_periods_per_year, performance_metrics
+from src.commomacrossoverbacktest.exponentialmovingaverage import window_spans
+from src.commomacrossoverbacktest.sweep import _map_on_shared_panel, _panel
+from src.commomacrossoverbacktest.transaction_log import TransactionLog
+from src.commomacrossoverbacktest.vectorized import panel_events, prepare_backtest_panel, simulate_signals
+
+
+def walk_forward_folds(n_steps: int, train_size: int, test_size: int) -> list:
+    """
+    Rolling (train_start, train_end, test_end) step indices; each test window starts
+    where its train window ends and the windows roll forward by `test_size` steps.
+    """
+    if train_size <= 0 or test_size <= 0:
+        raise ValueError(f"train_size and test_size must be positive, got {train_size} and {test_size}.")
+    if train_size >= n_steps:
+        raise ValueError(f"A train window of {train_size} steps leaves no test step out of {n_steps} steps.")
+    return [
+        (start, start + train_size, min(start + train_size + test_size, n_steps))
+        for start in range(0, n_steps - train_size, test_size)
+    ]
+
+
+def _simulate_range(panel: dict, events: tuple, start: int, end: int, cash: float) -> dict:
+    """
+    Simulate the signal events of steps [start, end) from a flat portfolio.
+    """
+    event_steps, event_tickers, event_values = events
+    lo, hi = np.searchsorted(event_steps, [start, end], side='left')
+    return simulate_signals(
+        panel['execution_prices'][start:end], event_steps[lo:hi] - start, event_tickers[lo:hi],
+        event_values[lo:hi], cash, len(panel['tickers'])
+    )
+
+
+def _score(values: np.ndarray, objective, periods_per_year: int) -> float:
+    """
+    In-sample score of a value path (NaN scores rank last).
+    """
+    if callable(objective):
+        score = objective(values)
+    else:
+        score = performance_metrics(values, periods_per_year)[objective].iloc[0]
+    return -np.inf if np.isnan(score) else score
+
+
+def _evaluate_folds(folds: list, candidates: list, objective, periods_per_year: int, initial_cash: float,
+                    panel: dict = None) -> list:
+    """
+    Index and train score of the best candidate of each fold.
+
+    The signal events of a candidate are computed once over the whole panel (its EMAs
+    coming from the indicator cache) and then only sliced for each train window.
+    """
+    panel = _panel(panel)
+    events = [panel_events(panel, *candidate) for candidate in candidates]
+
+    best = []
+    for train_start, train_end, _ in folds:
+        scores = [
+            _score(_simulate_range(panel, candidate_events, train_start, train_end, initial_cash)['value'],
+                   objective, periods_per_year)
+            for candidate_events in events
+        ]
+        i = int(np.argmax(scores))
+        best.append((i, scores[i]))
+    return best
+
+
+def walk_forward(data: pd.DataFrame, steps: pd.DatetimeIndex, candidates, train_size: int, test_size: int,
+                 initial_cash: float = 1000000, objective='sharpe', periods_per_year: float = None,
+                 max_workers: int = None, time_column: str = 'Date', ticker_column: str = 'ticker',
+                 price_column: str = 'Close', max_age: timedelta = timedelta(days=360), bar_freq: str = None) -> dict:
+    """
+    Walk-forward optimization of the EMA windows.
+
+    For each fold, every candidate (short, medium, long) triple is simulated on the
+    train window and the best one is applied to the following test window. The test
+    windows are stitched into one P&L: each one starts flat with the value reached at
+    the end of the previous one, and the portfolio stays in cash during the first
+    train window. The positions still open at the end of a test window are closed by
+    SELL trades at its last step, so the transaction log matches the stitched P&L.
+
+    The panel is built once, the EMA series of each span are computed once over the
+    full history and the folds are optimized in parallel on shared memory; only the
+    broker simulation runs per fold and candidate.
+
+    :param data: Long-format market data, loaded once by the caller.
+    :param steps: Simulated dates.
+    :param candidates: Iterable of (short_window, medium_window, long_window) triples, in
+                       bars or as durations such as '4h' (see `bar_freq`).
+    :param train_size: Number of steps of each train window.
+    :param test_size: Number of steps of each test window.
+    :param objective: Column of performance_metrics to maximize, or function (values) -> score;
+                      with several workers the function is pickled, so it must be defined
+                      at module level (not a lambda or a local function).
+    :param periods_per_year: Steps per year, for the annualized objectives (inferred from `steps` by default).
+    :param max_workers: Number of processes (defaults to every core; 1 runs in-process).
+    :param bar_freq: Fixed bar frequency of the data, for windows given as durations.
+    :return: Dictionary with 'pnl' (Date, Portfolio Value), 'folds' (one row per fold
+             with its windows, the chosen triple and its train score) and 'transactions'
+             (TransactionLog of the test windows).
+    """
+    candidates = [tuple(candidate) for candidate in candidates]
+    spans = window_spans(candidates, bar_freq)
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if max_workers > 1 and callable(objective):
+        try:
+            pickle.dumps(objective)
+        except Exception as error:
+            raise ValueError(
+                f"The objective {objective!r} cannot be sent to worker processes ({error}); "
+                "define it at module level or use max_workers=1."
+            ) from error
+
+    # Check the window sizes before building the panel
+    folds = walk_forward_folds(len(steps), train_size, test_size)
+    panel = prepare_backtest_panel(data, steps, time_column, ticker_column, price_column, max_age)
+    steps, tickers = panel['steps'], panel['tickers']
+    if periods_per_year is None:
+        periods_per_year = infer_periods_per_year(steps)
+
+    # Optimize the folds, in parallel by chunks of consecutive folds
+    if max_workers == 1 or len(folds) <= 1:
+        best = _evaluate_folds(folds, spans, objective, periods_per_year, initial_cash, panel)
+    else:
+        size = -(-len(folds) // max_workers)
+        chunks = [folds[i:i + size] for i in range(0, len(folds), size)]
+        n = len(chunks)
+        results = _map_on_shared_panel(
+            panel, max_workers, _evaluate_folds, chunks, [spans] * n, [objective] * n,
+            [periods_per_year] * n, [initial_cash] * n
+        )
+        best = [result for chunk_results in results for result in chunk_results]
+
+    # Apply the winners out-of-sample and stitch the test windows
+    values = np.full(len(steps), float(initial_cash))
+    transaction_log = TransactionLog()
+    cash = float(initial_cash)
+    rows = []
+    for f, ((train_start, train_end, test_end), (i, score)) in enumerate(zip(folds, best)):
+        candidate = candidates[i]
+        result = _simulate_range(panel, panel_events(panel, *spans[i]), train_end, test_end, cash)
+        values[train_end:test_end] = result['value']
+        cash = result['value'][-1]
+
+        for step, ticker, quantity, price, trade_cash in zip(
+            result['trade_steps'], result['trade_tickers'], result['trade_quantities'],
+            result['trade_prices'], result['trade_cash']
+        ):
+            action = 'BUY' if quantity > 0 else 'SELL'
+            transaction_log.append(steps[train_end + step], action, tickers[ticker], abs(quantity), price, trade_cash)
+
+        # The next test window starts flat: close the open positions at the last step,
+        # at the prices the P&L is valued with (a position without a price is worth nothing)
+        if f < len(folds) - 1:
+            trade_cash = result['cash'][-1]
+            for ticker in np.flatnonzero(result['quantities']):
+                quantity = result['quantities'][ticker]
+                price = panel['execution_prices'][test_end - 1, ticker]
+                price = 0.0 if np.isnan(price) else price
+                trade_cash += quantity * price
+                transaction_log.append(steps[test_end - 1], 'SELL', tickers[ticker], quantity, price, trade_cash)
+
+        rows.append({
+            'train_start': steps[train_start], 'train_end': steps[train_end - 1],
+            'test_start': steps[train_end], 'test_end': steps[test_end - 1],
+            'short_window': candidate[0], 'medium_window': candidate[1], 'long_window': candidate[2],
+            'train_score': score
+        })
+
+    return {
+        'pnl': pd.DataFrame({'Date': steps, 'Portfolio Value': values}),
+        'folds': pd.DataFrame(rows),
+        'transactions': transaction_log
+    }
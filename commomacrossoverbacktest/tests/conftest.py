@@ -0,0 +1,22 @@
+import pytest
+from datetime import datetime
+import src.commomacrossoverbacktest.commo_backtest as commo_backtest
+from src.commomacrossoverbacktest.commo_backtest import Backtest
+from src.commomacrossoverbacktest.synthetic import make_commodity_data
+
+
+@pytest.fixture
+def synthetic_backtest(monkeypatch, tmp_path):
+    # Données synthétiques à la place du téléchargement, résultats écrits dans un dossier temporaire
+    data = make_commodity_data(['GC=F', 'CL=F', 'ZS=F', 'OJ=F'], '2020-01-01', '2021-06-30', seed=3, missing=0.05)
+    monkeypatch.setattr(commo_backtest, 'get_stocks_data', lambda *args: data.copy())
+    monkeypatch.chdir(tmp_path)
+
+    def make_backtest():
+        return Backtest(
+            initial_date=datetime(2020, 1, 1),
+            final_date=datetime(2021, 6, 30),
+            universe=['GC=F', 'CL=F', 'ZS=F', 'OJ=F'],
+            verbose=False
+        )
+    return make_backtest
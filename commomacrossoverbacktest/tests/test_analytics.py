@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from src.commomacrossoverbacktest.analytics import infer_periods_per_year, performance_metrics, pnl_attribution, trade_metrics
+from src.commomacrossoverbacktest.batch_broker import run_panel_batch
+from src.commomacrossoverbacktest.commo_backtest import Backtest
+from src.commomacrossoverbacktest.synthetic import make_commodity_data
+from src.commomacrossoverbacktest.vectorized import prepare_backtest_panel
+
+
+def test_performance_metrics_of_known_series():
+    values = np.array([
+        [100.0, 110.0, 99.0, 120.0, 108.0],
+        [100.0, 100.0, 100.0, 100.0, 100.0]
+    ])
+    metrics = performance_metrics(values, periods_per_year=4)
+
+    np.testing.assert_allclose(metrics['total_return'], [0.08, 0.0])
+    np.testing.assert_allclose(metrics['max_drawdown'], [-0.1, 0.0])
+    assert list(metrics['max_drawdown_duration']) == [1, 0]
+
+    returns = values[0, 1:] / values[0, :-1] - 1
+    np.testing.assert_allclose(metrics['annualized_volatility'][0], returns.std(ddof=1) * 2)
+    np.testing.assert_allclose(metrics['sharpe'][0], returns.mean() / returns.std(ddof=1) * 2)
+    assert np.isnan(metrics['sharpe'][1])
+
+
+def test_periods_per_year_inferred_from_dates():
+    assert infer_periods_per_year(pd.date_range('2021-01-01', '2021-12-31', freq='D')) == 365
+    assert infer_periods_per_year(pd.bdate_range('2021-01-01', '2021-12-31')) == 252
+    assert abs(infer_periods_per_year(pd.date_range('2021-01-01', '2023-12-31', freq='W-FRI')) - 52.18) < 0.1
+
+    # P&L de Backtest, complété sur tous les jours calendaires
+    rng = np.random.default_rng(19)
+    dates = pd.date_range('2021-01-01', '2021-12-31', freq='D')
+    pnl = pd.DataFrame({'Date': dates, 'Portfolio Value': 100 * np.cumprod(1 + rng.normal(0, 0.01, len(dates)))})
+    pd.testing.assert_frame_equal(performance_metrics(pnl), performance_metrics(pnl, periods_per_year=365))
+    series = pnl.set_index('Date')['Portfolio Value']
+    pd.testing.assert_frame_equal(performance_metrics(series), performance_metrics(pnl, periods_per_year=365))
+
+
+def test_attribution_adds_up_to_backtest_pnl(monkeypatch, tmp_path):
+    data = make_commodity_data(['GC=F', 'CL=F', 'ZS=F'], '2020-01-01', '2021-12-31', seed=17)
+    monkeypatch.chdir(tmp_path)
+    backtest = Backtest(
+        initial_date=datetime(2020, 1, 1), final_date=datetime(2021, 12, 31), universe=['GC=F', 'CL=F', 'ZS=F'],
+        initial_cash=100000, verbose=False, data_loader=lambda *args: data.copy()
+    )
+    pnl = backtest.run_backtest()
+    log = backtest.broker.get_transaction_log()
+
+    # Prix de la dernière valorisation : dernières cotations jusqu'au dernier pas inclus
+    last_step = backtest.trading_dates(data)[-1]
+    final_prices = data[data['Date'] <= last_step].sort_values(by='Date').groupby('ticker')['Close'].last().to_dict()
+    attribution = pnl_attribution(log, final_prices)
+    np.testing.assert_allclose(attribution['Total PnL'].sum(), pnl['Portfolio Value'].iloc[-1] - 100000)
+
+    metrics = trade_metrics(log, pnl)
+    assert metrics['n_trades'][0] == len(log)
+    assert 0 <= metrics['hit_rate'][0] <= 1
+
+
+def test_metrics_of_many_runs_match_single_runs():
+    data = make_commodity_data(['GC=F', 'CL=F', 'ZS=F'], '2020-01-01', '2021-12-31', seed=18)
+    panel = prepare_backtest_panel(data, pd.date_range('2020-01-01', '2021-12-31', freq='D'))
+    windows = [(5, 20, 50), (10, 30, 100), (3, 10, 30)]
+    values, broker = run_panel_batch(panel, windows, 100000)
+    log = broker.get_transaction_log()
+
+    metrics = performance_metrics(values, periods_per_year=365)
+    trades = trade_metrics(log, values, run_column='Portfolio')
+    assert list(trades['n_trades']) == list(broker.trade_counts)
+
+    for p in range(len(windows)):
+        pd.testing.assert_frame_equal(
+            performance_metrics(values[p], periods_per_year=365).reset_index(drop=True),
+            metrics.iloc[[p]].reset_index(drop=True)
+        )
+        single = trade_metrics(log[log['Portfolio'] == p], values[p])
+        np.testing.assert_allclose(single['hit_rate'][0], trades['hit_rate'][p])
+        np.testing.assert_allclose(single['turnover'][0], trades['turnover'][p])
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+from src.commomacrossoverbacktest.batch_broker import BatchCommoBroker
+from src.commomacrossoverbacktest.commo_broker import CommoBroker
+
+
+def test_batch_broker_matches_commo_broker():
+    tickers = ['CL=F', 'GC=F', 'ZS=F']
+    rng = np.random.default_rng(15)
+    batch = BatchCommoBroker([100000, 50000, 20000], tickers)
+    brokers = [CommoBroker(cash) for cash in (100000, 50000, 20000)]
+    for broker in brokers:
+        broker.verbose = False
+
+    for t in pd.date_range('2023-01-02', periods=30):
+        prices = rng.uniform(50, 150, len(tickers))
+        prices[rng.random(len(tickers)) < 0.1] = np.nan
+        signals = rng.choice([-1, 0, 1], size=(len(tickers), len(brokers)))
+
+        batch.execute_signals(t, np.arange(len(tickers)), signals, prices, len(tickers))
+        price_dict = {ticker: price for ticker, price in zip(tickers, prices) if not np.isnan(price)}
+        for p, broker in enumerate(brokers):
+            broker.execute_signals(t, tickers, signals[:, p], price_dict, len(tickers))
+
+        expected = [broker.get_portfolio_value(price_dict) for broker in brokers]
+        np.testing.assert_allclose(batch.get_portfolio_value(prices), expected, rtol=1e-12)
+
+    for p, broker in enumerate(brokers):
+        np.testing.assert_allclose(batch.cash[p], broker.cash, rtol=1e-12)
+        for ticker, position in broker.positions.items():
+            j = tickers.index(ticker)
+            assert batch.quantities[p, j] == position.quantity
+            np.testing.assert_allclose(batch.entry_prices[p, j], position.entry_price)
+
+        log = batch.get_transaction_log()
+        log = log[log['Portfolio'] == p].drop(columns='Portfolio').reset_index(drop=True)
+        expected_log = broker.get_transaction_log()
+        assert list(log['Quantity']) == list(expected_log['Quantity'])
+        assert list(log['Action']) == list(expected_log['Action'])
+        assert list(log['Ticker']) == list(expected_log['Ticker'])
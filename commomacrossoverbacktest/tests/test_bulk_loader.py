@@ -0,0 +1,120 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+import pandas as pd
+import pytest
+from src.commomacrossoverbacktest.bulk_loader import BulkLoader, DirectorySource, HTTPSource
+from src.commomacrossoverbacktest.synthetic import make_commodity_data
+
+TICKERS = [f'C{i:02d}=F' for i in range(40)]
+HISTORY = make_commodity_data(TICKERS, '2023-01-01', '2023-06-30', seed=51)
+LATENCY = 0.2
+
+
+class DataHandler(BaseHTTPRequestHandler):
+    # Serveur local qui simule la latence d'une source distante et quelques erreurs passagères
+    failures = {}
+    lock = threading.Lock()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        ticker = unquote(url.path.strip('/'))[:-len('.csv')]
+        query = parse_qs(url.query)
+        time.sleep(LATENCY)
+
+        with self.lock:
+            failing = self.failures.get(ticker, 0) > 0
+            if failing:
+                self.failures[ticker] -= 1
+        if failing:
+            self.send_error(503)
+            return
+
+        df = HISTORY[HISTORY['ticker'] == ticker].drop(columns='ticker')
+        if df.empty:
+            self.send_error(404)
+            return
+        df = df[(df['Date'] >= query['start'][0]) & (df['Date'] < query['end'][0])]
+        body = df.to_csv(index=False).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/csv')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), DataHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+    httpd.server_close()
+    DataHandler.failures = {}
+
+
+def test_concurrent_http_loading_takes_about_one_round_trip(server):
+    loader = BulkLoader(HTTPSource(server), max_workers=40)
+
+    start = time.perf_counter()
+    data = loader.get_stocks_data(TICKERS, '2023-02-01', '2023-05-01')
+    elapsed = time.perf_counter() - start
+
+    # 40 requêtes en série prendraient 40 x LATENCY
+    assert elapsed < 10 * LATENCY
+    assert set(data['ticker']) == set(TICKERS)
+    assert len(data) == ((HISTORY['Date'] >= '2023-02-01') & (HISTORY['Date'] < '2023-05-01')).sum()
+    assert data['Date'].is_monotonic_increasing
+    assert (data.groupby('Date')['ticker'].apply(lambda tickers: tickers.is_monotonic_increasing)).all()
+
+
+def test_failed_requests_are_retried(server):
+    DataHandler.failures = {'C00=F': 2, 'C01=F': 5}
+    loader = BulkLoader(HTTPSource(server), max_workers=4, retries=2, backoff=0.01)
+
+    data = loader.get_stocks_data(['C00=F', 'C01=F', 'UNKNOWN'], '2023-01-01', '2023-07-01')
+
+    # C00=F réussit à la troisième tentative, C01=F et UNKNOWN sont abandonnés
+    assert set(data['ticker']) == {'C00=F'}
+    assert DataHandler.failures['C01=F'] == 2
+
+
+def test_directory_source(tmp_path):
+    for ticker in TICKERS[:3]:
+        frame = HISTORY[HISTORY['ticker'] == ticker].drop(columns='ticker')
+        frame.to_csv(tmp_path / (ticker.replace('=', '%3D') + '.csv'), index=False)
+
+    data = BulkLoader(DirectorySource(str(tmp_path))).get_stocks_data(TICKERS[:4], '2023-03-01', '2023-04-01')
+
+    assert set(data['ticker']) == set(TICKERS[:3])
+    assert data['Date'].min() >= pd.Timestamp('2023-03-01') and data['Date'].max() < pd.Timestamp('2023-04-01')
+    expected = HISTORY[(HISTORY['ticker'] == TICKERS[0]) & (HISTORY['Date'] >= '2023-03-01') & (HISTORY['Date'] < '2023-04-01')]
+    pd.testing.assert_series_equal(
+        data.loc[data['ticker'] == TICKERS[0], 'Close'].reset_index(drop=True), expected['Close'].reset_index(drop=True)
+    )
+
+
+def test_empty_results_are_retried():
+    calls = []
+
+    def flaky_source(ticker, start_date, end_date):
+        # Comme yfinance : un échec renvoie un DataFrame vide au lieu de lever une exception
+        calls.append(ticker)
+        if calls.count(ticker) < 3:
+            return pd.DataFrame()
+        return HISTORY[HISTORY['ticker'] == ticker].reset_index(drop=True)
+
+    data = BulkLoader(flaky_source, retries=2, backoff=0.01).get_stocks_data(['C00=F'], '2023-01-01', '2023-07-01')
+    assert calls == ['C00=F'] * 3
+    assert len(data) == (HISTORY['ticker'] == 'C00=F').sum()
+
+
+def test_all_tickers_failing_raises(tmp_path):
+    loader = BulkLoader(DirectorySource(str(tmp_path)), retries=1, backoff=0.01)
+    with pytest.raises(ValueError, match='GC=F, CL=F'):
+        loader.get_stocks_data(['GC=F', 'CL=F'], '2023-01-01', '2023-07-01')
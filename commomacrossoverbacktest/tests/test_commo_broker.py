@@ -82,6 +82,37 @@ def test_commobroker_handle_unavailable_prices():
     # Vérifie que ZC=F n'a pas de position créée
     assert "ZC=F" not in broker.positions
 
+def test_commobroker_commo_ptf_signal_cursor():
+    broker = CommoBroker(cash=5000)
+
+    # Historique complet des signaux, dont un signal futur
+    signals = pd.DataFrame([
+        {"ticker": "CL=F", "Signal": 1, "Date": datetime(2024, 1, 1)},
+        {"ticker": "CL=F", "Signal": -1, "Date": datetime(2024, 1, 3)}
+    ])
+    prices = {"CL=F": 60}
+
+    broker.commo_ptf(t=datetime(2024, 1, 1), signals=signals, prices=prices)
+    assert len(broker.transaction_log) == 1
+
+    # Le signal du 1er janvier n'est pas rejoué le lendemain
+    broker.commo_ptf(t=datetime(2024, 1, 2), signals=signals, prices=prices)
+    assert len(broker.transaction_log) == 1
+    assert broker.positions["CL=F"].quantity > 0
+
+    # Le signal de vente est exécuté à sa date
+    broker.commo_ptf(t=datetime(2024, 1, 3), signals=signals, prices=prices)
+    assert len(broker.transaction_log) == 2
+    assert "CL=F" not in broker.positions
+
+def test_commobroker_execute_signals_arrays():
+    broker = CommoBroker(cash=5000)
+    broker.execute_signals(datetime(2024, 1, 1), ["CL=F", "GC=F"], [1, 1], {"CL=F": 60, "GC=F": 1500}, num_commodities=2)
+
+    # 80% du portefeuille réparti sur deux commodités
+    assert broker.positions["CL=F"].quantity == int(0.8 * 5000 / 2 / 60)
+    assert broker.positions["GC=F"].quantity == 1
+
 #def test_commobroker_short_covering():
     #broker = CommoBroker(cash=2000)
 
@@ -1,6 +1,11 @@
 from pybacktestchain.data_module import DataModule, get_stocks_data
-from src.commomacrossoverbacktest.commo_informations import CommodityInformation
+from src.commomacrossoverbacktest.commo_backtest import Backtest
+from src.commomacrossoverbacktest.commo_informations import (
+    CommodityInformation, ExponentialMovingAverageInformation, PointInTimeEMAInformation
+)
+from src.commomacrossoverbacktest.synthetic import make_commodity_data as make_synthetic_data
 from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
 
 # Liste des commodités (tickers pour les contrats futures)
@@ -45,3 +50,106 @@ except Exception as e:
     # En cas d'erreur, afficher un message
     print("Une erreur s'est produite :")
     print(e)
+
+
+def make_random_walk_data():
+    # Marches aléatoires reproductibles, pour obtenir des croisements d'EMA tout au long de l'année
+    dates = pd.date_range('2022-01-03', periods=250, freq='B')
+    rng = np.random.default_rng(7)
+    return pd.concat([
+        pd.DataFrame({'Date': dates, 'ticker': ticker, 'Close': 100 * np.exp(np.cumsum(rng.normal(0, 0.02, len(dates))))})
+        for ticker in ['GC=F', 'CL=F']
+    ], ignore_index=True)
+
+
+def signal_rows(signals):
+    return sorted(zip(pd.to_datetime(signals['Date']), signals['ticker'], signals['Signal']))
+
+
+def test_point_in_time_signals_are_served_up_to_t():
+    data_module = DataModule(make_random_walk_data())
+    windows = dict(short_window=3, medium_window=8, long_window=20)
+    info = PointInTimeEMAInformation(data_module=data_module, time_column='Date', adj_close_column='Close', **windows)
+    reference = ExponentialMovingAverageInformation(
+        data_module=data_module, time_column='Date', adj_close_column='Close', **windows
+    )
+    all_signals = reference.compute_information(None)['signals']
+    assert len(all_signals) > 0
+
+    # Seuls les signaux datés au plus tard de t sont visibles, sans signal futur
+    for t in [datetime(2022, 1, 3), datetime(2022, 1, 14), datetime(2022, 6, 30), datetime(2022, 12, 31)]:
+        signals = info.compute_information(t)['signals']
+        assert (pd.to_datetime(signals['Date']) <= t).all()
+        assert signal_rows(signals) == signal_rows(all_signals[pd.to_datetime(all_signals['Date']) <= t])
+
+
+def test_point_in_time_information_follows_window_changes():
+    data_module = DataModule(make_random_walk_data())
+    info = PointInTimeEMAInformation(
+        data_module=data_module, time_column='Date', adj_close_column='Close',
+        short_window=3, medium_window=8, long_window=20
+    )
+    t = datetime(2022, 12, 31)
+    before = signal_rows(info.compute_information(t)['signals'])
+
+    # Les EMA sont recalculées lorsque les fenêtres changent
+    info.short_window, info.medium_window = 5, 13
+    reference = ExponentialMovingAverageInformation(
+        data_module=data_module, time_column='Date', adj_close_column='Close',
+        short_window=5, medium_window=13, long_window=20
+    )
+    after = signal_rows(info.compute_information(t)['signals'])
+    assert after == signal_rows(reference.compute_information(t)['signals'])
+    assert after != before
+
+
+def make_commodity_data():
+    dates = pd.bdate_range('2023-01-02', periods=10)
+    gold = pd.DataFrame({'Date': dates, 'Close': [1800.0 + i for i in range(10)], 'ticker': 'GC=F'})
+    oil = pd.DataFrame({'Date': dates[::2], 'Close': [70.0 + i for i in range(5)], 'ticker': 'CL=F'})
+    return pd.concat([gold, oil], ignore_index=True)
+
+
+def test_get_prices_as_of():
+    data = make_commodity_data()
+    info = CommodityInformation(DataModule(data), 'Date', 'Close', commodity_column='ticker')
+
+    for t in pd.date_range('2022-12-30', '2023-01-20'):
+        expected = data[data['Date'] <= t].groupby('ticker')['Close'].last().to_dict()
+        assert info.get_prices(t) == expected
+
+
+def test_get_price_panel():
+    data = make_commodity_data()
+    info = CommodityInformation(DataModule(data), 'Date', 'Close', commodity_column='ticker')
+    panel = info.get_price_panel(datetime(2023, 1, 1), datetime(2023, 1, 10))
+
+    assert list(panel.columns) == ['CL=F', 'GC=F']
+    assert panel.loc['2023-01-01'].isna().all()
+    # Le week-end reprend le dernier prix connu
+    assert panel.loc['2023-01-07', 'GC=F'] == 1804.0
+    assert panel.loc['2023-01-10', 'CL=F'] == info.get_prices(datetime(2023, 1, 10))['CL=F']
+
+
+def test_point_in_time_signals_fill_at_their_close(monkeypatch, tmp_path):
+    data = make_synthetic_data(['GC=F', 'CL=F', 'ZS=F', 'OJ=F'], '2020-01-01', '2021-06-30', seed=3, missing=0.05)
+    monkeypatch.chdir(tmp_path)
+    backtest = Backtest(
+        initial_date=datetime(2020, 1, 1), final_date=datetime(2021, 6, 30), universe=['GC=F', 'CL=F', 'ZS=F', 'OJ=F'],
+        verbose=False, data_loader=lambda *args: data.copy()
+    )
+    backtest.run_backtest()
+    log = backtest.broker.get_transaction_log()
+    assert len(log) > 0
+
+    # Chaque ordre est exécuté le jour de son signal, à la clôture de ce jour (jamais à la veille)
+    closes = data.set_index(['Date', 'ticker'])['Close']
+    info = PointInTimeEMAInformation(None, DataModule(data), 'Date', 'ticker', 'Close')
+    signals = info.compute_information(datetime(2021, 6, 30))['signals'].set_index(['Date', 'ticker'])['Signal']
+    for date, ticker, price in zip(log['Date'], log['Ticker'], log['Price']):
+        assert price == closes[(date, ticker)]
+        assert signals[(date, ticker)] != 0
+
+    gold = log[log['Ticker'] == 'GC=F'].iloc[0]
+    assert gold['Date'] == pd.Timestamp('2020-01-03')
+    np.testing.assert_allclose(gold['Price'], 20.69, atol=0.005)
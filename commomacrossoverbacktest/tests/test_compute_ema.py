@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+from src.commomacrossoverbacktest.exponentialmovingaverage import ExponentialMovingAverage
+
+
+def make_prices(seed=0):
+    rng = np.random.default_rng(seed)
+    frames = []
+    for ticker in ['GC=F', 'CL=F', 'ZC=F']:
+        prices = rng.normal(100, 5, 400)
+        prices[rng.random(400) < 0.1] = np.nan  # Jours sans cotation
+        prices[:3] = np.nan
+        frames.append(pd.DataFrame({'Date': pd.bdate_range('2022-01-03', periods=400), 'Close': prices, 'ticker': ticker}))
+    return pd.concat(frames).sample(frac=1, random_state=seed)
+
+
+def test_compute_ema_per_ticker_matches_pandas():
+    df = make_prices()
+    result = ExponentialMovingAverage(short_window=5, medium_window=20, long_window=250).compute_ema(
+        df, price_column='Close', date_column='Date'
+    )
+
+    for ticker, group in result.groupby('ticker'):
+        for column, span in [('EMA_Short', 5), ('EMA_Medium', 20), ('EMA_Long', 250)]:
+            expected = group['Close'].ewm(span=span, adjust=False).mean()
+            pd.testing.assert_series_equal(group[column], expected, check_names=False)
+
+
+def test_compute_ema_does_not_mutate_input():
+    df = make_prices(seed=1)
+    original = df.copy()
+    result = ExponentialMovingAverage().compute_ema(df, price_column='Close')
+
+    pd.testing.assert_frame_equal(df, original)
+    assert {'EMA_Short', 'EMA_Medium', 'EMA_Long'}.issubset(result.columns)
+    assert list(result.index) == list(df.index)
@@ -0,0 +1,84 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from src.commomacrossoverbacktest.continuous import ContinuousContractStore, build_continuous, read_contract_files
+
+DATES = pd.bdate_range('2023-01-02', '2023-09-29')
+SPOT = pd.Series(100 + np.cumsum(np.random.default_rng(3).normal(0, 1, len(DATES))), index=DATES)
+
+
+def make_contract(k, start, end, volume):
+    # Le contrat k cote le spot plus 5 par échéance (contango)
+    dates = DATES[(DATES >= start) & (DATES <= end)]
+    close = SPOT[dates].to_numpy() + 5 * k
+    return pd.DataFrame({'Date': dates, 'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close,
+                         'Volume': [volume(date) for date in dates]})
+
+
+CONTRACTS = {
+    'GCH23': make_contract(0, '2023-01-02', '2023-03-31', lambda date: 1000 if date < pd.Timestamp('2023-03-15') else 100),
+    'GCM23': make_contract(1, '2023-02-01', '2023-06-30', lambda date: 500 if date < pd.Timestamp('2023-06-15') else 50),
+    'GCU23': make_contract(2, '2023-04-03', '2023-09-29', lambda date: 400),
+}
+
+
+def write_contracts(directory):
+    os.makedirs(directory, exist_ok=True)
+    for name, df in CONTRACTS.items():
+        df.to_csv(os.path.join(directory, name + '.csv'), index=False)
+
+
+def test_volume_roll_with_difference_adjustment(tmp_path):
+    write_contracts(tmp_path)
+    series, schedule = build_continuous(read_contract_files(str(tmp_path)), 'GC=F', 'volume', 'difference')
+
+    assert list(schedule['Date']) == [pd.Timestamp('2023-03-15'), pd.Timestamp('2023-06-15')]
+    assert list(schedule['From']) == ['GCH23', 'GCM23'] and list(schedule['To']) == ['GCM23', 'GCU23']
+    np.testing.assert_allclose(schedule['Adjustment'], [5.0, 5.0])
+
+    # Sans écart de roll, la série ajustée est le spot décalé du dernier contrat
+    assert series['Date'].is_monotonic_increasing and len(series) == len(DATES)
+    np.testing.assert_allclose(series['Close'], SPOT.to_numpy() + 10)
+    assert set(series['ticker']) == {'GC=F'}
+
+
+def test_calendar_roll_with_ratio_adjustment(tmp_path):
+    write_contracts(tmp_path)
+    series, schedule = build_continuous(read_contract_files(str(tmp_path)), 'GC=F', 'calendar', 'ratio', roll_days=5)
+
+    first_expiry = CONTRACTS['GCH23']['Date']
+    assert schedule['Date'].iloc[0] == first_expiry.iloc[-6]
+
+    # Le dernier segment n'est pas ajusté, les précédents sont multipliés par les ratios suivants
+    last = series[series['contract'] == 'GCU23']
+    np.testing.assert_allclose(last['Close'], CONTRACTS['GCU23'].set_index('Date').loc[last['Date'], 'Close'])
+    first = series[series['contract'] == 'GCH23']
+    factor = schedule['Adjustment'].prod()
+    np.testing.assert_allclose(first['Close'], CONTRACTS['GCH23'].set_index('Date').loc[first['Date'], 'Close'] * factor)
+    np.testing.assert_allclose(first['High'], CONTRACTS['GCH23'].set_index('Date').loc[first['Date'], 'High'] * factor)
+
+
+def test_store_caches_series_and_schedule(tmp_path):
+    source = tmp_path / 'contracts'
+    write_contracts(source / 'GC%3DF')
+    store = ContinuousContractStore(str(source), str(tmp_path / 'cache'), rule='volume', adjustment='difference')
+
+    assert store.build('GC=F')
+    assert not store.build('GC=F')
+
+    data = store.get_stocks_data(['GC=F'], '2023-02-01', '2023-07-01')
+    assert data['Date'].min() >= pd.Timestamp('2023-02-01') and data['Date'].max() < pd.Timestamp('2023-07-01')
+    np.testing.assert_allclose(data['Close'], SPOT['2023-02-01':'2023-06-30'].to_numpy() + 10)
+    assert list(store.roll_schedule('GC=F')['To']) == ['GCM23', 'GCU23']
+
+    # Un changement des réglages ou d'un fichier de contrat invalide le cache
+    store.adjustment = 'ratio'
+    assert store.build('GC=F')
+    os.utime(source / 'GC%3DF' / 'GCU23.csv', ns=(0, 0))
+    assert store.build('GC=F')
+
+
+def test_unknown_roll_rule():
+    with pytest.raises(ValueError):
+        build_continuous({}, 'GC=F', rule='expiry')
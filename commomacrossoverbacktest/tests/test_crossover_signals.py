@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+from src.commomacrossoverbacktest.exponentialmovingaverage import ExponentialMovingAverage
+
+
+def reference_signals(df):
+    # Boucle Python d'origine, conservée comme référence
+    signals_df = pd.DataFrame()
+    for ticker, group in df.sort_values(by=['ticker', 'Date']).groupby('ticker'):
+        group = group.dropna(subset=['EMA_Short', 'EMA_Medium', 'EMA_Long']).copy()
+        group['Signal'] = 0
+        position = None
+        for i in range(1, len(group)):
+            if (
+                group['EMA_Short'].iloc[i] > group['EMA_Medium'].iloc[i] > group['EMA_Long'].iloc[i] and
+                group['EMA_Short'].iloc[i - 1] <= group['EMA_Medium'].iloc[i - 1] and
+                position != 'Long'
+            ):
+                group.at[group.index[i], 'Signal'] = 1
+                position = 'Long'
+            elif (
+                group['EMA_Short'].iloc[i] < group['EMA_Medium'].iloc[i] < group['EMA_Long'].iloc[i] and
+                group['EMA_Short'].iloc[i - 1] >= group['EMA_Medium'].iloc[i - 1] and
+                position != 'Short'
+            ):
+                group.at[group.index[i], 'Signal'] = -1
+                position = 'Short'
+        signals_df = pd.concat([signals_df, group])
+    signals_df['Position'] = signals_df['Signal'].apply(lambda x: 'Buy' if x == 1 else ('Sell' if x == -1 else None))
+    return signals_df
+
+
+def make_ema_data(seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2023-01-01', periods=300)
+    frames = []
+    for ticker in ['ZS=F', 'CL=F', 'GC=F']:
+        prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, len(dates))))
+        df = pd.DataFrame({'Date': dates, 'Close': prices, 'ticker': ticker})
+        df['EMA_Short'] = df['Close'].ewm(span=5, adjust=False).mean()
+        df['EMA_Medium'] = df['Close'].ewm(span=20, adjust=False).mean()
+        df['EMA_Long'] = df['Close'].ewm(span=50, adjust=False).mean()
+        df.loc[:4, 'EMA_Long'] = np.nan
+        frames.append(df)
+    # Mélanger les lignes pour vérifier le tri
+    return pd.concat(frames).sample(frac=1, random_state=seed)
+
+
+def test_generate_signals_matches_reference():
+    df = make_ema_data()
+    expected = reference_signals(df)
+    result = ExponentialMovingAverage().generate_signals(df, filter_signals=False)
+
+    assert list(result.index) == list(expected.index)
+    assert (result['Signal'].to_numpy() == expected['Signal'].to_numpy()).all()
+    assert list(result['Position']) == list(expected['Position'])
+
+
+def test_generate_signals_filtered():
+    df = make_ema_data(seed=1)
+    expected = reference_signals(df)
+    expected = expected[expected['Signal'] != 0]
+    result = ExponentialMovingAverage().generate_signals(df)
+
+    assert len(result) > 0
+    assert list(result.index) == list(expected.index)
+    assert (result['Signal'] != 0).all()
@@ -0,0 +1,71 @@
+import pandas as pd
+from src.commomacrossoverbacktest.data_cache import MarketDataCache
+from src.commomacrossoverbacktest.synthetic import make_commodity_data
+
+HISTORY = make_commodity_data(['GC=F', 'CL=F'], '2023-01-01', '2023-12-31', seed=2)
+HISTORY['Date'] = HISTORY['Date'].dt.tz_localize('America/New_York')
+
+
+class RecordingFetcher:
+    # Source locale qui enregistre les plages demandées
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, ticker, start_date, end_date):
+        self.calls.append((ticker, start_date, end_date))
+        df = HISTORY[HISTORY['ticker'] == ticker]
+        dates = df['Date'].dt.tz_localize(None)
+        return df[(dates >= start_date) & (dates < end_date)].reset_index(drop=True)
+
+
+def test_cache_fetches_only_missing_ranges(tmp_path):
+    fetcher = RecordingFetcher()
+    cache = MarketDataCache(str(tmp_path), fetch=fetcher)
+
+    first = cache.get_stocks_data(['GC=F'], '2023-01-01', '2023-04-01')
+    assert fetcher.calls == [('GC=F', '2023-01-01', '2023-04-01')]
+
+    second = cache.get_stocks_data(['GC=F'], '2023-02-01', '2023-07-01')
+    assert fetcher.calls[1:] == [('GC=F', '2023-04-01', '2023-07-01')]
+
+    expected = fetcher('GC=F', '2023-02-01', '2023-07-01')
+    pd.testing.assert_series_equal(second['Close'], expected['Close'])
+    assert second['Date'].dt.tz is not None
+    assert first['Date'].min() == HISTORY.loc[HISTORY['ticker'] == 'GC=F', 'Date'].min()
+
+
+def test_offline_cache_never_fetches(tmp_path):
+    MarketDataCache(str(tmp_path), fetch=RecordingFetcher()).get_stocks_data(['GC=F', 'CL=F'], '2023-01-01', '2023-07-01')
+
+    fetcher = RecordingFetcher()
+    offline = MarketDataCache(str(tmp_path), fetch=fetcher, offline=True)
+    data = offline.get_stocks_data(['GC=F', 'CL=F'], '2023-03-01', '2023-12-31')
+
+    assert fetcher.calls == []
+    assert set(data['ticker']) == {'GC=F', 'CL=F'}
+    assert data['Date'].max().tz_localize(None) < pd.Timestamp('2023-07-01')
+
+
+def test_past_ranges_are_fetched_once(tmp_path):
+    fetcher = RecordingFetcher()
+    cache = MarketDataCache(str(tmp_path), fetch=fetcher)
+
+    # Plage se terminant un dimanche, puis ticker sans données : un seul téléchargement chacun
+    for _ in range(3):
+        cache.get_stock_data('GC=F', '2023-01-01', '2023-04-02')
+        cache.get_stock_data('ZS=F', '2023-01-01', '2023-02-01')
+    assert fetcher.calls == [('GC=F', '2023-01-01', '2023-04-02'), ('ZS=F', '2023-01-01', '2023-02-01')]
+
+    offline = MarketDataCache(str(tmp_path), offline=True)
+    assert len(offline.get_stock_data('GC=F', '2023-01-01', '2023-04-02')) == len(fetcher('GC=F', '2023-01-01', '2023-04-02'))
+
+
+def test_days_from_today_are_fetched_again(tmp_path):
+    fetcher = RecordingFetcher()
+    cache = MarketDataCache(str(tmp_path), fetch=fetcher)
+    today = pd.Timestamp.today().normalize()
+    end = str((today + pd.Timedelta(days=30)).date())
+
+    cache.get_stock_data('GC=F', '2023-10-01', end)
+    cache.get_stock_data('GC=F', '2023-10-01', end)
+    assert fetcher.calls == [('GC=F', '2023-10-01', end), ('GC=F', str(today.date()), end)]
@@ -0,0 +1,58 @@
+import json
+import os
+import subprocess
+import sys
+
+# Budget du temps d'import du coeur (pandas + numba compris), mesuré dans un processus neuf
+IMPORT_BUDGET_SECONDS = 1.5
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CORE_MODULES = [
+    'src.commomacrossoverbacktest.exponentialmovingaverage',
+    'src.commomacrossoverbacktest.vectorized',
+    'src.commomacrossoverbacktest.batch_broker',
+    'src.commomacrossoverbacktest.sweep',
+    'src.commomacrossoverbacktest.analytics',
+]
+
+# Fonctionnalités optionnelles importées uniquement à l'utilisation par commo_backtest
+LAZY_MODULES = [
+    'src.commomacrossoverbacktest.sweep',
+    'src.commomacrossoverbacktest.walk_forward',
+    'src.commomacrossoverbacktest.profiling',
+    'src.commomacrossoverbacktest.results_store',
+    'src.commomacrossoverbacktest.bulk_loader',
+]
+
+
+def import_in_subprocess(modules):
+    code = (
+        "import importlib, json, sys, time\n"
+        "start = time.perf_counter()\n"
+        f"for module in {modules!r}:\n"
+        "    importlib.import_module(module)\n"
+        "print(json.dumps({'seconds': time.perf_counter() - start, 'modules': sorted(sys.modules)}))\n"
+    )
+    output = subprocess.run([sys.executable, '-c', code], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.splitlines()[-1])
+
+
+def test_core_imports_without_plotting_or_network_libraries():
+    result = import_in_subprocess(CORE_MODULES)
+    loaded = {module.split('.')[0] for module in result['modules']}
+
+    assert not loaded & {'matplotlib', 'yfinance', 'pybacktestchain'}
+    assert result['seconds'] < IMPORT_BUDGET_SECONDS
+
+
+def test_backtest_import_does_not_load_plotting():
+    # pybacktestchain charge yfinance et configure les logs à l'import : seul matplotlib est vérifié ici
+    result = import_in_subprocess(['src.commomacrossoverbacktest.commo_backtest'])
+
+    assert 'matplotlib' not in {module.split('.')[0] for module in result['modules']}
+
+
+def test_backtest_import_does_not_load_optional_features():
+    result = import_in_subprocess(['src.commomacrossoverbacktest.commo_backtest'])
+
+    assert not set(LAZY_MODULES) & set(result['modules'])
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+from src.commomacrossoverbacktest.exponentialmovingaverage import ExponentialMovingAverage
+from src.commomacrossoverbacktest.indicator_cache import IndicatorCache
+from src.commomacrossoverbacktest.synthetic import make_commodity_data
+from src.commomacrossoverbacktest.vectorized import build_price_panel
+
+
+def test_cached_compute_ema_reuses_shared_spans():
+    data = make_commodity_data(['GC=F', 'CL=F', 'ZS=F'], '2020-01-01', '2021-12-31', seed=12, missing=0.1)
+    cache = IndicatorCache()
+
+    first = ExponentialMovingAverage(5, 20, 50).compute_ema(data, 'Close', 'Date', cache=cache)
+    assert (cache.hits, cache.misses, len(cache)) == (0, 9, 9)
+
+    # Seule la fenêtre longue est nouvelle : 6 séries viennent du cache, 3 sont calculées
+    second = ExponentialMovingAverage(5, 20, 100).compute_ema(data, 'Close', 'Date', cache=cache)
+    assert (cache.hits, cache.misses, len(cache)) == (6, 12, 12)
+
+    expected = ExponentialMovingAverage(5, 20, 100).compute_ema(data, 'Close', 'Date')
+    pd.testing.assert_frame_equal(second, expected)
+    pd.testing.assert_series_equal(first['EMA_Short'], expected['EMA_Short'])
+
+
+def test_cache_evicts_least_recently_used_and_persists(tmp_path):
+    cache = IndicatorCache(max_bytes=2 * 80, directory=tmp_path)
+    for span in (5, 20, 50):
+        cache.put(('GC=F', 'Close', span, 'v'), np.arange(10.0) * span)
+    assert len(cache) == 2 and ('GC=F', 'Close', 5, 'v') not in cache
+
+    # L'entrée évincée est relue depuis le disque, y compris par un autre cache
+    reloaded = IndicatorCache(directory=tmp_path).get(('GC=F', 'Close', 5, 'v'))
+    np.testing.assert_array_equal(reloaded, np.arange(10.0) * 5)
+    assert not reloaded.flags.writeable
+
+
+def test_cached_panel_matches_kernel():
+    data = make_commodity_data(['GC=F', 'CL=F', 'ZS=F'], '2020-01-01', '2021-12-31', seed=13, missing=0.1)
+    _, tickers, prices, present = build_price_panel(data)
+    cache = IndicatorCache()
+
+    for spans in [(5, 20, 50), (10, 20, 50), (5, 30, 50)]:
+        ema_calculator = ExponentialMovingAverage(*spans)
+        cached = ema_calculator.compute_ema_panel(prices, present, cache=cache, tickers=tickers)
+        np.testing.assert_array_equal(cached, ema_calculator.compute_ema_panel(prices, present))
+    assert len(cache) == 5 * len(tickers)
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.commomacrossoverbacktest.exponentialmovingaverage import ExponentialMovingAverage
+from src.commomacrossoverbacktest.market_data import compact_market_data, iter_market_data, read_market_data
+from src.commomacrossoverbacktest.synthetic import make_commodity_data
+
+
+def test_read_market_data_compacts_dtypes(tmp_path):
+    data = make_commodity_data(['GC=F', 'CL=F', 'ZS=F'], '2021-01-04', '2021-01-29', freq='h', seed=9)
+    data.to_csv(tmp_path / 'bars.csv', index=False)
+
+    compact = read_market_data(tmp_path / 'bars.csv', chunksize=1000)
+    assert len(compact) == len(data)
+    assert compact['Date'].dtype == 'datetime64[ns]'
+    assert compact['Close'].dtype == np.float32
+    assert isinstance(compact['ticker'].dtype, pd.CategoricalDtype)
+    assert list(compact['ticker'].cat.categories) == ['CL=F', 'GC=F', 'ZS=F']
+    np.testing.assert_allclose(compact['Close'], data['Close'], rtol=1e-6)
+    assert compact.memory_usage(deep=True).sum() < data.memory_usage(deep=True).sum() / 2
+
+
+def test_iter_signals_matches_batch_signals(tmp_path):
+    data = make_commodity_data(['GC=F', 'CL=F', 'ZS=F'], '2021-01-04', '2021-03-31', freq='h', seed=10, missing=0.1)
+    data = compact_market_data(data)
+    data.to_csv(tmp_path / 'bars.csv', index=False)
+
+    ema_calculator = ExponentialMovingAverage('4h', '1D', '5D', bar_freq='h')
+    batch = ema_calculator.generate_signals(ema_calculator.compute_ema(data, 'Close', 'Date'))
+    chunked = pd.concat(ema_calculator.iter_signals(iter_market_data(tmp_path / 'bars.csv', chunksize=2000), 'Close'))
+
+    assert len(batch) > 0
+    key = ['ticker', 'Date']
+    batch = batch.sort_values(by=key).reset_index(drop=True)
+    chunked = chunked.sort_values(by=key).reset_index(drop=True)
+    pd.testing.assert_frame_equal(chunked[key].astype(str), batch[key].astype(str))
+    np.testing.assert_array_equal(chunked['Signal'], batch['Signal'])
+    np.testing.assert_allclose(chunked['EMA_Long'], batch['EMA_Long'], rtol=1e-12)
+
+
+def test_spans_in_time_units():
+    ema_calculator = ExponentialMovingAverage('1h', '4h', '1D', bar_freq='min')
+    assert (ema_calculator.short_window, ema_calculator.medium_window, ema_calculator.long_window) == (60, 240, 1440)
+
+    with pytest.raises(ValueError):
+        ExponentialMovingAverage('1h', '4h', '1D')
+    with pytest.raises(ValueError):
+        ExponentialMovingAverage('1h', '4h', '1D', bar_freq='B')
@@ -0,0 +1,66 @@
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pytest
+from pybacktestchain.data_module import DataModule
+from src.commomacrossoverbacktest.commo_informations import (
+    ExponentialMovingAverageInformation, PointInTimeEMAInformation
+)
+from src.commomacrossoverbacktest.exponentialmovingaverage import ExponentialMovingAverage
+from src.commomacrossoverbacktest.panel_data import PanelData
+from src.commomacrossoverbacktest.synthetic import make_commodity_data
+
+
+def test_from_frame_pivots_fields_into_views():
+    data = make_commodity_data(['GC=F', 'CL=F'], '2021-01-01', '2021-03-31', seed=41, missing=0.1)
+    panel = PanelData.from_frame(data, fields=['Close', 'Volume'])
+
+    assert panel.tickers == ['CL=F', 'GC=F']
+    assert panel.shape == (len(data['Date'].unique()), 2)
+    assert panel.present.sum() == len(data)
+    gold = data[data['ticker'] == 'GC=F']
+    np.testing.assert_array_equal(panel.column('Close', 'GC=F')[panel.present[:, 1]], gold['Close'])
+    assert np.isnan(panel.field('Close')[~panel.present]).all()
+
+    # Accessors share the stored arrays, which are read-only
+    assert np.shares_memory(panel.column('Close', 'GC=F'), panel.field('Close'))
+    assert np.shares_memory(panel.until(10).field('Close'), panel.field('Close'))
+    with pytest.raises(ValueError):
+        panel.field('Close')[0, 0] = 1.0
+
+    np.testing.assert_array_equal(panel.gather('Volume'), data['Volume'])
+    assert panel.rows_until(datetime(2021, 1, 31)) == (panel.dates <= np.datetime64('2021-01-31')).sum()
+
+
+def test_panel_is_smaller_than_the_long_frame():
+    data = make_commodity_data(start='2018-01-01', end='2022-12-31', seed=42)
+    info = PointInTimeEMAInformation(None, DataModule(data), 'Date', 'ticker', 'Close', 5, 20, 50)
+    panel = info.signal_panel()
+
+    # Close, three EMAs and the signals against the frame alone, before its EMA copies
+    assert set(panel.fields) == {'Close', 'EMA_Short', 'EMA_Medium', 'EMA_Long', 'Signal'}
+    assert panel.nbytes < 0.5 * data.memory_usage(deep=True).sum()
+
+
+def test_information_signals_match_long_format_path():
+    data = make_commodity_data(['GC=F', 'CL=F', 'ZS=F'], '2020-01-01', '2021-06-30', seed=43, missing=0.05)
+    ema = ExponentialMovingAverage(5, 20, 50)
+    expected = ema.generate_signals(ema.compute_ema(data, 'Close')).sort_values('Date', kind='stable')
+
+    info = ExponentialMovingAverageInformation(None, DataModule(data), 'Date', 'ticker', 'Close', 5, 20, 50)
+    information_set = info.compute_information(None)
+    signals = information_set['signals']
+
+    np.testing.assert_array_equal(signals['Date'], expected['Date'])
+    np.testing.assert_array_equal(signals['ticker'], expected['ticker'])
+    np.testing.assert_array_equal(signals['Signal'], expected['Signal'])
+    full_data = information_set['full_data']
+    np.testing.assert_allclose(full_data.sort_index()['EMA_Long'], ema.compute_ema(data, 'Close')['EMA_Long'])
+
+    point_in_time = PointInTimeEMAInformation(None, DataModule(data), 'Date', 'ticker', 'Close', 5, 20, 50)
+    t = datetime(2020, 9, 30)
+    information_set = point_in_time.compute_information(t)
+    assert (information_set['signals']['Date'] <= t).all()
+    assert len(information_set['signals']) == (expected['Date'] <= t).sum()
+    assert information_set['panel'].dates[-1] <= np.datetime64(t)
+    assert information_set['panel'].shape[0] == point_in_time.signal_panel().rows_until(t)
@@ -0,0 +1,104 @@
+import math
+from pybacktestchain.broker import Position
+from src.commomacrossoverbacktest.position_book import PositionBook
+
+
+def test_position_book_behaves_like_dict():
+    book = PositionBook(capacity=1)
+    book["CL=F"] = Position("CL=F", 10, 60.0)
+    book["GC=F"] = Position("GC=F", 2, 1500.0)
+
+    assert isinstance(book, dict)
+    assert set(book) == {"CL=F", "GC=F"}
+    assert book["GC=F"].quantity == 2
+    assert book["GC=F"].entry_price == 1500.0
+
+    del book["CL=F"]
+    assert "CL=F" not in book
+
+
+def test_position_book_incremental_valuation():
+    book = PositionBook()
+    book["CL=F"] = Position("CL=F", 10, 60.0)
+    prices = {"CL=F": 65.0, "ZS=F": 12.0}
+    assert book.market_value(prices) == 650.0
+
+    # Les exécutions mettent à jour la valorisation sans tout recalculer
+    book["CL=F"].quantity = 4
+    book["ZS=F"] = Position("ZS=F", 100, 12.0)
+    assert book.market_value(prices) == 4 * 65.0 + 100 * 12.0
+
+    del book["ZS=F"]
+    assert book.market_value(prices) == 4 * 65.0
+
+    # Un nouveau dictionnaire de prix relance une valorisation complète
+    assert book.market_value({"CL=F": 70.0}) == 280.0
+    assert book.market_value({}) == 0.0
+
+
+def test_position_book_valuation_cached_by_version():
+    book = PositionBook()
+    book["CL=F"] = Position("CL=F", 10, 60.0)
+    prices = {"CL=F": 65.0}
+    assert book.market_value(prices, version=1) == 650.0
+
+    # Même clé : les prix sont supposés inchangés et la valeur en cache est servie
+    prices["CL=F"] = 70.0
+    assert book.market_value(prices, version=1) == 650.0
+
+    # Nouvelle clé, ou pas de clé : les positions ouvertes sont revalorisées
+    assert book.market_value(prices, version=2) == 700.0
+    prices["CL=F"] = 75.0
+    assert book.market_value(prices) == 750.0
+
+
+def test_position_book_nan_prices_propagate():
+    book = PositionBook()
+    book["CL=F"] = Position("CL=F", 10, 60.0)
+    book["GC=F"] = Position("GC=F", 1, 1500.0)
+
+    # Comme Broker.get_portfolio_value : un prix absent est ignoré, un prix NaN donne NaN
+    assert book.market_value({"CL=F": 65.0}) == 650.0
+    prices = {"CL=F": 65.0, "GC=F": float("nan")}
+    assert math.isnan(book.market_value(prices))
+    del book["GC=F"]
+    assert book.market_value(prices) == 650.0
+
+    book["GC=F"] = Position("GC=F", 2, 1500.0)
+    assert math.isnan(book.market_value(prices))
+    assert book.pop("GC=F").quantity == 2
+    assert book.market_value(prices) == 650.0
+
+
+def test_position_book_stores_slots_only():
+    book = PositionBook()
+    book["CL=F"] = Position("CL=F", 10, 60.0)
+    book["GC=F"] = Position("GC=F", 2, 1500.0)
+
+    # Le dictionnaire ne garde que les emplacements, les positions sont des vues sur les tableaux
+    assert list(dict.values(book)) == [0, 1]
+    assert [position.quantity for position in book.values()] == [10, 2]
+    assert {ticker: position.entry_price for ticker, position in book.items()} == {"CL=F": 60.0, "GC=F": 1500.0}
+    assert book.get("ZS=F") is None
+
+
+def test_position_book_dict_methods_use_positions():
+    book = PositionBook()
+    book["CL=F"] = Position("CL=F", 10, 60.0)
+    book.update({"GC=F": Position("GC=F", 2, 1500.0)})
+    assert book.setdefault("CL=F", Position("CL=F", 1, 1.0)).quantity == 10
+
+    # Les copies et conversions portent les positions, jamais les emplacements
+    plain = dict(book)
+    assert [position.quantity for position in plain.values()] == [10, 2]
+    copy = book.copy()
+    assert isinstance(copy, PositionBook) and copy == book
+    assert book == {"CL=F": Position("CL=F", 10, 60.0), "GC=F": Position("GC=F", 2, 1500.0)}
+
+    copy["CL=F"].quantity = 5
+    assert book["CL=F"].quantity == 10
+    assert copy != book
+
+    book.update(book)
+    assert book.market_value({"CL=F": 65.0, "GC=F": 1600.0}) == 10 * 65.0 + 2 * 1600.0
+    assert book.popitem()[1] == Position("GC=F", 2, 1500.0)
@@ -0,0 +1,24 @@
+import json
+from src.commomacrossoverbacktest.profiling import Profiler
+
+
+def test_profiled_backtest_reports_each_stage(synthetic_backtest, tmp_path):
+    backtest = synthetic_backtest()
+    backtest.profiler = Profiler(enabled=True, memory=True)
+    backtest.run_backtest()
+
+    report = backtest.profile_report()
+    steps = backtest.profiler.step_report()
+    assert {'load_data', 'get_prices', 'compute_information', 'commo_ptf', 'save_results'} <= set(report.index)
+    assert report.loc['get_prices', 'calls'] == len(steps) == len(backtest.trading_dates(backtest.load_data()))
+    assert (report['total_seconds'] > 0).all() and report['peak_allocated_mb'].max() > 0
+
+    backtest.profiler.write_trace(tmp_path / 'trace.json')
+    with open(tmp_path / 'trace.json') as f:
+        events = json.load(f)['traceEvents']
+    assert {event['cat'] for event in events} == {'stage', 'step'}
+
+    # Désactivé par défaut : rien n'est enregistré
+    quiet = synthetic_backtest()
+    quiet.run_backtest()
+    assert quiet.profile_report().empty
@@ -0,0 +1,96 @@
+import subprocess
+import sys
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pytest
+from datetime import datetime
+from src.commomacrossoverbacktest.commo_backtest import Backtest
+from src.commomacrossoverbacktest.results_store import ResultsStore
+from src.commomacrossoverbacktest.synthetic import make_commodity_data
+
+
+def test_backtests_append_to_one_store(monkeypatch, tmp_path):
+    data = make_commodity_data(['GC=F', 'CL=F', 'ZS=F'], '2021-01-01', '2021-12-31', seed=16)
+    monkeypatch.chdir(tmp_path)
+
+    pnls = {}
+    with ResultsStore(tmp_path / 'results.sqlite') as store:
+        for cash in (100000, 250000):
+            backtest = Backtest(
+                initial_date=datetime(2021, 1, 1), final_date=datetime(2021, 12, 31), universe=['GC=F', 'CL=F', 'ZS=F'],
+                initial_cash=cash, verbose=False, data_loader=lambda *args: data.copy(), results_store=store
+            )
+            pnls[backtest.run_id] = (backtest.run_backtest(), backtest.broker.get_transaction_log())
+
+        runs = store.runs()
+        assert set(runs['run_id']) == set(pnls)
+        assert sorted(runs['initial_cash']) == [100000, 250000]
+
+        # Valeurs à pleine précision, requêtes sur plusieurs runs
+        values = store.portfolio_values()
+        for run_id, (pnl, log) in pnls.items():
+            np.testing.assert_array_equal(values[run_id].to_numpy(), pnl['Portfolio Value'].to_numpy())
+            trades = store.transactions([run_id])
+            assert list(trades['quantity']) == list(log['Quantity'])
+            assert list(trades['price']) == list(log['Price'])
+
+        final = store.query('SELECT run_id, MAX(value) AS peak FROM portfolio GROUP BY run_id')
+        assert len(final) == 2
+
+    # Aucun fichier CSV par run lorsque la base est utilisée
+    assert not (tmp_path / 'backtests').exists()
+
+
+def test_synchronous_store(tmp_path):
+    store = ResultsStore(tmp_path / 'results.sqlite', asynchronous=False)
+    pnl = pd.DataFrame({'Date': pd.date_range('2023-01-01', periods=3, tz='UTC'), 'Portfolio Value': [1.0, 1.5, 2.25]})
+    store.save('run', pnl, parameters={'short_window': 5})
+
+    assert store.runs()['short_window'].tolist() == [5]
+    assert store.portfolio()['date'].tolist() == list(pd.date_range('2023-01-01', periods=3))
+    assert store.transactions().empty
+
+
+def test_each_run_has_its_own_id(tmp_path):
+    data = make_commodity_data(['GC=F', 'CL=F'], '2021-01-01', '2021-06-30', seed=17)
+    with ResultsStore(tmp_path / 'results.sqlite') as store:
+        backtest = Backtest(
+            initial_date=datetime(2021, 1, 1), final_date=datetime(2021, 6, 30), universe=['GC=F', 'CL=F'],
+            verbose=False, data_loader=lambda *args: data.copy(), results_store=store
+        )
+        backtest.run_vectorized()
+        vectorized_id = backtest.run_id
+        backtest.run_backtest()
+
+        assert backtest.run_id != vectorized_id
+        assert set(store.runs()['run_id']) == {vectorized_id, backtest.run_id}
+
+
+def test_failed_run_does_not_drop_the_others(tmp_path):
+    pnl = pd.DataFrame({'Date': pd.date_range('2023-01-01', periods=3), 'Portfolio Value': [1.0, 2.0, 3.0]})
+    store = ResultsStore(tmp_path / 'results.sqlite')
+    for run_id in ('a', 'b', 'a', 'c'):
+        store.save(run_id, pnl)
+
+    # Le doublon est signalé, les autres runs sont écrits
+    with pytest.raises(RuntimeError, match="1 run"):
+        store.flush()
+    assert sorted(store.runs()['run_id']) == ['a', 'b', 'c']
+    assert len(store.portfolio()) == 9
+    store.close()
+
+
+def test_queued_runs_are_written_at_exit(tmp_path):
+    path = tmp_path / 'results.sqlite'
+    script = (
+        "import pandas as pd\n"
+        "from src.commomacrossoverbacktest.results_store import ResultsStore\n"
+        f"store = ResultsStore({str(path)!r})\n"
+        "pnl = pd.DataFrame({'Date': pd.date_range('2023-01-01', periods=1000), 'Portfolio Value': 1.0})\n"
+        "for i in range(20):\n"
+        "    store.save(str(i), pnl)\n"
+    )
+    subprocess.run([sys.executable, '-c', script], check=True, cwd=Path(__file__).parents[1])
+
+    assert len(ResultsStore(path, asynchronous=False).runs()) == 20
@@ -0,0 +1,49 @@
+import asyncio
+import numpy as np
+import pandas as pd
+from src.commomacrossoverbacktest.commo_broker import CommoBroker
+from src.commomacrossoverbacktest.exponentialmovingaverage import ExponentialMovingAverage
+from src.commomacrossoverbacktest.streaming import StreamingEMA, StreamingTrader, iter_bars, replay
+from src.commomacrossoverbacktest.synthetic import make_commodity_data
+
+
+def make_trader(num_commodities=3):
+    return StreamingTrader(CommoBroker(100000), StreamingEMA(5, 20, 50), num_commodities)
+
+
+def test_replay_matches_batch_ema_and_signals(tmp_path):
+    data = make_commodity_data(['GC=F', 'CL=F', 'ZS=F'], '2020-01-01', '2021-12-31', seed=7, missing=0.1)
+    data.to_csv(tmp_path / 'bars.csv', index=False)
+
+    records = replay(tmp_path / 'bars.csv', make_trader(), chunksize=500)
+    assert len(records) == len(data)
+    assert (records['Latency'] > 0).all()
+
+    ema_calculator = ExponentialMovingAverage(5, 20, 50)
+    batch = ema_calculator.generate_signals(ema_calculator.compute_ema(data, 'Close', 'Date'), filter_signals=False)
+    streamed = records.dropna(subset=['EMA_Short', 'EMA_Medium', 'EMA_Long'])
+
+    key = ['ticker', 'Date']
+    batch = batch.sort_values(by=key).reset_index(drop=True)
+    streamed = streamed.sort_values(by=key).reset_index(drop=True)
+    for column in ['EMA_Short', 'EMA_Medium', 'EMA_Long']:
+        np.testing.assert_allclose(streamed[column], batch[column], rtol=1e-12)
+    np.testing.assert_array_equal(streamed['Signal'], batch['Signal'])
+
+
+def test_async_feed_matches_sync_replay():
+    data = make_commodity_data(['GC=F', 'CL=F', 'ZS=F'], '2020-01-01', '2021-06-30', seed=8)
+
+    sync_trader = make_trader()
+    sync_trader.run(iter_bars(data))
+
+    async def feed():
+        for bar in iter_bars(data):
+            yield bar
+
+    async_trader = make_trader()
+    asyncio.run(async_trader.run_async(feed()))
+
+    assert len(sync_trader.broker.get_transaction_log()) > 0
+    pd.testing.assert_frame_equal(sync_trader.broker.get_transaction_log(), async_trader.broker.get_transaction_log())
+    assert sync_trader.portfolio_value() == async_trader.portfolio_value()
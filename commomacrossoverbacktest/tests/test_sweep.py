@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+from datetime import timedelta
+from src.commomacrossoverbacktest.sweep import run_sweep
+from src.commomacrossoverbacktest.synthetic import make_commodity_data
+from src.commomacrossoverbacktest.vectorized import vectorized_backtest
+
+
+def test_run_sweep_matches_single_runs():
+    data = make_commodity_data(['GC=F', 'CL=F', 'ZS=F'], '2020-01-01', '2021-12-31', seed=5)
+    steps = pd.date_range('2020-01-01', '2021-12-31', freq='D')
+    windows = [(5, 20, 50), (10, 30, 100), (5, 50, 250)]
+
+    results = run_sweep(data, steps, windows, initial_cash=100000, max_workers=2)
+
+    assert list(zip(results['short_window'], results['medium_window'], results['long_window'])) == windows
+    for row in results.itertuples():
+        pnl, log = vectorized_backtest(data, steps, row.short_window, row.medium_window, row.long_window, 100000)
+        np.testing.assert_allclose(row.final_value, pnl['Portfolio Value'].iloc[-1])
+        assert row.n_trades == len(log)
+        assert row.max_drawdown <= 0
+
+
+def test_run_sweep_in_process():
+    data = make_commodity_data(['GC=F', 'CL=F'], '2021-01-01', '2021-12-31', seed=6)
+    steps = pd.date_range('2021-01-01', '2021-12-31', freq='D')
+    results = run_sweep(data, steps, [(5, 20, 50)], max_workers=1)
+
+    assert len(results) == 1
+    assert results['total_return'].iloc[0] == results['final_value'].iloc[0] / 1000000 - 1
+
+
+def test_batched_sweep_matches_single_runs():
+    data = make_commodity_data(['GC=F', 'CL=F', 'ZS=F', 'ZC=F'], '2020-01-01', '2021-12-31', seed=14, missing=0.05)
+    steps = pd.date_range('2020-01-01', '2021-12-31', freq='D')
+    windows = [(5, 20, 50), (10, 30, 100), (5, 50, 250), (3, 10, 30)]
+
+    batched = run_sweep(data, steps, windows, initial_cash=100000, max_workers=1, batched=True)
+    single = run_sweep(data, steps, windows, initial_cash=100000, max_workers=1)
+
+    np.testing.assert_allclose(batched['final_value'], single['final_value'], rtol=1e-9)
+    np.testing.assert_allclose(batched['max_drawdown'], single['max_drawdown'], rtol=1e-9, atol=1e-12)
+    np.testing.assert_array_equal(batched['n_trades'], single['n_trades'])
+
+
+def test_sweep_accepts_generators_and_duration_windows():
+    dates = pd.date_range('2021-01-04 00:00', periods=3000, freq='min')
+    rng = np.random.default_rng(15)
+    data = pd.concat([
+        pd.DataFrame({'Date': dates, 'ticker': ticker, 'Close': 50 * np.exp(np.cumsum(rng.normal(0, 1e-3, len(dates))))})
+        for ticker in ('GC=F', 'CL=F')
+    ], ignore_index=True)
+
+    # Les fenêtres en durées sont converties en barres sans troncature
+    windows = (window for window in [('5min', '20min', '1h'), ('90s', '10min', '45min')])
+    results = run_sweep(data, dates, windows, max_workers=1, bar_freq='min')
+    expected = run_sweep(data, dates, [(5, 20, 60), (1.5, 10, 45)], max_workers=1)
+
+    assert list(results['short_window']) == ['5min', '90s']
+    np.testing.assert_allclose(results['final_value'], expected['final_value'])
+    assert results['n_trades'].iloc[1] > 0
+
+    with pytest.raises(ValueError):
+        run_sweep(data, dates, [('5min', '20min', '1h')], max_workers=1)
+    with pytest.raises(ValueError):
+        run_sweep(data, dates, [(5, 20)], max_workers=1)
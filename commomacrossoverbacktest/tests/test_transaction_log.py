@@ -0,0 +1,28 @@
+import pandas as pd
+from datetime import datetime
+from src.commomacrossoverbacktest.transaction_log import TransactionLog
+
+
+def test_transaction_log_to_frame():
+    log = TransactionLog()
+    log.append(datetime(2024, 1, 1), 'BUY', 'CL=F', 10, 60.5, 395.0)
+    log.append(datetime(2024, 1, 2), 'SELL', 'CL=F', 10, 70.25, 1097.5)
+    log.append(datetime(2024, 1, 2), 'BUY', 'GC=F', 1, 1500.0, -402.5)
+
+    frame = log.to_frame()
+    assert len(log) == 3
+    assert list(frame.columns) == TransactionLog.columns
+    assert list(frame['Action']) == ['BUY', 'SELL', 'BUY']
+    assert list(frame['Ticker']) == ['CL=F', 'CL=F', 'GC=F']
+    assert frame['Date'].iloc[1] == pd.Timestamp(2024, 1, 2)
+    assert frame['Price'].iloc[1] == 70.25
+    assert frame['Quantity'].sum() == 21
+
+
+def test_transaction_log_round_trip():
+    log = TransactionLog()
+    assert log.to_frame().empty
+
+    log.append(datetime(2024, 1, 1), 'BUY', 'ZS=F', 5, 12.5, 937.5)
+    copy = TransactionLog.from_frame(log.to_frame())
+    pd.testing.assert_frame_equal(copy.to_frame(), log.to_frame())
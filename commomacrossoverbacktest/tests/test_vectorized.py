@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from src.commomacrossoverbacktest.commo_backtest import Backtest
+from src.commomacrossoverbacktest.market_data import compact_market_data
+from src.commomacrossoverbacktest.synthetic import make_commodity_data
+
+
+def test_vectorized_matches_event_driven(synthetic_backtest):
+    event_backtest = synthetic_backtest()
+    event_pnl = event_backtest.run_backtest()
+    event_log = event_backtest.broker.get_transaction_log()
+
+    vectorized_backtest = synthetic_backtest()
+    vectorized_pnl = vectorized_backtest.run_vectorized()
+
+    assert list(vectorized_pnl['Date']) == list(event_pnl['Date'])
+    np.testing.assert_allclose(vectorized_pnl['Portfolio Value'], event_pnl['Portfolio Value'], rtol=1e-9)
+
+    # Les mêmes transactions sont exécutées
+    saved = pd.read_csv(f"backtests/{vectorized_backtest.backtest_name}_transactions.csv")
+    assert len(event_log) > 0
+    assert list(saved['Ticker']) == list(event_log['Ticker'])
+    assert list(saved['Action']) == list(event_log['Action'])
+    assert list(saved['Quantity']) == list(event_log['Quantity'])
+
+
+def test_run_backtest_steps_on_trading_dates(synthetic_backtest):
+    backtest = synthetic_backtest()
+    pnl = backtest.run_backtest()
+
+    # Une ligne par jour calendaire, les week-ends reprennent la valeur du vendredi
+    assert len(pnl) == len(pd.date_range('2020-01-01', '2021-06-30', freq='D'))
+    values = pnl.set_index('Date')['Portfolio Value']
+    assert values['2021-06-05'] == values['2021-06-04']
+    assert values['2021-06-06'] == values['2021-06-04']
+
+    # Un calendrier personnalisé remplace les dates des données
+    fridays = synthetic_backtest()
+    fridays.calendar = lambda start, end: pd.date_range(start, end, freq='W-FRI')
+    assert len(fridays.trading_dates(None)) == len(pd.date_range('2020-01-01', '2021-06-30', freq='W-FRI'))
+
+
+def test_intraday_compact_backtest(monkeypatch, tmp_path):
+    # Barres horaires compactées (float32, tickers catégoriels), un pas par jour
+    data = compact_market_data(make_commodity_data(['GC=F', 'CL=F', 'ZS=F'], '2021-01-01', '2021-06-30', freq='h', seed=11))
+    monkeypatch.chdir(tmp_path)
+
+    def make_backtest():
+        return Backtest(
+            initial_date=datetime(2021, 1, 1),
+            final_date=datetime(2021, 6, 30),
+            universe=['GC=F', 'CL=F', 'ZS=F'],
+            verbose=False,
+            data_loader=lambda *args: data.copy(),
+            freq='D'
+        )
+
+    event_backtest = make_backtest()
+    event_pnl = event_backtest.run_backtest()
+    assert len(event_backtest.trading_dates(data)) == 181
+    assert len(event_backtest.broker.get_transaction_log()) > 0
+
+    vectorized_pnl = make_backtest().run_vectorized()
+    np.testing.assert_allclose(vectorized_pnl['Portfolio Value'], event_pnl['Portfolio Value'], rtol=1e-9)
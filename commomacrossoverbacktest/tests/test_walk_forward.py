@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.commomacrossoverbacktest.analytics import performance_metrics, pnl_attribution
+from src.commomacrossoverbacktest.synthetic import make_commodity_data
+from src.commomacrossoverbacktest.vectorized import prepare_backtest_panel, run_panel
+from src.commomacrossoverbacktest.walk_forward import walk_forward, walk_forward_folds
+
+
+def test_walk_forward_folds():
+    assert walk_forward_folds(10, 4, 3) == [(0, 4, 7), (3, 7, 10)]
+    assert walk_forward_folds(11, 4, 3) == [(0, 4, 7), (3, 7, 10), (6, 10, 11)]
+
+
+@pytest.mark.parametrize('train_size, test_size', [(0, 3), (4, 0), (-1, 3), (10, 3), (12, 3)])
+def test_walk_forward_folds_rejects_invalid_sizes(train_size, test_size):
+    with pytest.raises(ValueError):
+        walk_forward_folds(10, train_size, test_size)
+
+
+def test_walk_forward_rejects_train_window_without_test_step():
+    data = make_commodity_data(['GC=F'], '2020-01-01', '2020-03-31', seed=3)
+    steps = pd.date_range('2020-01-01', '2020-03-31', freq='B')
+    with pytest.raises(ValueError, match='no test step'):
+        walk_forward(data, steps, [(5, 10, 20)], train_size=len(steps), test_size=10, max_workers=1)
+
+
+def test_walk_forward_selects_best_train_candidate():
+    data = make_commodity_data(['GC=F', 'CL=F', 'ZS=F'], '2019-01-01', '2021-12-31', seed=21)
+    steps = pd.date_range('2019-01-01', '2021-12-31', freq='B')
+    candidates = [(5, 20, 50), (10, 30, 100), (3, 10, 30)]
+
+    result = walk_forward(data, steps, candidates, train_size=250, test_size=120, initial_cash=100000,
+                          max_workers=1)
+    pnl, folds = result['pnl'], result['folds']
+
+    assert len(pnl) == len(steps)
+    assert (pnl['Portfolio Value'].iloc[:250] == 100000).all()
+    assert len(folds) == len(walk_forward_folds(len(steps), 250, 120))
+    assert (folds['test_start'].iloc[1:].to_numpy() > folds['test_end'].iloc[:-1].to_numpy()).all()
+
+    # The first train window starts with the panel: its runs are prefixes of full runs
+    panel = prepare_backtest_panel(data, steps)
+    scores = [
+        performance_metrics(run_panel(panel, *candidate, 100000)['value'][:250])['sharpe'].iloc[0]
+        for candidate in candidates
+    ]
+    first = folds.iloc[0]
+    assert (first['short_window'], first['medium_window'], first['long_window']) == candidates[int(np.nanargmax(scores))]
+    np.testing.assert_allclose(first['train_score'], np.nanmax(scores))
+
+    # Nothing is traded before the first test window
+    trades = result['transactions'].to_frame()
+    assert trades['Date'].min() >= folds['test_start'].iloc[0]
+
+
+def test_walk_forward_parallel_matches_in_process():
+    data = make_commodity_data(['GC=F', 'CL=F'], '2020-01-01', '2021-12-31', seed=22, missing=0.05)
+    steps = pd.date_range('2020-01-01', '2021-12-31', freq='D')
+    candidates = [(5, 20, 50), (3, 10, 30), (10, 30, 100)]
+
+    parallel = walk_forward(data, steps, candidates, 200, 100, max_workers=2, objective='total_return')
+    in_process = walk_forward(data, steps, candidates, 200, 100, max_workers=1, objective='total_return')
+
+    assert len(parallel['folds']) == 6
+    pd.testing.assert_frame_equal(parallel['folds'], in_process['folds'])
+    np.testing.assert_allclose(parallel['pnl']['Portfolio Value'], in_process['pnl']['Portfolio Value'])
+
+
+def test_walk_forward_closes_positions_between_folds():
+    data = make_commodity_data(['GC=F', 'CL=F', 'ZS=F'], '2019-01-01', '2021-12-31', seed=23)
+    steps = pd.date_range('2019-01-01', '2021-12-31', freq='B')
+    candidates = (candidate for candidate in [(5, 20, 50), (3, 10, 30), (2.5, 10, 30)])
+
+    result = walk_forward(data, steps, candidates, train_size=200, test_size=100, initial_cash=100000,
+                          max_workers=1)
+    trades, folds, pnl = result['transactions'].to_frame(), result['folds'], result['pnl']
+    assert len(folds) > 2 and len(trades) > 0
+
+    # Chaque fenêtre de test se termine à plat, sauf la dernière
+    signed = np.where(trades['Action'] == 'SELL', -1, 1) * trades['Quantity']
+    for test_end in folds['test_end'].iloc[:-1]:
+        assert (signed[trades['Date'] <= test_end].groupby(trades['Ticker']).sum() == 0).all()
+
+    # L'attribution du journal retrouve le P&L assemblé
+    panel = prepare_backtest_panel(data, steps)
+    final_prices = dict(zip(panel['tickers'], panel['execution_prices'][-1]))
+    attribution = pnl_attribution(trades, final_prices)
+    np.testing.assert_allclose(attribution['Total PnL'].sum(), pnl['Portfolio Value'].iloc[-1] - 100000)
+
+
+def test_walk_forward_rejects_unpicklable_objective():
+    data = make_commodity_data(['GC=F', 'CL=F'], '2020-01-01', '2020-12-31', seed=24)
+    steps = pd.date_range('2020-01-01', '2020-12-31', freq='D')
+    with pytest.raises(ValueError, match='module level'):
+        walk_forward(data, steps, [(5, 20, 50)], 100, 50, max_workers=2, objective=lambda values: values[-1])
+
+    # En un seul processus, une lambda reste acceptée
+    result = walk_forward(data, steps, [(5, 20, 50)], 100, 50, max_workers=1, objective=lambda values: values[-1])
+    assert len(result['folds']) == 6